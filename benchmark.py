@@ -0,0 +1,275 @@
+"""Offline throughput benchmark of the scraper
+
+Runs indeed-resume-scraper.py against mock_indeed.py for each given number of
+processes (1 runs `mine`, more runs `mine_multi`) and reports resumes/sec, per
+stage latency and the peak RSS of the scraper's process tree (browsers
+included), sampled while it runs. Every variant of scraper arguments given with
+--extra is run, e.g to compare a full browser against a lean one. The parse
+stage is timed in process over the resume pages in fixtures/ for every
+available parser, and so is serializing the parsed resumes for every
+available serializer. Memory held by the parsed models is compared with
+the same models keeping their attributes in __dict__ (unslotted).
+
+	python benchmark.py --processes 1 2 4 --resumes 200 --latency 0.05 --extra '' '--lean'
+"""
+from urllib.request import urlopen
+import subprocess
+import tempfile
+import argparse
+import platform
+import logging
+import shlex
+import tracemalloc
+import gc
+import time
+import json
+import glob
+import sys
+import os
+
+import mock_indeed
+from indeed_resume_scraper import parsing
+from indeed_resume_scraper.autoscale import process_tree_rss
+
+SCRAPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indeed-resume-scraper.py')
+BENCHMARK_NAME = 'benchmark'
+# seconds between samples of the RSS of a run's process tree
+RSS_SAMPLE_INTERVAL = 0.1
+# ru_maxrss is in bytes on Mac and kilobytes elsewhere
+RSS_UNIT = 1 if platform.system() == 'Darwin' else 1024
+
+def load_fixture_resumes():
+	pages = []
+	for filename in sorted(glob.glob(os.path.join(mock_indeed.FIXTURES_DIR, 'resumes', '*.html'))):
+		with open(filename) as f:
+			pages.append(f.read())
+	return pages
+
+def bench_parse(repeat):
+	"""Times parse_resume per parser over the fixture resumes
+
+	Returns {parser: stats}, also checks every parser gives the same output
+	"""
+	pages = load_fixture_resumes()
+
+	results = {}
+	outputs = {}
+	for parser in parsing.PARSERS:
+		outputs[parser] = [parsing.parse_resume('fixture', page, parser).toJSON() for page in pages]
+		t = time.perf_counter()
+		for _ in range(repeat):
+			for page in pages:
+				parsing.parse_resume('fixture', page, parser)
+		elapsed = time.perf_counter() - t
+		parsed = repeat * len(pages)
+		results[parser] = {
+			'resumes_per_sec': parsed / elapsed,
+			'ms_per_resume': elapsed * 1000 / parsed,
+			'same_output': outputs[parser] == outputs[parsing.HTML_PARSER]
+		}
+	return results
+
+class DictModel:
+	"""Copy of a slotted model keeping its attributes in __dict__, as models were before"""
+	def __init__(self, model):
+		for name in model.__slots__:
+			value = getattr(model, name)
+			if isinstance(value, list):
+				value = [DictModel(item) if hasattr(item, '__slots__') else item for item in value]
+			elif hasattr(value, '__slots__'):
+				value = DictModel(value)
+			setattr(self, name, value)
+
+def model_bytes(pages, repeat, convert=None):
+	"""Bytes held per parsed resume once garbage (e.g parse trees in cycles) is collected"""
+	gc.collect()
+	tracemalloc.start()
+	resumes = [parsing.parse_resume('fixture', page) for _ in range(repeat) for page in pages]
+	if convert is not None:
+		resumes = [convert(resume) for resume in resumes]
+	gc.collect()
+	held = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return held / len(resumes)
+
+def bench_models(repeat):
+	"""Bytes held per resume by the (slotted) models and by the same models with a __dict__"""
+	pages = load_fixture_resumes()
+	return {
+		'slots': model_bytes(pages, repeat),
+		'__dict__': model_bytes(pages, repeat, DictModel)
+	}
+
+def bench_serialize(repeat):
+	"""Times Resume.toJSON per serializer over the fixture resumes
+
+	Returns {serializer: stats} along with the bytes allocated serializing
+	on top of the models, the resumes are parsed repeat times
+	"""
+	pages = load_fixture_resumes()
+	serializers = ['json'] + (['orjson'] if parsing.orjson is not None else [])
+	orjson = parsing.orjson
+	resumes = [parsing.parse_resume('fixture', page) for _ in range(repeat) for page in pages]
+
+	results = {}
+	for serializer in serializers:
+		parsing.orjson = orjson if serializer == 'orjson' else None
+		gc.collect()
+		tracemalloc.start()
+		for resume in resumes:
+			resume.toJSON()
+		serialize_peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+
+		t = time.perf_counter()
+		for resume in resumes:
+			resume.toJSON()
+		elapsed = time.perf_counter() - t
+		results[serializer] = {
+			'resumes_per_sec': len(resumes) / elapsed,
+			'serialize_peak_bytes': serialize_peak,
+			'json_bytes_per_resume': sum(len(resume.toJSON().encode('utf-8')) for resume in resumes) / len(resumes)
+		}
+	parsing.orjson = orjson
+	return results
+
+def bench_scrape(args, server, processes, extra, workdir):
+	"""Runs the scraper once in a subprocess, returns its stats"""
+	base_url = mock_indeed.server_url(server)
+	urlopen(base_url + '/__reset').read()
+
+	name = '%s-p%d-%d' % (BENCHMARK_NAME, processes, args.extra.index(extra))
+	stats_file = os.path.join(workdir, name + '.stats.json')
+	command = [
+		sys.executable, SCRAPER,
+		'-q', args.query,
+		'--name', name,
+		'-si', '0',
+		'-ei', str(args.resumes),
+		'--processes', str(processes),
+		'--driver', args.driver,
+		'--stats', stats_file,
+		'--override'
+	]
+	if not args.show_browser:
+		command.append('--headless')
+	command.extend(shlex.split(extra))
+
+	env = dict(os.environ)
+	env['INDEED_RESUME_HOST'] = base_url
+	env['INDEED_SECURE_HOST'] = base_url
+	# mock login accepts anything
+	env.setdefault('INDEED_RESUME_USER', 'benchmark@example.com')
+	env.setdefault('INDEED_RESUME_PASSWORD', 'benchmark')
+
+	logging.info('Running %s', ' '.join(shlex.quote(part) for part in command))
+	with open(os.path.join(workdir, name + '.log'), 'w') as log:
+		t = time.perf_counter()
+		process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+		# ru_maxrss is the largest single process, what the scraper, its workers and
+		# browsers hold at once is their summed RSS, sampled until the run exits
+		peak_rss = None
+		while True:
+			pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+			if pid != 0:
+				break
+			rss = process_tree_rss(process.pid)
+			if rss is not None:
+				peak_rss = max(peak_rss or 0, rss)
+			time.sleep(RSS_SAMPLE_INTERVAL)
+		elapsed = time.perf_counter() - t
+	if peak_rss is None:
+		logging.warn('RSS of the process tree could not be sampled, reporting that of its largest process')
+
+	resumes = 0
+	output = os.path.join(workdir, 'resume_output_' + name + '.json')
+	if os.path.exists(output):
+		with open(output) as f:
+			resumes = sum(1 for _ in f)
+
+	scraper_stats = None
+	if os.path.exists(stats_file):
+		with open(stats_file) as f:
+			scraper_stats = json.load(f)
+
+	return {
+		'processes': processes,
+		'extra': extra,
+		'seconds': elapsed,
+		'resumes': resumes,
+		'resumes_per_sec': resumes / elapsed,
+		'peak_rss_mb': (peak_rss if peak_rss is not None else usage.ru_maxrss * RSS_UNIT) / (1024 * 1024),
+		'peak_rss_of': 'process tree' if peak_rss is not None else 'largest process',
+		'stages': json.loads(urlopen(base_url + '/__stats').read().decode('utf-8')),
+		'scraper': scraper_stats
+	}
+
+def report(parse_results, model_results, serialize_results, scrape_results):
+	print('Parse stage (fixture resumes)')
+	for parser, result in parse_results.items():
+		print('  %-12s %8.1f resumes/sec %7.2f ms/resume  same output: %s' % (
+			parser, result['resumes_per_sec'], result['ms_per_resume'], result['same_output']))
+
+	print('Models (fixture resumes)')
+	for models, held in model_results.items():
+		print('  %-12s %8.0f bytes/resume held' % (models, held))
+
+	print('Serialize stage (fixture resumes)')
+	for serializer, result in serialize_results.items():
+		print('  %-12s %8.1f resumes/sec %7.0f JSON bytes/resume  peak %d bytes allocated' % (
+			serializer, result['resumes_per_sec'], result['json_bytes_per_resume'], result['serialize_peak_bytes']))
+
+	for result in scrape_results:
+		print('%d process(es) [%s]: %d resumes in %.1f seconds, %.2f resumes/sec, peak RSS %.0f MB (%s), %d throttled' % (
+			result['processes'], result['extra'], result['resumes'], result['seconds'], result['resumes_per_sec'],
+			result['peak_rss_mb'], result['peak_rss_of'], result['stages']['throttled']))
+		for stage in (mock_indeed.LOGIN, mock_indeed.SEARCH, mock_indeed.RESUME, mock_indeed.STATIC):
+			stats = result['stages'][stage]
+			print('  %-8s %5d requests  mean %6.1f ms  p95 %6.1f ms' % (
+				stage, stats['count'], stats['mean'] * 1000, stats['p95'] * 1000))
+		if result['scraper'] is not None:
+			# as seen by the scraper, including its own CPU time
+			for stage, stats in result['scraper']['stages'].items():
+				if stats['count']:
+					print('  %-24s %5d times  mean %6.1f ms  max %6.1f ms' % (
+						stage, stats['count'], stats['mean'] * 1000, stats['max'] * 1000))
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(
+		description='Benchmark the scraper against a local mock of Indeed',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	parser.add_argument('--processes', default=[1, 2, 4], type=int, nargs='+', metavar='processes', help='process counts to benchmark')
+	parser.add_argument('--resumes', default=200, type=int, help='# of resumes to scrape per run')
+	parser.add_argument('-q', default='software engineer', dest='query', metavar='query', help='search query')
+	parser.add_argument('--driver', default='firefox', choices=['firefox', 'chrome'])
+	parser.add_argument('--show-browser', default=False, dest='show_browser', action='store_true', help='do not run browsers headless')
+	parser.add_argument('--extra', default=[''], nargs='+', help='variants of extra scraper arguments to run e.g "" "--lean --parser lxml"')
+	parser.add_argument('--latency', default=0.0, type=float, metavar='seconds', help='added latency per request')
+	parser.add_argument('--jitter', default=0.0, type=float, metavar='seconds', help='max random latency added on top of --latency')
+	parser.add_argument('--max-rate', default=0, type=int, dest='max_rate', metavar='requests', help='throttle above this many requests per second (0 for no limit)')
+	parser.add_argument('--throttle-every', default=0, type=int, dest='throttle_every', metavar='n', help='throttle every n-th search page (0 for never)')
+	parser.add_argument('--parse-repeat', default=200, type=int, dest='parse_repeat', metavar='n', help='# of times fixtures are parsed for the parse stage')
+	parser.add_argument('--parse-only', default=False, dest='parse_only', action='store_true', help='only benchmark the parse and serialize stages (no browser needed)')
+	parser.add_argument('--json', default=None, metavar='file', help='also write results to this JSON file')
+	args = parser.parse_args()
+
+	logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(processName)s:%(levelname)s] %(message)s')
+
+	parse_results = bench_parse(args.parse_repeat)
+	model_results = bench_models(args.parse_repeat)
+	serialize_results = bench_serialize(args.parse_repeat)
+	scrape_results = []
+	if not args.parse_only:
+		site = mock_indeed.MockIndeed(args.resumes, args.latency, args.jitter, args.max_rate, args.throttle_every)
+		server = mock_indeed.serve(site)
+		with tempfile.TemporaryDirectory() as workdir:
+			for processes in args.processes:
+				for extra in args.extra:
+					scrape_results.append(bench_scrape(args, server, processes, extra, workdir))
+		server.shutdown()
+
+	report(parse_results, model_results, serialize_results, scrape_results)
+	if args.json is not None:
+		with open(args.json, 'w') as f:
+			json.dump({'parse': parse_results, 'models': model_results, 'serialize': serialize_results, 'scrape': scrape_results}, f, indent=2)
@@ -0,0 +1,41 @@
+"""Scrape Indeed resumes, from the command line (indeed-resume-scraper.py) or as a library
+
+	from indeed_resume_scraper import iter_resumes, parse_resume
+
+	for resume in iter_resumes('software engineer', 'canada', 0, 500, headless=True):
+		print(resume.toJSON())
+
+Submodules are only imported once something of theirs is used, so that
+parsing resume pages does not load selenium and the rest of the scraper
+"""
+import importlib
+
+# public names and the submodule each comes from
+API = {
+	'iter_resumes': 'scraper',
+	'scraping_options': 'scraper',
+	'read_results': 'outputs',
+	'parse_resume': 'parsing',
+	'find_resume_body': 'parsing',
+	'dumps': 'parsing',
+	'loads': 'parsing',
+	'Resume': 'parsing',
+	'Summary': 'parsing',
+	'Job': 'parsing',
+	'School': 'parsing',
+	'Skill': 'parsing',
+	'Info': 'parsing',
+	'HTML_PARSER': 'parsing',
+	'LXML_PARSER': 'parsing',
+	'PARSERS': 'parsing'
+}
+
+__all__ = list(API)
+
+def __getattr__(name):
+	if name not in API:
+		raise AttributeError('module %r has no attribute %r' % (__name__, name))
+	return getattr(importlib.import_module('.' + API[name], __name__), name)
+
+def __dir__():
+	return sorted(list(globals()) + __all__)
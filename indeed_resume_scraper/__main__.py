@@ -0,0 +1,5 @@
+import sys
+
+from .scraper import run
+
+run(sys.argv[1:])
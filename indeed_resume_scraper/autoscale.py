@@ -0,0 +1,285 @@
+"""Memory of browsers and headroom of the host, and sizing of mine workers by them (see --processes auto)
+
+psutil is used when installed, imported once something is measured, /proc otherwise (Linux only)
+"""
+import multiprocessing
+import functools
+import logging
+import time
+import os
+
+from .stats import RESUMES_WRITTEN, UNCHANGED_RESUMES, THROTTLED
+
+# AUTO SIZING (mine workers added and retired while a run goes on, see Autoscaler)
+# workers to start with and most ever run, whatever the host
+AUTOSCALE_START = 2
+AUTOSCALE_MAX_PROCESSES = 32
+# seconds between decisions, the first interval after a change is not judged on as new browsers start and log in
+AUTOSCALE_INTERVAL = 30
+# MB of memory per worker until it is measured (browser and driver service)
+WORKER_MEMORY_ESTIMATE = 512
+# share of available memory workers may take, MB left free no matter what
+AUTOSCALE_MEMORY_SHARE = 0.8
+AUTOSCALE_MIN_FREE_MEMORY = 512
+# busiest the host CPU may be for a worker to be added
+AUTOSCALE_MAX_CPU = 0.8
+# throttle signals in an interval, in as many intervals in a row, that get a worker retired.
+# One-off ones are left to the rate limiter slowing down
+AUTOSCALE_MAX_THROTTLES = 3
+AUTOSCALE_THROTTLED_INTERVALS = 2
+# share of the resumes per second of one worker an added one has to bring in to be kept
+AUTOSCALE_MIN_GAIN = 0.5
+# intervals without adding workers after one was retired
+AUTOSCALE_HOLD = 10
+
+@functools.lru_cache(maxsize=None)
+def load_psutil():
+	"""psutil if it is installed, None otherwise"""
+	try:
+		import psutil
+	except ImportError:
+		return None
+	return psutil
+
+def can_measure_memory():
+	return load_psutil() is not None or os.path.isdir('/proc')
+
+def process_tree_rss(pid):
+	"""Resident memory in bytes of process pid and all of its descendants, None if it can not be told"""
+	psutil = load_psutil()
+	if psutil is not None:
+		try:
+			process = psutil.Process(pid)
+			processes = [process] + process.children(recursive=True)
+		except psutil.Error:
+			return None
+		rss = 0
+		for process in processes:
+			try:
+				rss += process.memory_info().rss
+			except psutil.Error:
+				# exited meanwhile
+				pass
+		return rss
+
+	children = {}
+	rss = {}
+	try:
+		entries = os.listdir('/proc')
+	except OSError:
+		return None
+	for entry in entries:
+		if not entry.isdigit():
+			continue
+		try:
+			with open('/proc/%s/stat' % entry) as f:
+				stat = f.read()
+		except OSError:
+			continue
+		# command name may have spaces in it, fields after it start with state
+		fields = stat[stat.rfind(')') + 2:].split()
+		children.setdefault(int(fields[1]), []).append(int(entry))
+		rss[int(entry)] = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+	if pid not in rss:
+		return None
+	total = 0
+	pids = [pid]
+	while pids:
+		pid = pids.pop()
+		total += rss.get(pid, 0)
+		pids.extend(children.get(pid, []))
+	return total
+
+class HostUsage:
+	"""CPU and memory headroom of the host, with psutil when installed, through /proc otherwise (Linux only)"""
+	def __init__(self):
+		self.cpu_times = None
+		# the first reading is taken against this one
+		self.cpu()
+
+	def read_cpu_times(self):
+		"""(busy, total) jiffies of all CPUs since boot, None if they can not be told"""
+		try:
+			with open('/proc/stat') as f:
+				fields = [int(field) for field in f.readline().split()[1:]]
+		except (OSError, ValueError):
+			return None
+		# idle and iowait
+		idle = sum(fields[3:5])
+		return sum(fields) - idle, sum(fields)
+
+	def cpu(self):
+		"""Busy share of all CPUs since the last call, None if unknown"""
+		psutil = load_psutil()
+		if psutil is not None:
+			return psutil.cpu_percent() / 100
+		cpu_times = self.read_cpu_times()
+		previous, self.cpu_times = self.cpu_times, cpu_times
+		if cpu_times is None or previous is None or cpu_times[1] == previous[1]:
+			return None
+		return (cpu_times[0] - previous[0]) / (cpu_times[1] - previous[1])
+
+	def available_memory(self):
+		"""Bytes of memory that can be taken without swapping, None if unknown"""
+		psutil = load_psutil()
+		if psutil is not None:
+			return psutil.virtual_memory().available
+		try:
+			with open('/proc/meminfo') as f:
+				for line in f:
+					if line.startswith('MemAvailable:'):
+						return int(line.split()[1]) * 1024
+		except (OSError, ValueError):
+			pass
+		return None
+
+def worker_limit(args, usage):
+	"""Most mine workers the host takes with --processes auto, also budgets memory per worker
+
+	A worker gets a core, short of those of the writer and parsers, and its share
+	of available memory. Browsers going past it are recycled unless --recycle-memory is given
+	"""
+	cores = os.cpu_count() or 1
+	helpers = 1 + (args.parsers if getattr(args, 'pipeline', False) else 0)
+	limit = min(max(cores - helpers, 1), AUTOSCALE_MAX_PROCESSES)
+	memory = usage.available_memory()
+	if memory is None:
+		logging.info('Auto sizing up to %d workers (%d cores), unable to tell available memory', limit, cores)
+		return limit
+
+	usable = max(memory * AUTOSCALE_MEMORY_SHARE - AUTOSCALE_MIN_FREE_MEMORY * 1024 * 1024, 0)
+	limit = max(min(limit, int(usable / ((args.recycle_memory or WORKER_MEMORY_ESTIMATE) * 1024 * 1024))), 1)
+	logging.info('Auto sizing up to %d workers (%d cores, %.0f MB available)', limit, cores, memory / (1024 * 1024))
+	if not args.recycle_memory:
+		args.recycle_memory = max(int(usable / limit / (1024 * 1024)), WORKER_MEMORY_ESTIMATE)
+		logging.info('Recycling browsers once they take up %d MB, their share of available memory (see --recycle-memory)', args.recycle_memory)
+	return limit
+
+class Retirements:
+	"""Workers Autoscaler asked to stop, shared by processes like TokenBucket"""
+	def __init__(self):
+		self.lock = multiprocessing.Lock()
+		self.pending = multiprocessing.Value('i', 0, lock=False)
+
+	def request(self):
+		with self.lock:
+			self.pending.value += 1
+
+	def take(self):
+		with self.lock:
+			if self.pending.value <= 0:
+				return False
+			self.pending.value -= 1
+			return True
+
+	def cancel(self):
+		with self.lock:
+			self.pending.value = 0
+
+class Autoscaler:
+	"""Adds and retires mine workers while a run goes on (--processes auto)
+
+	Starts with AUTOSCALE_START workers. Every AUTOSCALE_INTERVAL seconds one is
+	retired on sustained throttle signals or once memory runs short, or one is added while
+	there is CPU and memory to spare for it. An added worker is retired again if
+	resumes per second did not go up with it, e.g as the rate limit holds them all back.
+	Workers are never more than args.processes (see worker_limit)
+	"""
+	def __init__(self, args, stats, retirements, usage):
+		self.limit = args.processes
+		self.stats = stats
+		self.retirements = retirements
+		self.usage = usage
+		self.workers = min(AUTOSCALE_START, self.limit)
+		self.most = self.workers
+		# memory taken by the run before any worker started
+		self.baseline = process_tree_rss(os.getpid())
+		self.measured = time.monotonic()
+		self.done, self.throttled = self.counters()
+		# intervals in a row with AUTOSCALE_MAX_THROTTLES throttle signals
+		self.throttled_intervals = 0
+		# new workers are still starting their browsers over the first interval
+		self.warming = True
+		# (workers, resumes per second) before the last worker was added
+		self.added_from = None
+		self.hold = 0
+		logging.info('Starting %d of at most %d workers', self.workers, self.limit)
+
+	def counters(self):
+		counters = self.stats.snapshot()['counters']
+		return counters[RESUMES_WRITTEN] + counters[UNCHANGED_RESUMES], counters[THROTTLED]
+
+	def worker_memory(self, live):
+		"""Bytes of memory taken per worker and its browser, WORKER_MEMORY_ESTIMATE until measured"""
+		rss = process_tree_rss(os.getpid())
+		if rss is None or self.baseline is None or not live:
+			return WORKER_MEMORY_ESTIMATE * 1024 * 1024
+		return max(rss - self.baseline, 0) / live
+
+	def retire(self, reason, *reason_args):
+		self.workers -= 1
+		self.retirements.request()
+		self.warming = True
+		logging.info('Retiring a worker, %d left: ' + reason, self.workers, *reason_args)
+
+	def step(self, live):
+		"""Judges the interval gone by given the # of workers still running, returns # of workers to add"""
+		now = time.monotonic()
+		seconds = max(now - self.measured, 1e-6)
+		done, throttled = self.counters()
+		rate = (done - self.done) / seconds
+		throttles = throttled - self.throttled
+		self.measured, self.done, self.throttled = now, done, throttled
+		cpu = self.usage.cpu()
+		memory = self.usage.available_memory()
+		worker_memory = self.worker_memory(live)
+
+		if live < self.workers:
+			# workers ran out of search pages, there is nothing to compare with
+			self.added_from = None
+		if live <= self.workers:
+			# ones asked to stop did, or others did in their place
+			self.workers = live
+			self.retirements.cancel()
+		warming, self.warming = self.warming, False
+		self.hold = max(self.hold - 1, 0)
+
+		self.throttled_intervals = self.throttled_intervals + 1 if throttles >= AUTOSCALE_MAX_THROTTLES else 0
+		if self.throttled_intervals >= AUTOSCALE_THROTTLED_INTERVALS and self.workers > 1:
+			self.added_from = None
+			self.hold = AUTOSCALE_HOLD
+			self.throttled_intervals = 0
+			self.retire('%d throttle signals in %.0f seconds, %d intervals in a row', throttles, seconds, AUTOSCALE_THROTTLED_INTERVALS)
+			return 0
+		if memory is not None and memory < AUTOSCALE_MIN_FREE_MEMORY * 1024 * 1024 and self.workers > 1:
+			self.added_from = None
+			self.hold = AUTOSCALE_HOLD
+			self.retire('%.0f MB of memory available', memory / (1024 * 1024))
+			return 0
+		if warming:
+			return 0
+		if self.added_from is not None:
+			workers, before = self.added_from
+			self.added_from = None
+			if rate < before + before / workers * AUTOSCALE_MIN_GAIN:
+				self.hold = AUTOSCALE_HOLD
+				self.retire('%.2f resumes per second with %d workers, %.2f with %d', rate, workers + 1, before, workers)
+				return 0
+
+		if self.hold or self.workers >= self.limit:
+			return 0
+		if cpu is not None and cpu > AUTOSCALE_MAX_CPU:
+			return 0
+		if memory is not None and memory - worker_memory < AUTOSCALE_MIN_FREE_MEMORY * 1024 * 1024:
+			return 0
+		self.added_from = (self.workers, rate)
+		self.workers += 1
+		self.most = max(self.most, self.workers)
+		self.warming = True
+		logging.info('Adding a worker, %d running: %.2f resumes per second, CPU %s busy, %s MB available, %.0f MB per worker',
+			self.workers, rate, '?' if cpu is None else '%.0f%%' % (cpu * 100),
+			'?' if memory is None else '%.0f' % (memory / (1024 * 1024)), worker_memory / (1024 * 1024))
+		return 1
+
+	def close(self):
+		logging.info('Auto sizing ran up to %d of at most %d workers', self.most, self.limit)
@@ -0,0 +1,198 @@
+"""Raw resume pages kept as fetched to be parsed again (see --cache and the reparse command)"""
+import importlib.util
+import contextlib
+import traceback
+import logging
+import hashlib
+import sqlite3
+import gzip
+import time
+import os
+
+# CACHE (raw resume pages kept to be parsed again, see PageCache)
+CACHE_INDEX = 'index.db'
+CACHE_GZIP_EXTENSION = '.html.gz'
+CACHE_ZSTD_EXTENSION = '.html.zst'
+# MB
+CACHE_SIZE = 2048
+# eviction goes below the size cap by this much so that it does not run on every page
+CACHE_EVICT_TO = 0.9
+CACHE_EVICT_BATCH = 100
+# seconds to wait for other processes holding the index
+CACHE_WAIT = 30
+# pages are compressed with zstd when zstandard is installed (imported once a page is), with gzip otherwise
+HAS_ZSTANDARD = importlib.util.find_spec('zstandard') is not None
+
+@contextlib.contextmanager
+def atomic_write(filename):
+	"""Gives a file name to write filename under, renamed to it once the block is done
+
+	So that readers and crashes mid write never see it half written, the
+	file is removed instead if the block raises
+	"""
+	tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+	try:
+		yield tmp_filename
+	except BaseException:
+		try:
+			os.remove(tmp_filename)
+		except FileNotFoundError:
+			pass
+		raise
+	os.replace(tmp_filename, filename)
+
+def connect_sqlite(filename, timeout, check_same_thread=True):
+	"""SQLite connection in autocommit mode that waits timeout seconds for other processes holding the database"""
+	connection = sqlite3.connect(filename, timeout=timeout, isolation_level=None, check_same_thread=check_same_thread)
+	# readers do not block the writer and vice versa
+	connection.execute('PRAGMA journal_mode=WAL')
+	return connection
+
+class PageCache:
+	"""Raw resume pages as fetched, compressed on disk to be parsed again later (see reparse)
+
+	Pages are stored once per content hash under <directory>/<hash[:2]>/ and
+	resume IDs point to the page they last had. The index is kept in SQLite so
+	that all processes can share a cache (each opens its own), once pages take
+	up more than max_bytes the least recently used resumes (stored or read) are evicted
+	"""
+	def __init__(self, directory, max_bytes=CACHE_SIZE * 1024 * 1024):
+		self.directory = directory
+		self.max_bytes = max_bytes
+		os.makedirs(directory, exist_ok=True)
+		self.connection = connect_sqlite(os.path.join(directory, CACHE_INDEX), CACHE_WAIT)
+		self.connection.execute('CREATE TABLE IF NOT EXISTS resumes (id TEXT PRIMARY KEY, hash TEXT, used_at REAL)')
+		self.connection.execute('CREATE INDEX IF NOT EXISTS resumes_used_at ON resumes (used_at)')
+		self.connection.execute('CREATE INDEX IF NOT EXISTS resumes_hash ON resumes (hash)')
+		self.connection.execute('CREATE TABLE IF NOT EXISTS pages (hash TEXT PRIMARY KEY, file TEXT, size INTEGER)')
+		# running total of page sizes, summing them up on every put would not scale
+		self.connection.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value INTEGER)')
+		self.connection.execute("INSERT OR IGNORE INTO cache VALUES ('size', 0)")
+
+	@contextlib.contextmanager
+	def transaction(self):
+		# taken before reading so no two processes store or drop the same page at once
+		self.connection.execute('BEGIN IMMEDIATE')
+		try:
+			yield self.connection
+		except Exception:
+			self.connection.execute('ROLLBACK')
+			raise
+		self.connection.execute('COMMIT')
+
+	def put(self, idd, page_source):
+		data = page_source.encode('utf-8')
+		content_hash = hashlib.sha1(data).hexdigest()
+		relative = os.path.join(content_hash[:2], content_hash + (CACHE_ZSTD_EXTENSION if HAS_ZSTANDARD else CACHE_GZIP_EXTENSION))
+		# compressed before taking the lock, pages seldom come again unchanged
+		if HAS_ZSTANDARD:
+			import zstandard
+			data = zstandard.compress(data)
+		else:
+			data = gzip.compress(data)
+
+		with self.transaction() as connection:
+			if connection.execute('SELECT 1 FROM pages WHERE hash = ?', (content_hash,)).fetchone() is None:
+				self.write_page(relative, data)
+				connection.execute('INSERT INTO pages VALUES (?, ?, ?)', (content_hash, relative, len(data)))
+				connection.execute("UPDATE cache SET value = value + ? WHERE key = 'size'", (len(data),))
+			row = connection.execute('SELECT hash FROM resumes WHERE id = ?', (idd,)).fetchone()
+			connection.execute('INSERT OR REPLACE INTO resumes VALUES (?, ?, ?)', (idd, content_hash, time.time()))
+			removed = []
+			if row is not None and row[0] != content_hash:
+				# page the resume had before
+				removed.extend(relative for relative, _ in self.drop_unused(connection, row[0]))
+			size = connection.execute("SELECT value FROM cache WHERE key = 'size'").fetchone()[0]
+			if self.max_bytes and size > self.max_bytes:
+				removed.extend(self.evict(connection, size - self.max_bytes * CACHE_EVICT_TO))
+			# while holding the lock, so no other process stores the same page meanwhile
+			for relative in removed:
+				try:
+					os.remove(os.path.join(self.directory, relative))
+				except FileNotFoundError:
+					pass
+
+	def write_page(self, relative, data):
+		filename = os.path.join(self.directory, relative)
+		os.makedirs(os.path.dirname(filename), exist_ok=True)
+		with atomic_write(filename) as tmp_filename:
+			with open(tmp_filename, 'wb') as f:
+				f.write(data)
+
+	def drop_unused(self, connection, content_hash):
+		"""Drops the page of content_hash if no resume points to it anymore, returns [(file, size)] dropped"""
+		if connection.execute('SELECT 1 FROM resumes WHERE hash = ? LIMIT 1', (content_hash,)).fetchone() is not None:
+			return []
+		row = connection.execute('SELECT file, size FROM pages WHERE hash = ?', (content_hash,)).fetchone()
+		if row is None:
+			return []
+		connection.execute('DELETE FROM pages WHERE hash = ?', (content_hash,))
+		connection.execute("UPDATE cache SET value = value - ? WHERE key = 'size'", (row[1],))
+		return [row]
+
+	def evict(self, connection, excess):
+		"""Drops least recently used resumes until pages of at least excess bytes are gone"""
+		removed = []
+		freed = 0
+		while freed < excess:
+			rows = connection.execute('SELECT id, hash FROM resumes ORDER BY used_at LIMIT ?', (CACHE_EVICT_BATCH,)).fetchall()
+			if not rows:
+				break
+			for idd, content_hash in rows:
+				connection.execute('DELETE FROM resumes WHERE id = ?', (idd,))
+				for relative, size in self.drop_unused(connection, content_hash):
+					removed.append(relative)
+					freed += size
+				if freed >= excess:
+					break
+		return removed
+
+	def get(self, idd):
+		"""Page resume idd last had, None if it is not in the cache"""
+		row = self.connection.execute('SELECT file FROM resumes JOIN pages USING (hash) WHERE id = ?', (idd,)).fetchone()
+		if row is None:
+			return None
+		self.connection.execute('UPDATE resumes SET used_at = ? WHERE id = ?', (time.time(), idd))
+		return read_cached_page(os.path.join(self.directory, row[0]))
+
+	def entries(self):
+		"""(resume ID, page file) of all resumes in the cache"""
+		rows = self.connection.execute('SELECT id, file FROM resumes JOIN pages USING (hash) ORDER BY id')
+		return [(idd, os.path.join(self.directory, relative)) for idd, relative in rows]
+
+	def size(self):
+		return self.connection.execute("SELECT value FROM cache WHERE key = 'size'").fetchone()[0]
+
+	def close(self):
+		self.connection.close()
+
+def open_page_cache(args):
+	return PageCache(args.cache, args.cache_size * 1024 * 1024) if args.cache is not None else None
+
+def read_cached_page(filename):
+	with open(filename, 'rb') as f:
+		data = f.read()
+	if filename.endswith(CACHE_ZSTD_EXTENSION):
+		import zstandard
+		# frames written by zstandard.compress have their size in them
+		return zstandard.decompress(data).decode('utf-8')
+	return gzip.decompress(data).decode('utf-8')
+
+class CachingSink:
+	"""Keeps every fetched resume page in cache before handing it on to sink"""
+	def __init__(self, sink, cache):
+		self.sink = sink
+		self.cache = cache
+
+	def put(self, idd, page_source):
+		try:
+			self.cache.put(idd, page_source)
+		except (OSError, sqlite3.Error):
+			# not worth losing the resume over
+			traceback.print_exc()
+			logging.warn('Unable to cache page of resume ID %s', idd)
+		self.sink.put(idd, page_source)
+
+	def close(self):
+		self.sink.close()
+		self.cache.close()
@@ -0,0 +1,277 @@
+"""Search pages of a crawl shared by workers on any number of hosts (see --frontier and the frontier command)"""
+from http.server import BaseHTTPRequestHandler
+import contextlib
+import threading
+import platform
+import requests
+import logging
+import json
+import time
+import os
+
+from .cache import connect_sqlite
+
+# FRONTIER (search pages shared by workers on any number of hosts, see Frontier)
+# seconds a page stays leased to a worker without a heartbeat
+LEASE_TIME = 300
+HEARTBEAT_INTERVAL = 60
+FRONTIER_PORT = 8600
+# failures of a search page before it is abandoned, as with SearchPages
+MAX_PAGE_FAILURES = 3
+# seconds to wait for other workers holding the SQLite file
+FRONTIER_WAIT = 30
+# seconds to wait for the frontier command to answer, attempts at reaching it
+FRONTIER_TIMEOUT = 5
+FRONTIER_ATTEMPTS = 3
+
+class Frontier:
+	"""Search pages shared by mine workers on any number of hosts
+
+	Has the same interface as SearchPages. Pages are leased to the worker taking
+	them, leases are kept alive by heartbeats of the worker's process and pages of
+	expired leases (e.g of workers that died) are given out again
+	"""
+	def __init__(self, worker=None):
+		self.worker_name = worker
+		self.heartbeat_pid = None
+
+	@property
+	def worker(self):
+		# set in the worker's own process
+		return self.worker_name or '%s-%d' % (platform.node(), os.getpid())
+
+	def get(self, wait=True):
+		while True:
+			page, others_leased = self.take()
+			if page is not None:
+				self.start_heartbeats()
+				return page
+			if not others_leased or not wait:
+				return None
+			time.sleep(1)
+
+	def start_heartbeats(self):
+		if self.heartbeat_pid != os.getpid():
+			self.heartbeat_pid = os.getpid()
+			threading.Thread(target=self.keep_leases, daemon=True).start()
+
+	def keep_leases(self):
+		while True:
+			time.sleep(HEARTBEAT_INTERVAL)
+			try:
+				self.heartbeat()
+			except Exception as e:
+				logging.warn('Unable to renew leases of search pages: %s', e)
+
+class SqliteFrontier(Frontier):
+	"""Frontier kept in an SQLite file, shared by processes on one host or served by the frontier command"""
+	def __init__(self, filename, worker=None):
+		super(SqliteFrontier, self).__init__(worker)
+		self.filename = filename
+		# one connection per process and thread
+		self.connections = {}
+
+	def __getstate__(self):
+		state = dict(self.__dict__)
+		state['connections'] = {}
+		return state
+
+	@property
+	def connection(self):
+		key = (os.getpid(), threading.get_ident())
+		if key not in self.connections:
+			connection = connect_sqlite(self.filename, FRONTIER_WAIT)
+			connection.execute('CREATE TABLE IF NOT EXISTS pages (start INTEGER PRIMARY KEY, state TEXT NOT NULL, worker TEXT, lease_until REAL, failures INTEGER NOT NULL DEFAULT 0)')
+			connection.execute('CREATE TABLE IF NOT EXISTS resumes (start INTEGER, id TEXT, PRIMARY KEY (start, id))')
+			connection.execute('CREATE TABLE IF NOT EXISTS crawl (key TEXT PRIMARY KEY, value)')
+			self.connections[key] = connection
+		return self.connections[key]
+
+	@contextlib.contextmanager
+	def transaction(self):
+		# taken before reading so no two workers lease the same page
+		self.connection.execute('BEGIN IMMEDIATE')
+		try:
+			yield self.connection
+		except Exception:
+			self.connection.execute('ROLLBACK')
+			raise
+		self.connection.execute('COMMIT')
+
+	def add_pages(self, offsets):
+		"""Adds search pages of offsets, pages already there are left as they are"""
+		with self.transaction() as connection:
+			connection.executemany(
+				"INSERT OR IGNORE INTO pages (start, state) VALUES (?, 'pending')",
+				[(offset,) for offset in offsets]
+			)
+
+	def end(self):
+		row = self.connection.execute("SELECT value FROM crawl WHERE key = 'end'").fetchone()
+		return row[0] if row is not None else None
+
+	def is_past_end(self, offset):
+		end = self.end()
+		return end is not None and offset >= end
+
+	def take(self):
+		"""Lease a page, returns ((offset, IDs of resumes already done in it) or None, whether pages are leased to others)"""
+		now = time.time()
+		with self.transaction() as connection:
+			end = self.end()
+			row = connection.execute(
+				"SELECT start, state, worker FROM pages WHERE (state = 'pending' OR (state = 'leased' AND lease_until < ?)) "
+				"AND (? IS NULL OR start < ?) ORDER BY start LIMIT 1", (now, end, end)
+			).fetchone()
+			if row is None:
+				leased = connection.execute("SELECT COUNT(*) FROM pages WHERE state = 'leased'").fetchone()[0]
+				return None, leased > 0
+			offset, state, worker = row
+			if state == 'leased':
+				logging.warn('Lease of search page at index %d by %s expired, giving it to %s', offset, worker, self.worker)
+			connection.execute(
+				"UPDATE pages SET state = 'leased', worker = ?, lease_until = ? WHERE start = ?",
+				(self.worker, now + LEASE_TIME, offset)
+			)
+			done = [row[0] for row in connection.execute('SELECT id FROM resumes WHERE start = ?', (offset,))]
+		return (offset, done), False
+
+	def heartbeat(self):
+		self.connection.execute(
+			"UPDATE pages SET lease_until = ? WHERE worker = ? AND state = 'leased'",
+			(time.time() + LEASE_TIME, self.worker)
+		)
+
+	def resume_done(self, offset, idd):
+		self.connection.execute('INSERT OR IGNORE INTO resumes VALUES (?, ?)', (offset, idd))
+
+	def release(self, offset):
+		self.connection.execute("UPDATE pages SET state = 'pending', worker = NULL WHERE start = ?", (offset,))
+
+	def completed(self, offset):
+		self.connection.execute("UPDATE pages SET state = 'done', worker = NULL WHERE start = ?", (offset,))
+
+	def failed(self, offset):
+		with self.transaction() as connection:
+			failures = connection.execute('SELECT failures FROM pages WHERE start = ?', (offset,)).fetchone()[0] + 1
+			if self.is_past_end(offset):
+				# no results there
+				state = 'done'
+			elif failures < MAX_PAGE_FAILURES:
+				logging.error('Putting back search page at index %d to retry later', offset)
+				state = 'pending'
+			else:
+				logging.error('Search page at index %d failed %d times, abandoning it', offset, failures)
+				state = 'abandoned'
+			connection.execute(
+				'UPDATE pages SET state = ?, worker = NULL, failures = ? WHERE start = ?',
+				(state, failures, offset)
+			)
+
+	def results_end(self, end):
+		with self.transaction() as connection:
+			if not self.is_past_end(end):
+				logging.info('Search results end at index %d', end)
+				connection.execute("INSERT OR REPLACE INTO crawl VALUES ('end', ?)", (end,))
+
+	def is_finished(self):
+		end = self.end()
+		row = self.connection.execute(
+			"SELECT COUNT(*) FROM pages WHERE state != 'done' AND (? IS NULL OR start < ?)", (end, end)
+		).fetchone()
+		return row[0] == 0
+
+	def status(self):
+		"""Returns # of pages per state and where search results end"""
+		states = dict(self.connection.execute('SELECT state, COUNT(*) FROM pages GROUP BY state'))
+		return {'pages': states, 'end': self.end()}
+
+	def close(self):
+		for connection in self.connections.values():
+			connection.close()
+		self.connections = {}
+
+class RemoteFrontier(Frontier):
+	"""Frontier served by the frontier command on another host"""
+	def __init__(self, url, worker=None):
+		super(RemoteFrontier, self).__init__(worker)
+		self.url = url.rstrip('/')
+
+	def call(self, method, *args):
+		attempts = 0
+		while True:
+			try:
+				response = requests.post(self.url + '/' + method, json={'worker': self.worker, 'args': args}, timeout=FRONTIER_TIMEOUT)
+				response.raise_for_status()
+				return response.json()['result']
+			except (requests.Timeout, requests.ConnectionError):
+				attempts += 1
+				if attempts == FRONTIER_ATTEMPTS:
+					raise
+				logging.error('Unable to reach frontier at %s, attempt #%d. Retrying...', self.url, attempts)
+				time.sleep(attempts)
+
+	def take(self):
+		page, others_leased = self.call('take')
+		return (tuple(page) if page is not None else None), others_leased
+
+	def heartbeat(self):
+		self.call('heartbeat')
+
+	def is_past_end(self, offset):
+		return self.call('is_past_end', offset)
+
+	def resume_done(self, offset, idd):
+		self.call('resume_done', offset, idd)
+
+	def release(self, offset):
+		self.call('release', offset)
+
+	def completed(self, offset):
+		self.call('completed', offset)
+
+	def failed(self, offset):
+		self.call('failed', offset)
+
+	def results_end(self, end):
+		self.call('results_end', end)
+
+	def is_finished(self):
+		return self.call('is_finished')
+
+class FrontierHandler(BaseHTTPRequestHandler):
+	"""Serves SqliteFrontier to RemoteFrontier, the path is the method called"""
+	METHODS = ['take', 'heartbeat', 'is_past_end', 'resume_done', 'release', 'completed', 'failed', 'results_end', 'is_finished']
+
+	def log_message(self, format, *args):
+		logging.debug(format, *args)
+
+	def send_json(self, obj, status=200):
+		body = json.dumps(obj).encode('utf-8')
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		if self.path != '/status':
+			self.send_error(404)
+			return
+		frontier = SqliteFrontier(self.server.filename)
+		try:
+			self.send_json(frontier.status())
+		finally:
+			frontier.close()
+
+	def do_POST(self):
+		method = self.path.strip('/')
+		if method not in self.METHODS:
+			self.send_error(404)
+			return
+		request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+		frontier = SqliteFrontier(self.server.filename, request['worker'])
+		try:
+			self.send_json({'result': getattr(frontier, method)(*request['args'])})
+		finally:
+			frontier.close()
@@ -0,0 +1,320 @@
+"""Inverted index of scraped resumes, see the index command
+
+NumPy is needed here only, this module is imported once an index is built or queried
+"""
+import argparse
+import hashlib
+import logging
+import json
+import time
+import re
+import os
+
+from .cache import atomic_write
+from .outputs import read_results, results_format
+from .parsing import loads
+
+# INVERTED INDEX (terms of scraped resumes to the resumes listing them, see InvertedIndex)
+# NumPy is needed for the index command only
+try:
+	import numpy
+except ImportError:
+	numpy = None
+INDEX_MANIFEST = 'index.json'
+SKILL_TERM = 'skill'
+TITLE_TERM = 'title'
+DEGREE_TERM = 'degree'
+INDEX_FIELDS = [SKILL_TERM, TITLE_TERM, DEGREE_TERM]
+# arrays of an index and their types
+INDEX_ARRAYS = {
+	'ids': 'S',
+	'term_field': 'int8',
+	'offsets': 'int64',
+	'postings': 'int32',
+	'job_doc': 'int32',
+	'job_title': 'int32',
+	'job_start': 'int32',
+	'job_end': 'int32'
+}
+# job dates are kept as months since year 0
+UNKNOWN_MONTH = -1
+PRESENT_MONTH = 2 ** 31 - 1
+MONTHS = {month: idx + 1 for idx, month in enumerate(['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'])}
+YEAR = re.compile(r'\b(\d{4})\b')
+# histograms of jobs by
+START_DATE = 'start'
+END_DATE = 'end'
+ACTIVE = 'active'
+
+def normalize_term(term):
+	return ' '.join(term.lower().split()) if term else ''
+
+def month_number(date):
+	"""Months since year 0 of a resume date e.g June 2012 or 2012
+
+	PRESENT_MONTH for Present, UNKNOWN_MONTH if it has no year
+	"""
+	if not date:
+		return UNKNOWN_MONTH
+	if date.strip().lower() == 'present':
+		return PRESENT_MONTH
+	year = YEAR.search(date)
+	if year is None:
+		return UNKNOWN_MONTH
+	return int(year.group(1)) * 12 + MONTHS.get(date.split()[0][:3].lower(), 1) - 1
+
+def resume_terms(resume):
+	"""(field, term) indexed of a resume dict and its jobs as (title, start month, end month)"""
+	terms = set()
+	for skill in resume.get('skills') or []:
+		terms.add((SKILL_TERM, normalize_term(skill['skill'])))
+	for school in resume.get('schools') or []:
+		terms.add((DEGREE_TERM, normalize_term(school['degree'])))
+	jobs = []
+	for job in resume.get('jobs') or []:
+		title = normalize_term(job['title'])
+		terms.add((TITLE_TERM, title))
+		jobs.append((title, month_number(job['start_date']), month_number(job['end_date'])))
+	return [(field, term) for field, term in terms if term], jobs
+
+def prefix_digest(filename, size):
+	"""SHA-1 of the first size bytes of filename"""
+	digest = hashlib.sha1()
+	with open(filename, 'rb') as f:
+		while size > 0:
+			chunk = f.read(min(size, 1024 * 1024))
+			if not chunk:
+				break
+			digest.update(chunk)
+			size -= len(chunk)
+	return digest.hexdigest()
+
+class InvertedIndex:
+	"""Skills, job titles and degrees of scraped resumes, each to the resumes listing it
+
+	Kept in a directory as NumPy arrays memory-mapped once opened. Resumes are
+	numbered (doc #s) and postings of all terms are stored one after the other,
+	sorted by term then doc #, with offsets of where those of each term start.
+	Jobs of all resumes are kept with their title and dates for histograms. The
+	manifest names the arrays of the latest update, so readers always see a
+	whole one
+	"""
+	def __init__(self, directory):
+		self.directory = directory
+		self.load()
+
+	def load(self):
+		filename = os.path.join(self.directory, INDEX_MANIFEST)
+		if os.path.exists(filename):
+			with open(filename, 'r') as f:
+				self.manifest = json.load(f)
+		else:
+			self.manifest = {'generation': 0, 'terms': {field: {} for field in INDEX_FIELDS}, 'sources': {}}
+		self.arrays = {}
+		for name, dtype in INDEX_ARRAYS.items():
+			if self.manifest['generation']:
+				self.arrays[name] = numpy.load(self.array_filename(name, self.manifest['generation']), mmap_mode='r')
+			else:
+				self.arrays[name] = numpy.zeros(1 if name == 'offsets' else 0, dtype)
+		self.term_names = {}
+		self.posting_terms = None
+
+	def array_filename(self, name, generation):
+		return os.path.join(self.directory, '%s-%d.npy' % (name, generation))
+
+	def update(self, filenames):
+		"""Add resumes of results files, only those added since they were last indexed are read
+
+		A resume indexed before is replaced by its latest version. Results files
+		are only taken to be appended to if they are the same file as before
+		(inode) starting with the very bytes indexed then, files rewritten since
+		(e.g by merge or reparse) are read again from the start
+		"""
+		terms = self.manifest['terms']
+		term_field = list(self.arrays['term_field'])
+		ids = [idd.decode('utf-8') for idd in self.arrays['ids']]
+		docs = {idd: doc for doc, idd in enumerate(ids)}
+		# doc # to (term #s, jobs) of resumes read now, a later version of one wins
+		read = {}
+		for filename in filenames:
+			source = self.manifest['sources'].get(os.path.abspath(filename))
+			skip = source['resumes'] if self.is_appended(filename, source) else 0
+			n = 0
+			for line in read_results(filename, results_format(filename)):
+				n += 1
+				if n <= skip:
+					continue
+				resume = loads(line)
+				doc = docs.get(resume['id'])
+				if doc is None:
+					doc = docs[resume['id']] = len(ids)
+					ids.append(resume['id'])
+				resume_term_ids = []
+				fields, jobs = resume_terms(resume)
+				for field, term in fields:
+					term_id = terms[field].get(term)
+					if term_id is None:
+						term_id = terms[field][term] = len(term_field)
+						term_field.append(INDEX_FIELDS.index(field))
+					resume_term_ids.append(term_id)
+				read[doc] = (resume_term_ids, [(terms[TITLE_TERM].get(title, -1), start, end) for title, start, end in jobs])
+			stat = os.stat(filename)
+			self.manifest['sources'][os.path.abspath(filename)] = {
+				'resumes': n,
+				'size': stat.st_size,
+				'inode': stat.st_ino,
+				'digest': prefix_digest(filename, stat.st_size)
+			}
+			logging.info('Indexed %d resumes of %s', n - skip, filename)
+
+		changed = numpy.array(sorted(read), dtype=numpy.int32)
+		old_postings = self.arrays['postings']
+		old_terms = numpy.repeat(numpy.arange(len(self.arrays['offsets']) - 1, dtype=numpy.int32), numpy.diff(self.arrays['offsets']))
+		keep = ~numpy.isin(old_postings, changed)
+		new_terms = [term_id for doc in changed for term_id in read[doc][0]]
+		new_docs = [doc for doc in changed for _ in read[doc][0]]
+		posting_terms = numpy.concatenate([old_terms[keep], numpy.array(new_terms, dtype=numpy.int32)])
+		postings = numpy.concatenate([old_postings[keep], numpy.array(new_docs, dtype=numpy.int32)])
+		order = numpy.lexsort((postings, posting_terms))
+		offsets = numpy.zeros(len(term_field) + 1, dtype=numpy.int64)
+		numpy.cumsum(numpy.bincount(posting_terms, minlength=len(term_field)), out=offsets[1:])
+
+		keep = ~numpy.isin(self.arrays['job_doc'], changed)
+		new_jobs = numpy.array([(doc,) + job for doc in changed for job in read[doc][1]], dtype=numpy.int64).reshape(-1, 4)
+		arrays = {
+			'ids': numpy.array([idd.encode('utf-8') for idd in ids], dtype='S'),
+			'term_field': numpy.array(term_field, dtype=numpy.int8),
+			'offsets': offsets,
+			'postings': postings[order],
+			'job_doc': numpy.concatenate([self.arrays['job_doc'][keep], new_jobs[:, 0].astype(numpy.int32)]),
+			'job_title': numpy.concatenate([self.arrays['job_title'][keep], new_jobs[:, 1].astype(numpy.int32)]),
+			'job_start': numpy.concatenate([self.arrays['job_start'][keep], new_jobs[:, 2].astype(numpy.int32)]),
+			'job_end': numpy.concatenate([self.arrays['job_end'][keep], new_jobs[:, 3].astype(numpy.int32)])
+		}
+		self.save(arrays)
+
+	def is_appended(self, filename, source):
+		"""Whether filename only had resumes appended since it was indexed as source"""
+		if source is None or 'digest' not in source:
+			return False
+		stat = os.stat(filename)
+		if stat.st_ino != source['inode'] or stat.st_size < source['size']:
+			return False
+		return prefix_digest(filename, source['size']) == source['digest']
+
+	def save(self, arrays):
+		os.makedirs(self.directory, exist_ok=True)
+		previous = self.manifest['generation']
+		self.manifest['generation'] = generation = previous + 1
+		for name, array in arrays.items():
+			numpy.save(self.array_filename(name, generation), array.astype(INDEX_ARRAYS[name], copy=False))
+		filename = os.path.join(self.directory, INDEX_MANIFEST)
+		# arrays of an update are only seen once all are written
+		with atomic_write(filename) as tmp_filename:
+			with open(tmp_filename, 'w') as f:
+				json.dump(self.manifest, f)
+		self.load()
+		if previous:
+			for name in INDEX_ARRAYS:
+				os.remove(self.array_filename(name, previous))
+
+	def num_resumes(self):
+		return len(self.arrays['ids'])
+
+	def term_id(self, field, term):
+		return self.manifest['terms'][field].get(normalize_term(term))
+
+	def term_name(self, term_id):
+		if not self.term_names:
+			self.term_names = {term_id: term for field in INDEX_FIELDS for term, term_id in self.manifest['terms'][field].items()}
+		return self.term_names[term_id]
+
+	def postings(self, field, term):
+		"""Sorted doc #s of resumes listing term in field"""
+		term_id = self.term_id(field, term)
+		if term_id is None:
+			return numpy.zeros(0, numpy.int32)
+		offsets = self.arrays['offsets']
+		return self.arrays['postings'][offsets[term_id]:offsets[term_id + 1]]
+
+	def matching(self, where):
+		"""Sorted doc #s of resumes listing every (field, term) of where"""
+		docs = None
+		for field, term in where:
+			postings = self.postings(field, term)
+			docs = postings if docs is None else numpy.intersect1d(docs, postings, assume_unique=True)
+		return numpy.arange(self.num_resumes(), dtype=numpy.int32) if docs is None else docs
+
+	def resume_ids(self, docs):
+		return [idd.decode('utf-8') for idd in self.arrays['ids'][docs]]
+
+	def doc_mask(self, docs):
+		mask = numpy.zeros(self.num_resumes(), dtype=bool)
+		mask[docs] = True
+		return mask
+
+	def frequency(self, field, terms):
+		"""# of resumes listing each of terms in field"""
+		counts = numpy.diff(self.arrays['offsets'])
+		term_ids = [self.term_id(field, term) for term in terms]
+		return numpy.array([0 if term_id is None else counts[term_id] for term_id in term_ids], dtype=numpy.int64)
+
+	def top(self, field, n=10, docs=None):
+		"""n terms of field listed by the most resumes (of docs if given) as [(term, # of resumes)]"""
+		if docs is None:
+			counts = numpy.diff(self.arrays['offsets'])
+		else:
+			if self.posting_terms is None:
+				offsets = self.arrays['offsets']
+				self.posting_terms = numpy.repeat(numpy.arange(len(offsets) - 1, dtype=numpy.int32), numpy.diff(offsets))
+			counts = numpy.bincount(self.posting_terms[self.doc_mask(docs)[self.arrays['postings']]], minlength=len(self.arrays['term_field']))
+		counts = numpy.where(self.arrays['term_field'] == INDEX_FIELDS.index(field), counts, 0)
+		top = numpy.argsort(-counts, kind='stable')[:n]
+		return [(self.term_name(int(term_id)), int(counts[term_id])) for term_id in top if counts[term_id] > 0]
+
+	def cooccurrence(self, field, terms, other_field, other_terms):
+		"""Matrix of # of resumes listing both terms[i] in field and other_terms[j] in other_field"""
+		other = [self.postings(other_field, term) for term in other_terms]
+		labels = numpy.repeat(numpy.arange(len(other_terms)), [len(postings) for postings in other])
+		joined = numpy.concatenate(other) if other else numpy.zeros(0, numpy.int32)
+		matrix = numpy.zeros((len(terms), len(other_terms)), dtype=numpy.int64)
+		for idx, term in enumerate(terms):
+			matrix[idx] = numpy.bincount(labels[self.doc_mask(self.postings(field, term))[joined]], minlength=len(other_terms))
+		return matrix
+
+	def histogram(self, date=START_DATE, docs=None, titles=None):
+		"""# of jobs per year by when they started, ended or were held (ACTIVE), returns (years, counts)
+
+		Only jobs of resumes docs and jobs titled any of titles if given
+		"""
+		selected = numpy.ones(len(self.arrays['job_doc']), dtype=bool)
+		if docs is not None:
+			selected &= self.doc_mask(docs)[self.arrays['job_doc']]
+		if titles is not None:
+			term_ids = [self.term_id(TITLE_TERM, title) for title in titles]
+			selected &= numpy.isin(self.arrays['job_title'], [term_id for term_id in term_ids if term_id is not None])
+		now = time.localtime()
+		start = self.arrays['job_start'][selected]
+		end = self.arrays['job_end'][selected]
+		end = numpy.where(end == PRESENT_MONTH, now.tm_year * 12 + now.tm_mon - 1, end)
+		if date == ACTIVE:
+			# a job without an end date is taken to be held just when it started
+			end = numpy.where(end == UNKNOWN_MONTH, start, end)
+			known = (start != UNKNOWN_MONTH) & (end >= start)
+			start = start[known] // 12
+			end = end[known] // 12
+		else:
+			months = start if date == START_DATE else end
+			start = end = months[(months != UNKNOWN_MONTH) & (months != PRESENT_MONTH)] // 12
+		if len(start) == 0:
+			return numpy.zeros(0, numpy.int64), numpy.zeros(0, numpy.int64)
+		first = start.min()
+		# +1 where jobs start and -1 the year after they end, summed up
+		changes = numpy.bincount(start - first, minlength=end.max() - first + 2) - numpy.bincount(end - first + 1, minlength=end.max() - first + 2)
+		return numpy.arange(first, end.max() + 1), numpy.cumsum(changes)[:-1]
+
+def parse_where(value):
+	field, _, term = value.partition('=')
+	if field not in INDEX_FIELDS or not term:
+		raise argparse.ArgumentTypeError('expected <field>=<term> with field one of %s' % ', '.join(INDEX_FIELDS))
+	return field, term
@@ -0,0 +1,150 @@
+"""Results files of scraped resumes in every output format (see --format)
+
+zstandard and pyarrow are only imported once a format needing them is used,
+so worker processes writing JSON lines do not pay for loading them
+"""
+import importlib.util
+import json
+import gzip
+
+from .parsing import dumps
+from .stats import timed, count, WRITE, ENQUEUE, RESUMES_WRITTEN
+
+# OUTPUT FORMATS
+JSONL = 'jsonl'
+JSONL_GZIP = 'jsonl.gz'
+JSONL_ZSTD = 'jsonl.zst'
+PARQUET = 'parquet'
+ARROW = 'arrow'
+OUTPUT_EXTENSIONS = {
+	JSONL: '.json',
+	JSONL_GZIP: '.json.gz',
+	JSONL_ZSTD: '.json.zst',
+	PARQUET: '.parquet',
+	ARROW: '.arrow'
+}
+# formats needing optional libraries are offered when those are installed
+OUTPUT_FORMATS = [JSONL, JSONL_GZIP]
+if importlib.util.find_spec('zstandard') is not None:
+	OUTPUT_FORMATS.append(JSONL_ZSTD)
+if importlib.util.find_spec('pyarrow') is not None:
+	OUTPUT_FORMATS.extend([PARQUET, ARROW])
+# rows per record batch of columnar formats, max resumes taken off the queue per write by the writer process
+WRITE_BATCH_SIZE = 500
+
+def resume_schema():
+	"""Arrow schema of Resume.toJSON for the columnar formats"""
+	import pyarrow
+	strings = pyarrow.list_(pyarrow.string())
+	dates = [('start_date', pyarrow.string()), ('end_date', pyarrow.string())]
+	return pyarrow.schema([
+		('id', pyarrow.string()),
+		('summary', strings),
+		('jobs', pyarrow.list_(pyarrow.struct([('title', pyarrow.string()), ('company', pyarrow.string())] + dates + [('details', strings)]))),
+		('schools', pyarrow.list_(pyarrow.struct([('degree', pyarrow.string()), ('school_name', pyarrow.string())] + dates))),
+		('skills', pyarrow.list_(pyarrow.struct([('skill', pyarrow.string()), ('experience', pyarrow.string())]))),
+		('additional', strings)
+	])
+
+class JSONLinesOutput:
+	"""Resumes as JSON lines, gzip and zstd compressed ones can be appended to as well"""
+	def __init__(self, filename, output_format=JSONL, override=False):
+		mode = 'w' if override else 'a'
+		if output_format == JSONL_GZIP:
+			self.file = gzip.open(filename, mode + 't', encoding='utf-8')
+		elif output_format == JSONL_ZSTD:
+			import zstandard
+			self.file = zstandard.open(filename, mode + 't', encoding='utf-8')
+		else:
+			self.file = open(filename, mode, encoding='utf-8')
+
+	def write(self, idd, line):
+		with timed(WRITE):
+			self.file.write(line + "\n")
+		count(RESUMES_WRITTEN)
+
+	def close(self):
+		self.file.close()
+
+class ColumnarOutput:
+	"""Resumes as a Parquet or Arrow IPC file, written a record batch at a time
+
+	Neither can be appended to so the file is always written anew
+	"""
+	def __init__(self, filename, output_format=PARQUET):
+		import pyarrow.ipc
+		import pyarrow.parquet
+		self.schema = resume_schema()
+		if output_format == PARQUET:
+			self.writer = pyarrow.parquet.ParquetWriter(filename, self.schema, compression='zstd')
+		else:
+			self.writer = pyarrow.ipc.new_file(filename, self.schema, options=pyarrow.ipc.IpcWriteOptions(compression='zstd'))
+		self.rows = []
+
+	def write(self, idd, line):
+		self.rows.append(json.loads(line))
+		count(RESUMES_WRITTEN)
+		if len(self.rows) >= WRITE_BATCH_SIZE:
+			self.flush()
+
+	def flush(self):
+		if self.rows:
+			import pyarrow
+			with timed(WRITE):
+				self.writer.write_batch(pyarrow.RecordBatch.from_pylist(self.rows, schema=self.schema))
+			self.rows = []
+
+	def close(self):
+		self.flush()
+		self.writer.close()
+
+class QueueOutput:
+	"""Sends serialized resumes to the writer process (see write_resumes)"""
+	def __init__(self, queue, filename):
+		self.queue = queue
+		self.filename = filename
+
+	def write(self, idd, line):
+		# blocks when the writer falls behind
+		with timed(ENQUEUE):
+			self.queue.put((self.filename, idd, line))
+
+	def close(self):
+		pass
+
+def open_output(filename, output_format=JSONL, override=False):
+	if output_format in (PARQUET, ARROW):
+		return ColumnarOutput(filename, output_format)
+	return JSONLinesOutput(filename, output_format, override)
+
+def results_format(filename):
+	"""Output format of a results file going by its extension"""
+	matches = [output_format for output_format, extension in OUTPUT_EXTENSIONS.items() if filename.endswith(extension)]
+	return max(matches, key=lambda output_format: len(OUTPUT_EXTENSIONS[output_format])) if matches else JSONL
+
+def read_results(filename, output_format=JSONL):
+	"""Generates the serialized resumes of a results file"""
+	if output_format == PARQUET:
+		import pyarrow.parquet
+		for batch in pyarrow.parquet.ParquetFile(filename).iter_batches(WRITE_BATCH_SIZE):
+			for row in batch.to_pylist():
+				yield dumps(row)
+	elif output_format == ARROW:
+		import pyarrow.ipc
+		reader = pyarrow.ipc.open_file(filename)
+		for idx in range(reader.num_record_batches):
+			for row in reader.get_batch(idx).to_pylist():
+				yield dumps(row)
+	else:
+		if output_format == JSONL_GZIP:
+			f = gzip.open(filename, 'rt', encoding='utf-8')
+		elif output_format == JSONL_ZSTD:
+			import zstandard
+			f = zstandard.open(filename, 'rt', encoding='utf-8')
+		else:
+			f = open(filename, 'r', encoding='utf-8')
+		with f:
+			for line in f:
+				line = line.strip()
+				if line:
+					yield line
@@ -0,0 +1,263 @@
+"""Parsing of resume pages into Resume models and their serialization
+
+Only needs BeautifulSoup, so resume pages can be parsed without loading selenium
+"""
+from bs4 import BeautifulSoup, SoupStrainer
+import json
+import logging
+
+from .stats import timed, PARSE, PRODUCE_SUMMARY, PRODUCE_WORK_EXPERIENCE, PRODUCE_EDUCATION, PRODUCE_SKILLS, PRODUCE_ADDITIONAL
+
+# RESUME SUBSECTIONS TITLE (in normal setting)
+WORK_EXPERIENCE = 'Work Experience'
+EDUCATION = 'Education'
+SKILLS = 'Skills'
+CERTIFICATIONS = 'Certifications'
+ADDITIONAL_INFORMATION = 'Additional Information'
+
+# INDICES
+SKILL_NAME_INDEX = 0
+SKILL_EXP_INDEX = 1
+INFO_CONTENT_DETAILS_INDEX = 0
+
+# PARSERS
+HTML_PARSER = 'html.parser'
+LXML_PARSER = 'lxml'
+try:
+	import lxml
+	PARSERS = [HTML_PARSER, LXML_PARSER]
+except ImportError:
+	PARSERS = [HTML_PARSER]
+# only resume body is needed out of a resume page
+RESUME_BODY_STRAINER = SoupStrainer('div', attrs={"class":"rezemp-ResumeDisplay-body"})
+
+# SERIALIZATION (C-accelerated orjson is used when installed, json otherwise)
+try:
+	import orjson
+except ImportError:
+	orjson = None
+# made once, json.dumps makes a new encoder on every call given any options.
+# Compact and non-ASCII kept as is (UTF-8) like orjson, so both give the same bytes
+JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+# resume models are slotted records, asdict spells out their fields (in serialized order)
+# so that turning them into plain dicts for the encoder does not have to look anything up
+class Resume:
+	__slots__ = ('id', 'summary', 'jobs', 'schools', 'skills', 'additional')
+
+	def __init__ (self, idd, **kwargs):
+		self.id = idd
+		self.summary = kwargs.get('summary')
+		self.jobs = kwargs.get('jobs')
+		self.schools = kwargs.get('schools')
+		self.skills = kwargs.get('skills')
+		self.additional = kwargs.get('additional')
+
+	def asdict(self):
+		return {
+			'id': self.id,
+			'summary': self.summary,
+			'jobs': None if self.jobs is None else [job.asdict() for job in self.jobs],
+			'schools': None if self.schools is None else [school.asdict() for school in self.schools],
+			'skills': None if self.skills is None else [skill.asdict() for skill in self.skills],
+			'additional': self.additional
+		}
+
+	def toJSON(self):
+		return dumps(self.asdict())
+
+class Summary:
+	__slots__ = ('details',)
+
+	def __init__(self, details):
+		self.details = details
+
+	def asdict(self):
+		return {'details': self.details}
+
+class Job:
+	__slots__ = ('title', 'company', 'start_date', 'end_date', 'details')
+
+	def __init__(self, title, company, work_dates, details):
+		self.title = title
+		self.company = company
+
+		dates = work_dates.split(' to ')
+		self.start_date = dates[0]
+		self.end_date = '' if len(dates) == 1 else dates[1]
+
+		self.details = details
+
+	def asdict(self):
+		return {
+			'title': self.title,
+			'company': self.company,
+			'start_date': self.start_date,
+			'end_date': self.end_date,
+			'details': self.details
+		}
+
+class School:
+	__slots__ = ('degree', 'school_name', 'start_date', 'end_date')
+
+	def __init__(self, degree, school_name, grad_date):
+		self.degree = degree
+		self.school_name = school_name
+		self.start_date = ''
+		self.end_date = ''
+
+		if grad_date is not None:
+			dates = grad_date.split(' to ')
+			self.start_date = dates[0]
+			self.end_date = '' if len(dates) == 1 else dates[1]
+
+	def asdict(self):
+		return {
+			'degree': self.degree,
+			'school_name': self.school_name,
+			'start_date': self.start_date,
+			'end_date': self.end_date
+		}
+
+class Skill:
+	__slots__ = ('skill', 'experience')
+
+	def __init__(self, skill, experience):
+		self.skill = skill
+		self.experience = experience
+
+	def asdict(self):
+		return {'skill': self.skill, 'experience': self.experience}
+
+class Info:
+	__slots__ = ('details',)
+
+	def __init__(self, details):
+		self.details = details
+
+	def asdict(self):
+		return {'details': self.details}
+
+def dumps(obj):
+	"""Compact JSON of plain dicts, lists and strings, with orjson when installed"""
+	if orjson is not None:
+		return orjson.dumps(obj).decode('utf-8')
+	return JSON_ENCODER.encode(obj)
+
+def loads(line):
+	if orjson is not None:
+		return orjson.loads(line)
+	return json.loads(line)
+
+def produce_work_experience(worksection):
+	work_experience = worksection.find_all('div', class_='rezemp-WorkExperience')
+	jobs = []
+	for experience in work_experience:
+		job_title = experience.find('div', class_='rezemp-u-h4').get_text()
+		company_and_dates = experience.find('div', class_='rezemp-WorkExperience-subtitle')
+
+		company_name = company_and_dates.find('span', class_='icl-u-textBold').get_text()
+		work_dates = company_and_dates.find('div', class_='icl-u-textColor--tertiary').get_text()
+		job_details = []
+		if len(experience.contents) == 3:
+			# there are job details
+			details = experience.contents[-1]
+			job_details = [detail for detail in details.stripped_strings]
+
+		jobs.append(Job(job_title, company_name, work_dates, job_details))
+	return jobs
+
+def produce_education(edusection):
+	content = edusection.find('div', class_='rezemp-ResumeDisplaySection-content')
+	schools = []
+	for school in content.children:
+		degree = school.find(class_ = "rezemp-ResumeDisplay-itemTitle")
+		if degree is not None:
+			degree = degree.get_text(' ', strip=True)
+		university_details = school.find(class_="rezemp-ResumeDisplay-university")
+		school_name = university_details.find('span', class_='icl-u-textBold')
+		if school_name is not None:
+			school_name = school_name.get_text()
+		date = school.find(class_="rezemp-ResumeDisplay-date")
+		if date is not None:
+			date = date.get_text()
+		schools.append(School(degree, school_name, date))
+	return schools
+
+def produce_skills(skillsection):
+	content = skillsection.find('div', class_='rezemp-ResumeDisplaySection-content')
+	skills = []
+	for skill_details in content.children:
+		if skill_details.string is None:
+			# there is no string attribute,
+			# so it must be nested and so must be an actual skill
+			# find skill detail spans
+			skill_spans = skill_details.span.find_all('span')
+			skill = skill_spans[SKILL_NAME_INDEX].get_text()
+			experience = ''
+			if len(skill_spans) == 2:
+				experience = skill_spans[SKILL_EXP_INDEX].get_text()
+			skills.append(Skill(skill, experience))
+	return skills
+
+# in case if needed later on in the future
+def produce_certifications_license():
+	pass
+
+def produce_additional(infosection):
+	content = infosection.find('div', class_='rezemp-ResumeDisplaySection-content')
+	# only one div in content
+	info_details = content.contents[INFO_CONTENT_DETAILS_INDEX]
+	return [detail for detail in info_details.stripped_strings]
+
+
+def produce_summary(summarysection):
+	summary_details = []
+	if len(summarysection) == 4:
+		summary_details = summarysection.contents[-1]
+		summary_details = [detail for detail in summary_details.stripped_strings]
+
+	return summary_details
+
+def find_resume_body(page_source, parser=HTML_PARSER):
+	"""Returns resume body div of page_source as a BeautifulSoup Tag
+
+	html.parser builds the tree of the whole page, others only build the
+	tree of the resume body and skip everything else in the page
+	"""
+	if parser == HTML_PARSER:
+		soup = BeautifulSoup(page_source, HTML_PARSER)
+	else:
+		soup = BeautifulSoup(page_source, parser, parse_only=RESUME_BODY_STRAINER)
+	return soup.find('div', attrs={"class":"rezemp-ResumeDisplay-body"})
+
+def parse_resume(idd, page_source, parser=HTML_PARSER):
+	with timed(PARSE):
+		resume_body = find_resume_body(page_source, parser)
+	summary = resume_body.contents[0]
+	resume_subsections = resume_body.find_all('div', attrs={"class":"rezemp-ResumeDisplaySection"})
+
+	resume_details = {}
+	with timed(PRODUCE_SUMMARY):
+		resume_details['summary'] = produce_summary(summary)
+	for subsection in resume_subsections:
+		children = subsection.contents
+		subsection_title = children[0].get_text()
+		if subsection_title == WORK_EXPERIENCE:
+			with timed(PRODUCE_WORK_EXPERIENCE):
+				resume_details['jobs'] = produce_work_experience(subsection)
+		elif subsection_title == EDUCATION:
+			with timed(PRODUCE_EDUCATION):
+				resume_details['schools'] = produce_education(subsection)
+		elif subsection_title == SKILLS:
+			with timed(PRODUCE_SKILLS):
+				resume_details['skills'] = produce_skills(subsection)
+		elif subsection_title == CERTIFICATIONS:
+			produce_certifications_license()
+		elif subsection_title == ADDITIONAL_INFORMATION:
+			with timed(PRODUCE_ADDITIONAL):
+				resume_details['additional'] = produce_additional(subsection)
+		else:
+			logging.warn('ID %s - Subsection title is %s', idd, subsection_title)
+
+	return Resume(idd, **resume_details)
@@ -0,0 +1,2278 @@
+from selenium.webdriver import firefox, chrome
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+import requests
+import time
+import json
+from random import randint
+from time import sleep
+import os
+import argparse
+from urllib.parse import quote_plus, urlencode
+import traceback
+import sys
+import concurrent.futures
+import asyncio
+import multiprocessing
+import platform
+import logging
+import signal
+from queue import Empty, Queue
+import threading
+import cProfile
+from collections import deque
+import hashlib
+import html
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .parsing import parse_resume, dumps, loads, HTML_PARSER, PARSERS
+from .stats import (
+	Stats, set_stats, get_stats, timed, count, STATS_INTERVAL, METRICS_PREFIX,
+	PAGE_LOAD, HTTP_GET, RESUME_WAIT, SERIALIZE,
+	RETRIES, TIMEOUTS, DANGER_ALERTS, THROTTLED, ABANDONED_RESUMES, UNCHANGED_RESUMES,
+	BROWSER_RECYCLES, BROWSER_RESTARTS
+)
+from .outputs import (
+	JSONL, PARQUET, ARROW, OUTPUT_EXTENSIONS, OUTPUT_FORMATS, WRITE_BATCH_SIZE,
+	QueueOutput, open_output, results_format, read_results
+)
+from .cache import CACHE_INDEX, CACHE_SIZE, PageCache, CachingSink, open_page_cache, read_cached_page, atomic_write, connect_sqlite
+from .frontier import FRONTIER_PORT, SqliteFrontier, RemoteFrontier, FrontierHandler
+from .autoscale import AUTOSCALE_INTERVAL, Autoscaler, Retirements, HostUsage, worker_limit, process_tree_rss, can_measure_memory
+
+# SCRAPING NECESSITY
+NUM_INDEED_RESUME_RESULTS = 50
+# hosts can be pointed elsewhere e.g to mock_indeed.py for offline runs
+INDEED_RESUME_HOST = os.environ.get('INDEED_RESUME_HOST', 'https://resumes.indeed.com')
+INDEED_SECURE_HOST = os.environ.get('INDEED_SECURE_HOST', 'https://secure.indeed.com')
+INDEED_RESUME_BASE_URL = INDEED_RESUME_HOST + '/resume/%s'
+INDEED_RESUME_SEARCH_BASE_URL = INDEED_RESUME_HOST + '/search?%s'
+INDEED_LOGIN_URL = INDEED_SECURE_HOST + '/account/login'
+NO_LOGIN_SEARCH_UPPER_LIMIT = 1050
+MAX_PROCESSORS = 4
+
+COUNTRY_CODES = {
+	'canada': 'CA',
+	'united states': 'US'
+}
+
+# SEEN INDEX
+SEEN_INDEX_WAIT = 30
+# used by incremental runs when no --seen-index is given
+DEFAULT_SEEN_INDEX = 'seen-resumes.db'
+
+# INCREMENTAL (resumes are compared by a hash of the text of their body)
+RESUME_BODY_MARKER = 'rezemp-ResumeDisplay-body'
+DIV_TAG = re.compile(r'<(/?)div\b', re.IGNORECASE)
+ANY_TAG = re.compile(r'<[^>]*>')
+
+# cached pages per task of reparse processes
+REPARSE_CHUNK_SIZE = 200
+
+# RETRY QUEUE (resumes that could not be fetched, see RetryQueue)
+# attempts at a resume (the first fetch included) before it is given up on
+RETRY_MAX_ATTEMPTS = 5
+# seconds before the first retry of a resume, doubled on every attempt after
+RETRY_BACKOFF = 30
+# longest wait for retries to come due at the end of a run
+RETRY_WAIT = 300
+
+# RESULT FILE BASE NAME
+OUTPUT_BASE_NAME = 'resume_output_'
+CHECKPOINT_EXTENSION = '.checkpoint'
+
+# max # of resumes waiting for the writer process
+WRITE_QUEUE_SIZE = 1000
+# max # of resumes parsed ahead of the consumer of iter_resumes
+ITER_QUEUE_SIZE = 100
+
+# DRIVERS
+FIREFOX = 'firefox'
+CHROME = 'chrome'
+
+# DRIVER LIFECYCLE (browsers are recycled and restarted by DriverManager)
+# browser crashes in a row before a worker gives up
+MAX_BROWSER_RESTARTS = 3
+
+# AUTO SIZING (mine workers added and retired while a run goes on with --processes auto, see Autoscaler)
+AUTO_PROCESSES = 'auto'
+
+# LEAN BROWSERS (only the document is needed, not what it takes to render it)
+# page loads return once the DOM is ready, waiting on the elements needed is left to us
+LEAN_PAGE_LOAD_STRATEGY = 'eager'
+LEAN_FIREFOX_PREFERENCES = {
+	'permissions.default.image': 2,
+	'permissions.default.stylesheet': 2,
+	'browser.display.use_document_fonts': 0,
+	'gfx.downloadable_fonts.enabled': False,
+	'media.autoplay.default': 5,
+	'privacy.trackingprotection.enabled': True
+}
+LEAN_CHROME_PREFERENCES = {
+	'profile.managed_default_content_settings.images': 2,
+	'profile.managed_default_content_settings.stylesheets': 2,
+	'profile.managed_default_content_settings.fonts': 2,
+	'profile.managed_default_content_settings.media_stream': 2
+}
+# blocked in Chrome through DevTools as its preferences do not cover everything,
+# DevTools settings only hold for the tab they are sent in so every tab opened is set up (see block_urls)
+LEAN_BLOCKED_URLS = ['*.css', '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.mp4']
+
+# EXTRACTION (done in the browser with --extract, so only what is needed is transferred)
+RESUME_LINK_SELECTOR = 'div.rezemp-ResumeSearchCard .icl-TextLink.icl-TextLink--primary.rezemp-u-h4'
+RESUME_LINKS_SCRIPT = """
+var links = document.querySelectorAll(arguments[0]);
+if (links.length === 0) {
+	return null;
+}
+return [
+	Array.prototype.map.call(links, function (link) { return [link, link.href]; }),
+	document.querySelector('.rezemp-pagination-nextbutton') !== null
+];
+"""
+RESUME_BODY_SCRIPT = """
+var body = document.querySelector('div.rezemp-ResumeDisplay-body');
+return body === null ? null : body.outerHTML;
+"""
+
+# USER SIMULATION (resumes clicked open in tabs, see simulation_algorithm)
+RESUME_SHOWN_SCRIPT = "return document.getElementsByClassName('rezemp-ResumeDisplay-body').length > 0"
+# seconds between checks of tabs still loading
+TAB_POLL_INTERVAL = 0.05
+
+# FETCHING (how resume pages are fetched)
+BROWSER_FETCH = 'browser'
+HTTP_FETCH = 'http'
+ASYNC_FETCH = 'async'
+HTTP_POOL_SIZE = 10
+
+# LOGIC
+MAX_RETRIES = 3
+EXPLICIT_MAX_WAIT = 3
+IMPLICIT_MAX_WAIT = 5
+PAGE_LOAD_WAIT = 5
+CTRL_COMMAND = Keys.COMMAND if platform.platform() == 'Darwin' else Keys.CONTROL
+
+# PACING (requests per second to Indeed shared by all processes)
+INITIAL_RATE = 1.0
+MIN_RATE = 0.1
+MAX_RATE = 10.0
+BURST = 5
+# additive increase for every page loaded fine
+RATE_INCREASE = 0.05
+# multiplicative decrease for every throttle signal (timeouts, no results, danger alert)
+RATE_DECREASE = 0.5
+# throttle signals within a round of requests (burst at the rate before the decrease, this many seconds at most)
+# of a decrease count as one, as they are likely answers to requests sent before it
+RATE_DECREASE_COOLDOWN = 5
+
+# ENVIRONMENT
+ENV_USER = 'INDEED_RESUME_USER'
+ENV_PASS = 'INDEED_RESUME_PASSWORD'
+
+# create expected condition that returns True when all is True
+class AllExpectedCondition:
+	def __init__(self, *ecs):
+		self.ecs = ecs
+
+	def __call__(self, driver):
+		for ec in self.ecs:
+			# refer to https://stackoverflow.com/questions/16462177/selenium-expected-conditions-possible-to-use-or
+			if not ec(driver):
+				return False
+		return True
+
+class TokenBucket:
+	"""Token bucket rate limiter shared by processes
+
+	Has to be handed to other processes through inheritance
+	e.g as initargs of a ProcessPoolExecutor, see init_worker
+	"""
+	def __init__(self, rate, burst):
+		self.burst = burst
+		self.lock = multiprocessing.Lock()
+		self.rate = multiprocessing.Value('d', rate, lock=False)
+		self.tokens = multiprocessing.Value('d', burst, lock=False)
+		# monotonic clock is system wide so it can be compared across processes
+		self.updated = multiprocessing.Value('d', time.monotonic(), lock=False)
+
+	def refill(self, now):
+		# assumes lock is held
+		self.tokens.value = min(self.burst, self.tokens.value + (now - self.updated.value) * self.rate.value)
+		self.updated.value = now
+
+	def reserve(self):
+		"""Take a token, returns seconds to wait until it can be used"""
+		with self.lock:
+			self.refill(time.monotonic())
+			self.tokens.value -= 1
+			tokens = self.tokens.value
+			rate = self.rate.value
+		return 0 if tokens >= 0 else -tokens / rate
+
+	def acquire(self):
+		time.sleep(self.reserve())
+
+	async def acquire_async(self):
+		await asyncio.sleep(self.reserve())
+
+class AdaptiveRateLimiter(TokenBucket):
+	"""TokenBucket adapting its rate to how the site is doing (AIMD)
+
+	Rate goes up additively with every page loaded fine and is cut
+	multiplicatively on signs of throttling, for all processes at once
+	"""
+	def __init__(self, rate, burst, min_rate=MIN_RATE, max_rate=MAX_RATE):
+		super(AdaptiveRateLimiter, self).__init__(rate, burst)
+		self.min_rate = min_rate
+		self.max_rate = max_rate
+		self.decreased = multiprocessing.Value('d', 0, lock=False)
+		self.cooldown = multiprocessing.Value('d', 0, lock=False)
+
+	def page_loaded(self):
+		with self.lock:
+			self.refill(time.monotonic())
+			self.rate.value = min(self.max_rate, self.rate.value + RATE_INCREASE)
+
+	def throttled(self, reason):
+		with self.lock:
+			now = time.monotonic()
+			if now - self.decreased.value < self.cooldown.value:
+				# other processes likely saw the same throttling
+				return
+			self.refill(now)
+			# throttling still going on once requests sent before this decrease are answered is cut again
+			self.cooldown.value = min(RATE_DECREASE_COOLDOWN, self.burst / self.rate.value)
+			self.rate.value = max(self.min_rate, self.rate.value * RATE_DECREASE)
+			# spend saved up tokens so that the next request waits
+			self.tokens.value = min(self.tokens.value, 0)
+			self.decreased.value = now
+			rate = self.rate.value
+		logging.warn('Throttled (%s), slowing down to %.2f requests per second', reason, rate)
+
+class Worker:
+	"""What a mine worker goes at the site with, handed down explicitly so that workers sharing a process do not mix
+
+	Requests are paced by rate_limiter, resumes given up on are kept in retry_queue
+	to be fetched again later and retirements are the Autoscaler's asks to stop,
+	each may be None for none
+	"""
+	def __init__(self, rate_limiter=None, retry_queue=None, retirements=None):
+		self.rate_limiter = rate_limiter
+		self.retry_queue = retry_queue
+		self.retirements = retirements
+
+	def wait(self):
+		"""Waits for the rate limit before a request to the site"""
+		if self.rate_limiter is not None:
+			self.rate_limiter.acquire()
+
+	async def wait_async(self):
+		if self.rate_limiter is not None:
+			await self.rate_limiter.acquire_async()
+
+	def page_loaded(self):
+		if self.rate_limiter is not None:
+			self.rate_limiter.page_loaded()
+
+	def throttled(self, reason):
+		count(THROTTLED)
+		if self.rate_limiter is not None:
+			self.rate_limiter.throttled(reason)
+
+	def abandon(self, resume_link, reason):
+		"""Give up on fetching resume_link for now, with a retry queue it is fetched again later"""
+		count(ABANDONED_RESUMES)
+		logging.error('Unable to get resume for ID %s (%s), abandoning fetch', resume_id(resume_link), reason)
+		if self.retry_queue is not None:
+			self.retry_queue.add(resume_link, reason)
+
+	def should_retire(self):
+		"""Whether this worker is to stop, it then leaves what it did not get to to the others"""
+		return self.retirements is not None and self.retirements.take()
+
+# rate limiter and retirements of mine processes, shared objects can only be handed
+# to them by inheritance so init_worker sets these for mine_worker and mine_batch
+rate_limiter = None
+retirements = None
+
+def init_worker(limiter, worker_stats, worker_retirements=None):
+	"""Initializer of mine processes"""
+	global rate_limiter, retirements
+	rate_limiter = limiter
+	set_stats(worker_stats)
+	retirements = worker_retirements
+
+def init_helper(helper_stats):
+	"""Initializer of parser and writer processes
+
+	They are stopped with sentinels once workers are done so nothing is lost, not by Ctrl-C
+	"""
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	set_stats(helper_stats)
+
+def profiled(args, target, *target_args, **target_kwargs):
+	"""Runs target, under cProfile dumping to --profile directory if given"""
+	if args.profile is None:
+		return target(*target_args, **target_kwargs)
+	profile = cProfile.Profile()
+	try:
+		return profile.runcall(target, *target_args, **target_kwargs)
+	finally:
+		os.makedirs(args.profile, exist_ok=True)
+		profile.dump_stats(os.path.join(args.profile, '%s-%d.prof' % (target.__name__, os.getpid())))
+
+def metrics_text(snapshot, rate=None):
+	"""Prometheus text exposition of a Stats snapshot"""
+	lines = [
+		'# HELP %sstage_seconds Time spent per stage' % METRICS_PREFIX,
+		'# TYPE %sstage_seconds summary' % METRICS_PREFIX
+	]
+	for stage, timing in snapshot['stages'].items():
+		lines.append('%sstage_seconds_sum{stage="%s"} %f' % (METRICS_PREFIX, stage, timing['seconds']))
+		lines.append('%sstage_seconds_count{stage="%s"} %d' % (METRICS_PREFIX, stage, timing['count']))
+	lines.append('# HELP %sstage_max_seconds Longest time spent in a stage at once' % METRICS_PREFIX)
+	lines.append('# TYPE %sstage_max_seconds gauge' % METRICS_PREFIX)
+	for stage, timing in snapshot['stages'].items():
+		lines.append('%sstage_max_seconds{stage="%s"} %f' % (METRICS_PREFIX, stage, timing['max']))
+	lines.append('# HELP %sevents_total Retries, timeouts, throttling and resumes' % METRICS_PREFIX)
+	lines.append('# TYPE %sevents_total counter' % METRICS_PREFIX)
+	for counter, value in snapshot['counters'].items():
+		lines.append('%sevents_total{event="%s"} %d' % (METRICS_PREFIX, counter, value))
+	if rate is not None:
+		lines.append('# HELP %srate Requests per second to Indeed' % METRICS_PREFIX)
+		lines.append('# TYPE %srate gauge' % METRICS_PREFIX)
+		lines.append('%srate %f' % (METRICS_PREFIX, rate))
+	return '\n'.join(lines) + '\n'
+
+class MetricsHandler(BaseHTTPRequestHandler):
+	def log_message(self, format, *args):
+		logging.debug(format, *args)
+
+	def do_GET(self):
+		if self.path != '/metrics':
+			self.send_error(404)
+			return
+		body = metrics_text(*self.server.export.current()).encode('utf-8')
+		self.send_response(200)
+		self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+class StatsExport:
+	"""Exports stats of all processes from the main process
+
+	Every STATS_INTERVAL seconds to the --stats JSON file and on request
+	to the Prometheus text endpoint /metrics on --metrics-port
+	"""
+	def __init__(self, args, stats, rate_limiter=None):
+		self.stats = stats
+		self.rate_limiter = rate_limiter
+		self.stats_file = args.stats
+		self.stopped = threading.Event()
+		self.server = None
+		if args.metrics_port is not None:
+			self.server = ThreadingHTTPServer(('', args.metrics_port), MetricsHandler)
+			self.server.daemon_threads = True
+			self.server.export = self
+			threading.Thread(target=self.server.serve_forever, daemon=True).start()
+			logging.info('Serving metrics on port %d', self.server.server_address[1])
+		if self.stats_file is not None:
+			threading.Thread(target=self.run, daemon=True).start()
+
+	def current(self):
+		return self.stats.snapshot(), self.rate_limiter.rate.value if self.rate_limiter is not None else None
+
+	def run(self):
+		while not self.stopped.wait(STATS_INTERVAL):
+			self.write()
+
+	def write(self):
+		snapshot, rate = self.current()
+		snapshot['rate'] = rate
+		with atomic_write(self.stats_file) as tmp_filename:
+			with open(tmp_filename, 'w') as f:
+				json.dump(snapshot, f, indent=2)
+
+	def close(self):
+		self.stopped.set()
+		if self.stats_file is not None:
+			self.write()
+		if self.server is not None:
+			self.server.shutdown()
+		log_stats(self.stats.snapshot())
+
+def log_stats(snapshot):
+	for stage, timing in snapshot['stages'].items():
+		if timing['count']:
+			logging.info('%s: %d times, %.3f seconds in total, %.3f on average, %.3f at most',
+				stage, timing['count'], timing['seconds'], timing['mean'], timing['max'])
+	logging.info(', '.join('%s %d' % (counter, value) for counter, value in snapshot['counters'].items()))
+
+# seconds driver.get took for every page loaded by this process
+page_load_times = []
+
+def log_page_load_times(args):
+	if page_load_times:
+		logging.info('Loaded %d pages in %.3f seconds on average (%s browser)',
+			len(page_load_times), sum(page_load_times) / len(page_load_times), 'lean' if args.lean else 'full')
+
+def go_to_page(worker, driver, url):
+	attempts = 0
+	while attempts < MAX_RETRIES:
+		try:
+			# retries are paced by the slowed down rate
+			worker.wait()
+			if attempts > 0:
+				count(RETRIES)
+			t = time.perf_counter()
+			with timed(PAGE_LOAD):
+				driver.get(url)
+			page_load_times.append(time.perf_counter() - t)
+			worker.page_loaded()
+			return True
+		except TimeoutException:
+			count(TIMEOUTS)
+			worker.throttled('timeout')
+			if attempts != MAX_RETRIES - 1:
+				logging.error('Unable to get to %s in time, attempt #%d. Retrying...', url, attempts + 1)
+			else:
+				logging.error('Unable to get to %s in time and reached maximum tries, aborting...', url)
+			attempts += 1
+	return False
+
+def gen_resume_link_elements(driver):
+	"""Generate IDDs of resume
+
+	Assumes driver already in page with resume IDDs
+	Returns list of WebElement
+	"""
+	resume_links = []
+	try:
+		resume_links = driver.find_elements_by_css_selector(RESUME_LINK_SELECTOR)
+	except TimeoutException:
+		# could not complete in time
+		resume_links = []
+
+	return resume_links
+
+def gen_resume_links(driver, extract=False):
+	"""Generate links to resumes and whether there is a next search page
+
+	Assumes driver already in page with resume IDDs
+	Returns ([(WebElement, href)], bool), with extract in one round trip to the browser
+	"""
+	if extract:
+		try:
+			# wait for results as the implicit wait of finding elements would
+			return WebDriverWait(driver, IMPLICIT_MAX_WAIT).until(
+				lambda driver: driver.execute_script(RESUME_LINKS_SCRIPT, RESUME_LINK_SELECTOR)
+			)
+		except TimeoutException:
+			return [], False
+
+	link_elements = gen_resume_link_elements(driver)
+	if len(link_elements) == 0:
+		return [], False
+	links = [(link, link.get_attribute('href')) for link in link_elements]
+	return links, next_page_button(driver) is not None
+
+def resume_id(resume_link):
+	return resume_link[resume_link.rfind('/') + 1:resume_link.rfind('?')]
+
+def fetch_resume_page(worker, resume_link, driver, extract=False):
+	"""Wait for resume page to load and grab its source
+
+	Assumes driver already navigated to resume_link
+	Returns (IDD, page source) or None if the resume never showed up,
+	with extract only the resume body is taken out of the browser
+	"""
+	idd = resume_id(resume_link)
+	logging.info('Processing resume ID %s', idd)
+	try:
+		with timed(RESUME_WAIT):
+			WebDriverWait(driver, EXPLICIT_MAX_WAIT).until(
+				AllExpectedCondition(
+					EC.visibility_of_any_elements_located((By.CLASS_NAME, 'rezemp-ResumeDisplay-body')),
+					EC.url_to_be(resume_link)
+				)
+			)
+	except TimeoutException:
+		count(TIMEOUTS)
+		worker.throttled('resume did not show up')
+		worker.abandon(resume_link, 'resume did not show up')
+		return None
+
+	if extract:
+		return idd, driver.execute_script(RESUME_BODY_SCRIPT)
+	return idd, driver.page_source
+
+def gen_resume(worker, resume_link, driver, parser=HTML_PARSER):
+	page = fetch_resume_page(worker, resume_link, driver)
+	if page is None:
+		return None
+	return parse_resume(*page, parser=parser)
+
+class SeenIndex:
+	"""IDs of resumes already scraped
+
+	Kept in SQLite so it can be shared by processes (each opens its own)
+	and by runs, e.g multiple queries of script.sh
+	"""
+	def __init__(self, filename):
+		self.connection = connect_sqlite(filename, SEEN_INDEX_WAIT)
+		self.connection.execute('CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY, scraped_at REAL, content_hash TEXT, last_seen REAL)')
+		# indexes made before incremental runs do not have the columns they need
+		columns = set(row[1] for row in self.connection.execute('PRAGMA table_info(seen)'))
+		for column, column_type in (('content_hash', 'TEXT'), ('last_seen', 'REAL')):
+			if column not in columns:
+				self.connection.execute('ALTER TABLE seen ADD COLUMN %s %s' % (column, column_type))
+
+	def seen(self, idds):
+		"""Returns the set of idds that were already scraped"""
+		idds = list(idds)
+		if not idds:
+			return set()
+		rows = self.connection.execute(
+			'SELECT id FROM seen WHERE id IN (%s)' % ','.join('?' * len(idds)), idds
+		)
+		return set(row[0] for row in rows)
+
+	def add(self, idd):
+		self.connection.execute('INSERT OR IGNORE INTO seen (id, scraped_at) VALUES (?, ?)', (idd, time.time()))
+
+	def add_many(self, idds):
+		# one transaction instead of one per resume
+		now = time.time()
+		with self.connection:
+			self.connection.execute('BEGIN')
+			self.connection.executemany('INSERT OR IGNORE INTO seen (id, scraped_at) VALUES (?, ?)', [(idd, now) for idd in idds])
+
+	def forget(self, idds):
+		"""Drops idds so they are scraped again"""
+		with self.connection:
+			self.connection.execute('BEGIN')
+			self.connection.executemany('DELETE FROM seen WHERE id = ?', [(idd,) for idd in idds])
+
+	def content_hash(self, idd):
+		"""Returns hash of the content idd had when last scraped, None if it is not known"""
+		row = self.connection.execute('SELECT content_hash FROM seen WHERE id = ?', (idd,)).fetchone()
+		return row[0] if row is not None else None
+
+	def update(self, idd, content_hash):
+		"""Records idd as scraped (again) with content_hash"""
+		now = time.time()
+		self.connection.execute(
+			'INSERT INTO seen VALUES (?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET '
+			'scraped_at = excluded.scraped_at, content_hash = excluded.content_hash, last_seen = excluded.last_seen',
+			(idd, now, content_hash, now)
+		)
+
+	def touch(self, idd):
+		"""Records idd as seen unchanged"""
+		self.connection.execute('UPDATE seen SET last_seen = ? WHERE id = ?', (time.time(), idd))
+
+	def close(self):
+		self.connection.close()
+
+def open_seen_index(args):
+	return SeenIndex(args.seen_index) if args.seen_index is not None else None
+
+def unseen_links(seen_index, links):
+	"""Drop (WebElement, href) links of resumes already scraped"""
+	seen = seen_index.seen(resume_id(href) for _, href in links)
+	if seen:
+		logging.info('Skipping %d already scraped resumes', len(seen))
+	return [link for link in links if resume_id(link[1]) not in seen]
+
+def resume_body_html(page_source):
+	"""HTML of the resume body div of page_source, found without parsing the page"""
+	start = page_source.rfind('<div', 0, page_source.find(RESUME_BODY_MARKER))
+	depth = 0
+	for tag in DIV_TAG.finditer(page_source, max(start, 0)):
+		depth += -1 if tag.group(1) else 1
+		if depth == 0:
+			return page_source[start:page_source.find('>', tag.end()) + 1]
+	return page_source[start:]
+
+def resume_content_hash(page_source):
+	"""Hash of the text of the resume body of page_source
+
+	Markup is left out so a resume hashes the same whether it came
+	from the browser (whole page or --extract) or over HTTP
+	"""
+	text = html.unescape(ANY_TAG.sub(' ', resume_body_html(page_source)))
+	return hashlib.sha1(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+class IncrementalSink:
+	"""Only hands resumes that are new or changed since they were last scraped on to sink"""
+	def __init__(self, sink, seen_index):
+		self.sink = sink
+		self.seen_index = seen_index
+
+	def put(self, idd, page_source):
+		content_hash = resume_content_hash(page_source)
+		if self.seen_index.content_hash(idd) == content_hash:
+			count(UNCHANGED_RESUMES)
+			self.seen_index.touch(idd)
+			return
+		self.sink.put(idd, page_source)
+		self.seen_index.update(idd, content_hash)
+
+	def close(self):
+		self.sink.close()
+		self.seen_index.close()
+
+class RetryQueue:
+	"""Resumes that could not be fetched, kept in SQLite to be fetched again (see retry_resumes)
+
+	Each resume keeps the results file it belongs to (output of the queue when
+	it was added), its failure reasons and # of attempts. It comes due again after
+	a backoff doubling with every attempt, until RETRY_MAX_ATTEMPTS are reached
+	"""
+	def __init__(self, filename, output=None):
+		self.output = output
+		# async fetching abandons resumes from threads of its own
+		self.lock = threading.Lock()
+		self.connection = connect_sqlite(filename, SEEN_INDEX_WAIT, check_same_thread=False)
+		self.connection.execute('CREATE TABLE IF NOT EXISTS retries (id TEXT PRIMARY KEY, url TEXT, output TEXT, attempts INTEGER, reasons TEXT, next_try REAL)')
+
+	def add(self, resume_link, reason):
+		"""Records a failed attempt at fetching resume_link"""
+		idd = resume_id(resume_link)
+		now = time.time()
+		with self.lock:
+			row = self.connection.execute('SELECT attempts, reasons FROM retries WHERE id = ?', (idd,)).fetchone()
+			if row is None:
+				self.connection.execute('INSERT INTO retries VALUES (?, ?, ?, 1, ?, ?)', (idd, resume_link, self.output, dumps([reason]), now + RETRY_BACKOFF))
+				return
+			attempts = row[0] + 1
+			self.connection.execute('UPDATE retries SET attempts = ?, reasons = ?, next_try = ? WHERE id = ?',
+				(attempts, dumps(loads(row[1]) + [reason]), now + RETRY_BACKOFF * 2 ** (attempts - 1), idd))
+		if attempts >= RETRY_MAX_ATTEMPTS:
+			logging.error('Resume ID %s failed %d times, giving up on it', idd, attempts)
+
+	def done(self, idd):
+		"""Takes resume idd off the queue once it is fetched, by a retry or by scraping it again"""
+		with self.lock:
+			# most resumes fetched were never queued, looking them up spares a write
+			if self.connection.execute('SELECT 1 FROM retries WHERE id = ?', (idd,)).fetchone() is not None:
+				self.connection.execute('DELETE FROM retries WHERE id = ?', (idd,))
+
+	def due(self):
+		"""(resume link, results file) of resumes due to be fetched again"""
+		with self.lock:
+			return self.connection.execute(
+				'SELECT url, output FROM retries WHERE attempts < ? AND next_try <= ? ORDER BY next_try',
+				(RETRY_MAX_ATTEMPTS, time.time())
+			).fetchall()
+
+	def next_try(self):
+		"""When the next resume comes due, None if none are left to retry"""
+		with self.lock:
+			return self.connection.execute('SELECT MIN(next_try) FROM retries WHERE attempts < ?', (RETRY_MAX_ATTEMPTS,)).fetchone()[0]
+
+	def pending(self):
+		with self.lock:
+			return self.connection.execute('SELECT COUNT(*) FROM retries WHERE attempts < ?', (RETRY_MAX_ATTEMPTS,)).fetchone()[0]
+
+	def given_up(self):
+		with self.lock:
+			return self.connection.execute('SELECT COUNT(*) FROM retries WHERE attempts >= ?', (RETRY_MAX_ATTEMPTS,)).fetchone()[0]
+
+	def close(self):
+		self.connection.close()
+
+def open_retry_queue(args, output=None):
+	return RetryQueue(args.retry_queue, output) if args.retry_queue is not None else None
+
+class RetriedSink:
+	"""Takes resumes handed on to sink off queue"""
+	def __init__(self, sink, queue):
+		self.sink = sink
+		self.queue = queue
+		self.retried = 0
+
+	def put(self, idd, page_source):
+		self.sink.put(idd, page_source)
+		self.queue.done(idd)
+		self.retried += 1
+
+	def close(self):
+		self.sink.close()
+
+class ResumeWriter:
+	"""Parses fetched resume pages in place and writes them to output"""
+	def __init__(self, output, parser=HTML_PARSER, seen_index=None):
+		self.output = output
+		self.parser = parser
+		self.seen_index = seen_index
+
+	def put(self, idd, page_source):
+		resume = parse_resume(idd, page_source, self.parser)
+		with timed(SERIALIZE):
+			line = resume.toJSON()
+		self.output.write(idd, line)
+		if self.seen_index is not None:
+			self.seen_index.add(idd)
+
+	def close(self):
+		self.output.close()
+		if self.seen_index is not None:
+			self.seen_index.close()
+
+class PageQueue:
+	"""Hands fetched resume pages off to parser processes (see parse_pages)"""
+	def __init__(self, queue):
+		self.queue = queue
+
+	def put(self, idd, page_source):
+		# blocks when parsers fall behind, bounding memory held by raw pages
+		self.queue.put((idd, page_source))
+
+	def close(self):
+		pass
+
+class SearchPages:
+	"""Search pages left to scrape, shared by all mine workers
+
+	Workers take the offset (start) of a search page with get and report
+	back with completed or failed, failed pages are put back to be retried.
+	State is kept in manager proxies so it can be handed to worker processes
+	and is saved as a checkpoint on every change (see --resume) unless
+	checkpoint_filename is None
+	"""
+	def __init__(self, manager, checkpoint_filename, offsets, done=None, end=None):
+		self.checkpoint_filename = checkpoint_filename
+		self.lock = manager.Lock()
+		self.pending = manager.list(offsets)
+		# IDs of resumes done on pages taken but not completed yet
+		self.done = manager.dict(done or {})
+		self.failures = manager.dict()
+		self.abandoned = manager.list()
+		self.taken = manager.Value('i', 0)
+		# index search results end at once a worker runs into the last page
+		self.end = manager.Value('i', end)
+
+	@classmethod
+	def create(cls, manager, checkpoint_filename, start, end):
+		search_pages = cls(manager, checkpoint_filename, range(start, end, NUM_INDEED_RESUME_RESULTS))
+		search_pages.save()
+		return search_pages
+
+	@classmethod
+	def load(cls, manager, checkpoint_filename):
+		with open(checkpoint_filename, 'r') as f:
+			saved = json.load(f)
+		done = {int(offset): idds for offset, idds in saved['done'].items()}
+		# pages that were being worked on go first, abandoned ones are given another chance
+		offsets = sorted(done) + saved['abandoned'] + saved['pending']
+		search_pages = cls(manager, checkpoint_filename, offsets, done, saved['end'])
+		search_pages.save()
+		return search_pages
+
+	def is_past_end(self, offset):
+		return self.end.value is not None and offset >= self.end.value
+
+	def get(self, wait=True):
+		"""Take a search page, returns (offset, IDs of resumes already done in it)
+
+		Returns None once there are no pages left, waits while
+		pages taken by other workers may still be put back (unless not wait)
+		"""
+		while True:
+			with self.lock:
+				while len(self.pending) > 0:
+					offset = self.pending.pop(0)
+					if not self.is_past_end(offset):
+						self.taken.value += 1
+						self.done.setdefault(offset, [])
+						return offset, self.done[offset]
+				if self.taken.value == 0 or not wait:
+					return None
+			time.sleep(1)
+
+	def resume_done(self, offset, idd):
+		with self.lock:
+			# proxies hand out copies, so set it back
+			self.done[offset] = self.done[offset] + [idd]
+			self.save()
+
+	def release(self, offset):
+		"""Put back a page that was taken but not worked on, it goes first"""
+		with self.lock:
+			self.pending.insert(0, offset)
+			self.taken.value -= 1
+			self.save()
+
+	def completed(self, offset):
+		with self.lock:
+			del self.done[offset]
+			self.taken.value -= 1
+			self.save()
+
+	def failed(self, offset):
+		with self.lock:
+			failures = self.failures.get(offset, 0) + 1
+			self.failures[offset] = failures
+			if self.is_past_end(offset):
+				# no results there
+				del self.done[offset]
+			elif failures < MAX_RETRIES:
+				logging.error('Putting back search page at index %d to retry later', offset)
+				self.pending.append(offset)
+			else:
+				logging.error('Search page at index %d failed %d times, abandoning it', offset, failures)
+				del self.done[offset]
+				self.abandoned.append(offset)
+			self.taken.value -= 1
+			self.save()
+
+	def results_end(self, end):
+		with self.lock:
+			if not self.is_past_end(end):
+				logging.info('Search results end at index %d', end)
+				self.end.value = end
+				self.save()
+
+	def is_finished(self):
+		with self.lock:
+			return len(self.pending) == 0 and self.taken.value == 0 and len(self.abandoned) == 0
+
+	def save(self):
+		"""Assumes lock is held (or that no worker was started yet)"""
+		if self.checkpoint_filename is None:
+			# not kept e.g by iter_resumes
+			return
+		# one copy of each proxy, every access to one is a round trip to the manager
+		# (list() and dict() of a proxy take one per item)
+		pending = self.pending[:]
+		done = self.done.copy()
+		end = self.end.value
+		saved = {
+			# pages with resumes done go first when loaded, so they are not listed twice
+			'pending': [offset for offset in pending if (end is None or offset < end) and offset not in done],
+			'done': done,
+			'abandoned': self.abandoned[:],
+			'end': end
+		}
+		# write then rename so a crash mid write does not lose the checkpoint
+		with atomic_write(self.checkpoint_filename) as tmp_filename:
+			with open(tmp_filename, 'w') as f:
+				json.dump(saved, f)
+
+class CheckpointedSink:
+	"""Records resumes put into sink as done on the search page being worked on"""
+	def __init__(self, sink, search_pages):
+		self.sink = sink
+		self.search_pages = search_pages
+		self.search = None
+
+	def put(self, idd, page_source):
+		self.sink.put(idd, page_source)
+		self.search_pages.resume_done(self.search, idd)
+
+	def close(self):
+		self.sink.close()
+
+def open_frontier(args):
+	if args.frontier.startswith(('http://', 'https://')):
+		return RemoteFrontier(args.frontier)
+	frontier = SqliteFrontier(args.frontier)
+	# joining a crawl keeps the pages it has
+	frontier.add_pages(range(args.si, args.ei, NUM_INDEED_RESUME_RESULTS))
+	return frontier
+
+def parse_pages(args, page_queue, resume_queue, filename):
+	"""Parser process of pipeline mode
+
+	Consumes (IDD, page source) from page_queue until it gets None,
+	resumes are sent to the writer process to be written to filename
+	"""
+	writer = ResumeWriter(QueueOutput(resume_queue, filename), args.parser)
+	try:
+		while True:
+			page = page_queue.get()
+			if page is None:
+				break
+			try:
+				writer.put(*page)
+			except Exception:
+				traceback.print_exc()
+				logging.error('Unable to parse resume ID %s, skipping', page[0])
+	finally:
+		writer.close()
+
+def write_resumes(args, resume_queue):
+	"""Writer process, the only one writing results when there are more processes
+
+	Consumes (filename, IDD, serialized resume) from resume_queue until it gets None,
+	taking whatever else is waiting along with each one to write it all at once
+	"""
+	outputs = {}
+	seen_index = open_seen_index(args)
+	finished = False
+	try:
+		while not finished:
+			batch = [resume_queue.get()]
+			while len(batch) < WRITE_BATCH_SIZE:
+				try:
+					batch.append(resume_queue.get_nowait())
+				except Empty:
+					break
+
+			written = []
+			for item in batch:
+				if item is None:
+					# sentinel comes after everything else
+					finished = True
+					break
+				filename, idd, line = item
+				try:
+					if filename not in outputs:
+						outputs[filename] = open_output(filename, args.format, args.override)
+					outputs[filename].write(idd, line)
+					written.append(idd)
+				except Exception:
+					traceback.print_exc()
+					logging.error('Unable to write resume ID %s, skipping', idd)
+			if seen_index is not None and written:
+				seen_index.add_many(written)
+	finally:
+		for output in outputs.values():
+			output.close()
+		if seen_index is not None:
+			seen_index.close()
+
+class WriterProcess:
+	"""Runs write_resumes in a process of its own, workers write to it through queue"""
+	def __init__(self, args, manager):
+		self.queue = manager.Queue(maxsize=WRITE_QUEUE_SIZE)
+		self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=1, initializer=init_helper, initargs=(get_stats(),))
+		self.future = self.executor.submit(profiled, args, write_resumes, args, self.queue)
+
+	def close(self):
+		"""Waits for the writer to write everything put so far"""
+		self.queue.put(None)
+		concurrent.futures.wait([self.future])
+		if self.future.exception() is not None:
+			logging.error('Writer process failed: %s', self.future.exception())
+		self.executor.shutdown()
+
+def next_page_button(driver):
+	try:
+		return driver.find_element_by_class_name('rezemp-pagination-nextbutton')
+	except NoSuchElementException:
+		return None
+
+def go_to_next_search_page(worker, driver, url):
+	# whether user simulation or not it seems it is just better to
+	# go to the page directly instead of click next button
+	go_to_page(worker, driver, url)
+
+def simulate_login(args, worker, driver, search_point):
+	login_url = INDEED_LOGIN_URL + '?' + urlencode({'service': 'roz', 'continue': search_point}, safe='%')
+	if not go_to_page(worker, driver, login_url):
+		raise TimeoutException('Not able to login in given timeframe')
+
+	email = driver.find_element_by_id('login-email-input')
+	password = driver.find_element_by_id('login-password-input')
+	email.send_keys(args.user)
+	password.send_keys(args.password)
+
+	submission_button = driver.find_element_by_id('login-submit-button')
+	submission_button.submit()
+
+	# twice the wait due to how important it is
+	WebDriverWait(driver, EXPLICIT_MAX_WAIT * 2).until(EC.url_to_be(search_point))
+
+def click_open(driver, link):
+	"""Click link open in a new tab like a user would, returns the tab's window handle (None if no tab opened)"""
+	handles = set(driver.window_handles)
+	driver.execute_script('arguments[0].click()', link) # works consistently across brwosers
+	try:
+		WebDriverWait(driver, EXPLICIT_MAX_WAIT).until(lambda driver: len(driver.window_handles) > len(handles))
+	except TimeoutException:
+		return None
+	handle = (set(driver.window_handles) - handles).pop()
+	if getattr(driver, 'blocked_urls', None):
+		# the page is already loading, only what it requests from now on is blocked
+		window = driver.current_window_handle
+		driver.switch_to.window(handle)
+		block_urls(driver)
+		driver.switch_to.window(window)
+	return handle
+
+def next_loaded_tab(driver, tabs):
+	"""Wait for whichever of tabs ({window handle: (resume link, time clicked open)}) shows its resume first
+
+	Returns its window handle, switched to. A tab that takes longer than a page
+	load and a resume wait is returned as is for fetch_resume_page to give up on
+	"""
+	while True:
+		for handle, (_, clicked) in tabs.items():
+			driver.switch_to.window(handle)
+			if driver.execute_script(RESUME_SHOWN_SCRIPT) or time.monotonic() - clicked > PAGE_LOAD_WAIT + EXPLICIT_MAX_WAIT:
+				return handle
+		time.sleep(TAB_POLL_INTERVAL)
+
+def simulation_algorithm(worker, driver, links, sink, main_window, extract=False, tabs=1):
+	"""Click resumes of links open from the search page in main_window
+
+	Up to tabs resumes load at once in tabs of their own, each is taken as soon as
+	it shows up whichever order they were clicked in and its tab is closed
+	"""
+	links = deque(links)
+	loading = {}
+	try:
+		while links or loading:
+			while links and len(loading) < tabs:
+				link, resume_link = links.popleft()
+				driver.switch_to.window(main_window)
+				worker.wait()
+				handle = click_open(driver, link)
+				if handle is None:
+					worker.abandon(resume_link, 'no tab opened')
+					continue
+				loading[handle] = (resume_link, time.monotonic())
+
+			handle = next_loaded_tab(driver, loading)
+			resume_link, _ = loading.pop(handle)
+			page = fetch_resume_page(worker, resume_link, driver, extract)
+			if page is not None:
+				worker.page_loaded()
+			driver.close()
+
+			if page is not None:
+				sink.put(*page)
+	finally:
+		driver.switch_to.window(main_window)
+
+def create_http_session(driver, pool_size=HTTP_POOL_SIZE):
+	"""Create keep-alive HTTP session that passes as the driver's browser
+
+	Assumes driver already logged in (if needed) and in a page of the site
+	"""
+	session = requests.Session()
+	adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(HTTP_POOL_SIZE, pool_size))
+	session.mount('https://', adapter)
+	session.mount('http://', adapter)
+	session.headers['User-Agent'] = driver.execute_script('return navigator.userAgent')
+	session.headers['Accept-Language'] = driver.execute_script('return navigator.languages.join(",")')
+	copy_cookies(driver, session)
+	return session
+
+def copy_cookies(driver, session):
+	for cookie in driver.get_cookies():
+		session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+
+def http_get(worker, session, url):
+	"""go_to_page for HTTP sessions, returns response text or None"""
+	attempts = 0
+	while attempts < MAX_RETRIES:
+		try:
+			# first attempt is paced by the caller
+			if attempts > 0:
+				worker.wait()
+				count(RETRIES)
+			with timed(HTTP_GET):
+				response = session.get(url, timeout=PAGE_LOAD_WAIT)
+			response.raise_for_status()
+			worker.page_loaded()
+			return response.text
+		except (requests.Timeout, requests.ConnectionError):
+			count(TIMEOUTS)
+			worker.throttled('timeout')
+			if attempts != MAX_RETRIES - 1:
+				logging.error('Unable to get to %s in time, attempt #%d. Retrying...', url, attempts + 1)
+			else:
+				logging.error('Unable to get to %s in time and reached maximum tries, aborting...', url)
+			attempts += 1
+		except requests.HTTPError as e:
+			if e.response.status_code in (429, 503):
+				worker.throttled('HTTP %d' % e.response.status_code)
+			logging.error('Unable to get to %s, %s', url, e)
+			return None
+	return None
+
+def fetch_resume_page_http(worker, resume_link, session):
+	"""fetch_resume_page without the browser
+
+	Returns (IDD, page source) or None if the resume is not in the page e.g when throttled
+	"""
+	idd = resume_id(resume_link)
+	logging.info('Processing resume ID %s', idd)
+	page_source = http_get(worker, session, resume_link)
+	if page_source is None:
+		worker.abandon(resume_link, 'request failed')
+		return None
+	if 'rezemp-ResumeDisplay-body' not in page_source:
+		worker.throttled('resume did not show up')
+		worker.abandon(resume_link, 'resume did not show up')
+		return None
+	return idd, page_source
+
+def http_algorithm(worker, session, resume_links, sink):
+	for link in resume_links:
+		worker.wait()
+		page = fetch_resume_page_http(worker, link, session)
+		if page is not None:
+			sink.put(*page)
+
+async def fetch_resume_pages_async(worker, session, resume_links, sink, concurrency, executor):
+	"""Keep up to concurrency resume requests in flight
+
+	Requests run on executor threads (sharing the session's connection pool),
+	fetched pages are handed to sink as they come in
+	"""
+	loop = asyncio.get_running_loop()
+	semaphore = asyncio.Semaphore(concurrency)
+
+	async def fetch(link):
+		async with semaphore:
+			await worker.wait_async()
+			page = await loop.run_in_executor(executor, fetch_resume_page_http, worker, link, session)
+		if page is not None:
+			sink.put(*page)
+
+	await asyncio.gather(*(fetch(link) for link in resume_links))
+
+def async_algorithm(worker, session, resume_links, sink, concurrency):
+	with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+		asyncio.run(fetch_resume_pages_async(worker, session, resume_links, sink, concurrency, executor))
+
+def non_simulation_algorithm(worker, driver, resume_links, sink, extract=False):
+	# links are already taken out of the search page, so there is no going back to it
+	for link in resume_links:
+		if go_to_page(worker, driver, link):
+			page = fetch_resume_page(worker, link, driver, extract)
+			if page is not None:
+				sink.put(*page)
+		else:
+			worker.abandon(link, 'page load timed out')
+
+def block_urls(driver):
+	"""Block the URLs a lean Chrome does not need in the current tab (none for other browsers)"""
+	if getattr(driver, 'blocked_urls', None):
+		driver.execute_cdp_cmd('Network.enable', {})
+		driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': driver.blocked_urls})
+
+def open_tab(driver, url):
+	"""Start loading url in a new tab without waiting for it, returns the tab's window handle"""
+	handles = set(driver.window_handles)
+	blocking = getattr(driver, 'blocked_urls', None)
+	# with URLs to block the tab opens blank, to be set up before it loads anything
+	driver.execute_script('window.open(arguments[0])', 'about:blank' if blocking else url)
+	WebDriverWait(driver, EXPLICIT_MAX_WAIT).until(lambda driver: len(driver.window_handles) > len(handles))
+	handle = (set(driver.window_handles) - handles).pop()
+	if blocking:
+		window = driver.current_window_handle
+		driver.switch_to.window(handle)
+		block_urls(driver)
+		driver.execute_script('window.location.href = arguments[0]', url)
+		driver.switch_to.window(window)
+	return handle
+
+def close_other_tabs(driver, main_window):
+	for handle in driver.window_handles:
+		if handle != main_window:
+			driver.switch_to.window(handle)
+			driver.close()
+	driver.switch_to.window(main_window)
+
+def prefetch_search_pages(worker, driver, search_pages, search_URL, ahead, prefetch):
+	"""Take up to prefetch search pages ahead, each starts loading in a tab of its own
+
+	Only takes pages left right away (see SearchPages.get), ahead holds
+	(offset, IDs of resumes done, window handle). Returns False if tabs can not be opened
+	"""
+	while len(ahead) < prefetch:
+		page = search_pages.get(wait=False)
+		if page is None:
+			return True
+		search, done = page
+		worker.wait()
+		try:
+			handle = open_tab(driver, search_URL + '&' + urlencode({'start': search}))
+		except TimeoutException:
+			logging.warn('Unable to open a tab for search page at index %d, not prefetching anymore', search)
+			search_pages.release(search)
+			return False
+		ahead.append((search, done, handle))
+	return True
+
+def is_alert_present(driver):
+	try:
+		WebDriverWait(driver, EXPLICIT_MAX_WAIT).until(
+			EC.presence_of_element_located((By.CLASS_NAME, 'icl-Alert--danger'))
+		)
+		return True
+	except:
+		logging.warn('Unable to find alert box indicator, will report True')
+		return False
+
+def create_driver(args):
+	"""Set up browser, with --lean it does not load anything but the documents"""
+	if args.driver == FIREFOX:
+		fp = firefox.firefox_profile.FirefoxProfile()
+		firefox_opts = firefox.options.Options()
+		firefox_opts.set_headless(args.headless)
+		fp.set_preference("browser.tabs.remote.autostart", False)
+		fp.set_preference("browser.tabs.remote.autostart.1", False)
+		fp.set_preference("browser.tabs.remote.autostart.2", False)
+		# search pages are prefetched in tabs opened by script
+		fp.set_preference("dom.disable_open_during_load", False)
+		capabilities = DesiredCapabilities.FIREFOX.copy()
+		if args.lean:
+			for preference, value in LEAN_FIREFOX_PREFERENCES.items():
+				fp.set_preference(preference, value)
+			capabilities['pageLoadStrategy'] = LEAN_PAGE_LOAD_STRATEGY
+		driver = firefox.webdriver.WebDriver(firefox_profile=fp, options=firefox_opts, capabilities=capabilities)
+	else:
+		chrome_opts = chrome.options.Options()
+		chrome_opts.set_headless(args.headless)
+		chrome_opts.add_argument('--disable-popup-blocking')
+		capabilities = DesiredCapabilities.CHROME.copy()
+		if args.lean:
+			chrome_opts.add_experimental_option('prefs', LEAN_CHROME_PREFERENCES)
+			chrome_opts.add_argument('--blink-settings=imagesEnabled=false')
+			capabilities['pageLoadStrategy'] = LEAN_PAGE_LOAD_STRATEGY
+		driver = chrome.webdriver.WebDriver(options=chrome_opts, desired_capabilities=capabilities)
+		if args.lean:
+			driver.blocked_urls = LEAN_BLOCKED_URLS
+			block_urls(driver)
+	driver.implicitly_wait(IMPLICIT_MAX_WAIT)
+	driver.set_page_load_timeout(PAGE_LOAD_WAIT)
+	return driver
+
+class DriverManager:
+	"""Browser of a worker, recycled past --recycle-pages or --recycle-memory and restarted once it crashes
+
+	The browser is started on the first page gone to (logging in there with
+	--login) and every new one is brought to the page the worker carries on from,
+	generation goes up with every new browser so that anything tied to the old one
+	(tabs, HTTP sessions) can be made again
+	"""
+	def __init__(self, args):
+		self.args = args
+		self.driver = None
+		self.main_window = None
+		self.generation = 0
+		# crashes in a row, reset by the worker once it gets a page done
+		self.restarts = 0
+		self.loads_at_start = 0
+
+	def go_to(self, worker, url):
+		"""Bring the browser to url, starting one if there is none"""
+		if self.driver is None:
+			self.driver = create_driver(self.args)
+			self.generation += 1
+			self.loads_at_start = len(page_load_times)
+			self.main_window = self.driver.current_window_handle
+			if self.args.login:
+				# lands on url
+				simulate_login(self.args, worker, self.driver, url)
+		if self.driver.current_url != url and not go_to_page(worker, self.driver, url):
+			raise TimeoutException('Unable to get to %s in time' % url)
+
+	def pages_loaded(self):
+		return len(page_load_times) - self.loads_at_start
+
+	def memory(self):
+		"""Resident memory in bytes of the driver service and the browser it runs, None if unknown"""
+		process = getattr(getattr(self.driver, 'service', None), 'process', None)
+		if process is None:
+			return None
+		return process_tree_rss(process.pid)
+
+	def should_recycle(self):
+		if self.args.recycle_pages and self.pages_loaded() >= self.args.recycle_pages:
+			logging.info('Browser loaded %d pages, recycling it', self.pages_loaded())
+			return True
+		if self.args.recycle_memory:
+			rss = self.memory()
+			if rss is not None and rss >= self.args.recycle_memory * 1024 * 1024:
+				logging.info('Browser takes up %.0f MB, recycling it', rss / (1024 * 1024))
+				return True
+		return False
+
+	def is_alive(self):
+		if self.driver is None:
+			return False
+		try:
+			self.driver.window_handles
+			return True
+		except Exception:
+			return False
+
+	def recycle(self, worker, url):
+		count(BROWSER_RECYCLES)
+		self.quit()
+		self.go_to(worker, url)
+
+	def restart(self, worker, url):
+		"""Replace a crashed browser, gives up after MAX_BROWSER_RESTARTS crashes in a row"""
+		self.quit()
+		self.restarts += 1
+		if self.restarts > MAX_BROWSER_RESTARTS:
+			raise WebDriverException('Browser crashed %d times in a row, giving up' % self.restarts)
+		count(BROWSER_RESTARTS)
+		self.go_to(worker, url)
+
+	def quit(self):
+		if self.driver is None:
+			return
+		try:
+			self.driver.quit()
+		except Exception:
+			logging.warn('Unable to quit browser cleanly')
+		self.driver = None
+		self.main_window = None
+
+def release_ahead(search_pages, ahead):
+	"""Put back search pages taken ahead, in the order they were taken"""
+	while ahead:
+		search_pages.release(ahead.pop()[0])
+
+def mine(args, filename, search_pages, search_URL, page_queue=None, drivers=None, resume_queue=None, sink=None, stopped=None, reraise=False, rate_limiter=None, retirements=None):
+	"""Scrape resumes of search pages taken from search_pages
+
+	With a page_queue (pipeline mode) fetched pages are handed off to parser
+	processes instead of being parsed and written to filename, with a
+	resume_queue resumes are written to filename by the writer process and
+	with a sink fetched pages are handed to it instead (filename is not used).
+	Given drivers (see DriverManager) are left with their browser open,
+	which is recycled or restarted on the way without losing the search cursor.
+	Requests are paced by rate_limiter, with --processes auto the worker stops once
+	asked through retirements and once stopped (a threading.Event) is set no more
+	search pages are taken. Errors end the worker, they are logged or raised with reraise.
+	Returns True if the worker was retired (see Autoscaler) before search pages ran out
+	"""
+	own_drivers = drivers is None
+	if own_drivers:
+		drivers = DriverManager(args)
+
+	search = None
+	retired = False
+	# closed on the way out, whatever was opened before an error
+	seen_index = None
+	worker = None
+	# search pages taken ahead of the one being worked on
+	ahead = deque()
+	try:
+		if page_queue is not None:
+			sink = PageQueue(page_queue)
+		elif resume_queue is not None:
+			sink = ResumeWriter(QueueOutput(resume_queue, filename), args.parser)
+		elif sink is None:
+			sink = ResumeWriter(open_output(filename, args.format, args.override), args.parser, open_seen_index(args))
+		if args.incremental:
+			# resumes seen before are fetched again to find out whether they changed
+			sink = IncrementalSink(sink, open_seen_index(args))
+		else:
+			# sink marks resumes as seen once written, this one is checked before fetching
+			seen_index = open_seen_index(args)
+		cache = open_page_cache(args)
+		if cache is not None:
+			# every page fetched is kept, changed or not
+			sink = CachingSink(sink, cache)
+		# resumes given up on are fetched again at the end of the run
+		worker = Worker(rate_limiter, open_retry_queue(args, filename), retirements)
+		if worker.retry_queue is not None:
+			# resumes queued earlier and fetched now are not to be retried into results again
+			sink = RetriedSink(sink, worker.retry_queue)
+		sink = CheckpointedSink(sink, search_pages)
+
+		page = search_pages.get()
+		if page is None:
+			logging.info('No search pages left to scrape')
+			return
+		search, done = page
+		search_point = search_URL + '&' + urlencode({'start': search})
+		try:
+			drivers.go_to(worker, search_point)
+		except TimeoutException:
+			raise TimeoutException('Unable to get to initial search point %s in time' % search_point)
+
+		# user simulation clicks resumes open in a second tab
+		prefetch = 0 if args.simulate else args.prefetch
+		generation = None
+		# browser is only used for logging in and going through search pages
+		session = None
+		while search is not None:
+			try:
+				if drivers.generation != generation:
+					# new browser, nothing of the old one is left
+					generation = drivers.generation
+					window = drivers.main_window
+					if args.fetch in (HTTP_FETCH, ASYNC_FETCH):
+						session = create_http_session(drivers.driver, args.concurrency)
+				driver = drivers.driver
+
+				# implicitly also waits for alert box to show up
+				links, has_next = gen_resume_links(driver, args.extract)
+				# next search pages load in the background while resumes of this one are fetched
+				if not prefetch_search_pages(worker, driver, search_pages, search_URL, ahead, prefetch):
+					prefetch = 0
+
+				if len(links) == 0:
+					if not search_pages.is_past_end(search):
+						# alert box showed and it is a simulated run
+						if is_alert_present(driver):
+							count(DANGER_ALERTS)
+							worker.throttled('danger alert')
+						else:
+							worker.throttled('no resumes found')
+						logging.error('Unable to find any resumes at index %d', search)
+					search_pages.failed(search)
+				else:
+					if not has_next:
+						logging.info('No more pages to go to')
+						search_pages.results_end(search + len(links))
+					if seen_index is not None:
+						links = unseen_links(seen_index, links)
+					if done:
+						# finished before being interrupted
+						links = [link for link in links if resume_id(link[1]) not in done]
+					sink.search = search
+					if args.simulate:
+						simulation_algorithm(worker, driver, links, sink, drivers.main_window, args.extract, args.tabs)
+					else:
+						hrefs = [href for _, href in links]
+						if session is not None:
+							# pick up cookies the site may have refreshed
+							copy_cookies(driver, session)
+							if args.fetch == ASYNC_FETCH:
+								async_algorithm(worker, session, hrefs, sink, args.concurrency)
+							else:
+								http_algorithm(worker, session, hrefs, sink)
+						else:
+							non_simulation_algorithm(worker, driver, hrefs, sink, args.extract)
+					search_pages.completed(search)
+					drivers.restarts = 0
+					logging.info('Finished getting resumes of search page at index %d', search)
+				search = None
+
+				if worker.should_retire():
+					# pages taken ahead are put back on the way out
+					logging.info('Worker retired, leaving search pages left to the others')
+					retired = True
+					break
+				if stopped is not None and stopped.is_set():
+					logging.info('Stopped scraping')
+					break
+
+				if drivers.should_recycle():
+					# tabs of pages taken ahead go with the browser
+					release_ahead(search_pages, ahead)
+					page = search_pages.get()
+					if page is not None:
+						search, done = page
+						drivers.recycle(worker, search_URL + '&' + urlencode({'start': search}))
+					continue
+
+				while ahead and search is None:
+					search, done, next_window = ahead.popleft()
+					# tab of this search page is done with
+					if window != drivers.main_window:
+						driver.close()
+					driver.switch_to.window(next_window)
+					window = next_window
+					if search_pages.is_past_end(search):
+						# search results ended before it
+						search_pages.failed(search)
+						search = None
+				if search is None:
+					page = search_pages.get()
+					if page is not None:
+						search, done = page
+						next_search_url = search_URL + '&' + urlencode({'start': search})
+						go_to_next_search_page(worker, driver, next_search_url)
+			except Exception:
+				if drivers.is_alive():
+					raise
+				traceback.print_exc()
+				logging.error('Browser crashed, restarting it to carry on from where it was')
+				# put back with resumes done in them kept, the page being worked on goes first
+				release_ahead(search_pages, ahead)
+				if search is not None:
+					search_pages.release(search)
+				search = None
+				page = search_pages.get()
+				if page is not None:
+					search, done = page
+					drivers.restart(worker, search_URL + '&' + urlencode({'start': search}))
+	except StopScraping:
+		logging.info('Stopped scraping')
+	except (TimeoutException, Exception):
+		if reraise:
+			raise
+		traceback.print_exc()
+		logging.error('Caught exception finishing mining soon')
+	finally:
+		if search is not None:
+			# put back for other workers
+			search_pages.failed(search)
+		release_ahead(search_pages, ahead)
+		if own_drivers:
+			log_page_load_times(args)
+			logging.info('Driver shutting down')
+			drivers.quit()
+		elif drivers.is_alive():
+			# given drivers go on to be used from their main window
+			try:
+				close_other_tabs(drivers.driver, drivers.main_window)
+			except Exception:
+				logging.warn('Unable to close search page tabs')
+		if sink is not None:
+			sink.close()
+		if seen_index is not None:
+			seen_index.close()
+		if worker is not None and worker.retry_queue is not None:
+			worker.retry_queue.close()
+	return retired
+
+def mine_worker(*mine_args, **mine_kwargs):
+	"""mine in a mine process, paced and retired by what init_worker handed the process"""
+	return mine(*mine_args, rate_limiter=rate_limiter, retirements=retirements, **mine_kwargs)
+
+def run_workers(args, executor, worker_retirements, target, *target_args, **target_kwargs):
+	"""Runs target in workers of executor until all are done
+
+	There are args.processes workers, or as many as Autoscaler sees fit with
+	--processes auto, worker_retirements are then those executor hands to workers (see init_worker)
+	"""
+	fs = []
+	def start_worker():
+		fs.append(executor.submit(profiled, args, target, *target_args, **target_kwargs))
+
+	if not args.autoscale:
+		for _ in range(args.processes):
+			start_worker()
+		concurrent.futures.wait(fs)
+		return
+
+	autoscaler = Autoscaler(args, get_stats(), worker_retirements, HostUsage())
+	try:
+		for _ in range(autoscaler.workers):
+			start_worker()
+		while True:
+			_, running = concurrent.futures.wait(fs, timeout=AUTOSCALE_INTERVAL)
+			if not running:
+				break
+			for _ in range(autoscaler.step(len(running))):
+				start_worker()
+	finally:
+		autoscaler.close()
+
+class Query:
+	"""Query of batch mode"""
+	def __init__(self, q, name, search_URL, search_pages):
+		self.q = q
+		self.name = name
+		self.search_URL = search_URL
+		self.search_pages = search_pages
+
+def mine_batch(args, queries, resume_queue):
+	"""Scrape search pages of all queries with one browser
+
+	The browser is set up and logged in once, then goes through queries in order
+	taking search pages left of each, so pages of a query are spread across workers
+	"""
+	# started (and logged in) on the first search page taken
+	drivers = DriverManager(args)
+	try:
+		for query in queries:
+			logging.info('Scraping search pages of %s', query.q)
+			# paced and retired by what init_worker handed this process
+			if mine(args, results_filename(query.name, args.format), query.search_pages, query.search_URL, drivers=drivers,
+					resume_queue=resume_queue, rate_limiter=rate_limiter, retirements=retirements):
+				break
+	except (TimeoutException, Exception):
+		traceback.print_exc()
+		logging.error('Caught exception finishing batch soon')
+	finally:
+		log_page_load_times(args)
+		logging.info('Driver shutting down')
+		drivers.quit()
+
+def batch(args):
+	t = time.perf_counter()
+	with open(args.file, 'r') as f:
+		titles = [line.strip() for line in f if line.strip()]
+
+	limiter = AdaptiveRateLimiter(args.rate, args.burst, args.min_rate, args.max_rate)
+	set_stats(Stats())
+	export = StatsExport(args, get_stats(), limiter)
+
+	with multiprocessing.Manager() as manager:
+		queries = []
+		for title in titles:
+			name = format_name(title + ' ' + args.l)
+			checkpoint = checkpoint_filename(name)
+			if args.override:
+				remove_results(args, name)
+			if not can_write_results(args, results_filename(name, args.format)):
+				continue
+			if args.resume:
+				if not os.path.exists(checkpoint):
+					logging.info('No checkpoint of %s, nothing left to resume', name)
+					continue
+				search_pages = SearchPages.load(manager, checkpoint)
+			else:
+				search_pages = SearchPages.create(manager, checkpoint, args.si, args.ei)
+			queries.append(Query(title, name, search_url(title, args.l, args.lmd), search_pages))
+		if not queries:
+			export.close()
+			return
+
+		writer = WriterProcess(args, manager)
+		try:
+			worker_retirements = Retirements() if args.autoscale else None
+			with concurrent.futures.ProcessPoolExecutor(max_workers=args.processes, initializer=init_worker, initargs=(limiter, get_stats(), worker_retirements)) as executor:
+				try:
+					run_workers(args, executor, worker_retirements, mine_batch, args, queries, writer.queue)
+				except KeyboardInterrupt:
+					logging.warn('Batch interrupted by user, writing results and exiting soon...')
+		finally:
+			writer.close()
+			for query in queries:
+				if query.search_pages.is_finished():
+					os.remove(checkpoint_filename(query.name))
+				else:
+					logging.warn('Not all search pages of %s were scraped, run again with --resume to retry them', query.q)
+		if args.retry_queue is not None:
+			retry_resumes(args, limiter)
+
+	export.close()
+	logging.info('Finished batch of %d queries in %f seconds', len(queries), time.perf_counter() - t)
+
+def mine_multi(args, main_result_file, search_URL, search_pages, manager, limiter):
+	parser_fs = []
+
+	# workers send resumes to a single writer instead of each writing files of their own
+	writer = WriterProcess(args, manager)
+	if args.pipeline:
+		page_queue = manager.Queue(maxsize=args.queue_size)
+		parser_executor = concurrent.futures.ProcessPoolExecutor(max_workers=args.parsers, initializer=init_helper, initargs=(get_stats(),))
+		for _ in range(args.parsers):
+			parser_fs.append(parser_executor.submit(profiled, args, parse_pages, args, page_queue, writer.queue, main_result_file))
+	else:
+		page_queue = None
+
+	try:
+		worker_retirements = Retirements() if args.autoscale else None
+		with concurrent.futures.ProcessPoolExecutor(max_workers=args.processes, initializer=init_worker, initargs=(limiter, get_stats(), worker_retirements)) as executor:
+			mine_args = (args, main_result_file, search_pages, search_URL, page_queue)
+			try:
+				# until all are done
+				run_workers(args, executor, worker_retirements, mine_worker, *mine_args, resume_queue=writer.queue)
+			except KeyboardInterrupt:
+				logging.warn('Mining interrupted by user, writing results and exiting soon...')
+	finally:
+		# workers are done, parsers and then the writer drain whatever is left
+		if args.pipeline:
+			# one sentinel per parser
+			for _ in parser_fs:
+				page_queue.put(None)
+			concurrent.futures.wait(parser_fs)
+			parser_executor.shutdown()
+		writer.close()
+
+def results_filename(name, output_format=JSONL):
+	return OUTPUT_BASE_NAME + name + OUTPUT_EXTENSIONS[output_format]
+
+def remove_results(args, name):
+	"""Removes results of name to override them
+
+	Resumes in them are forgotten by --seen-index, or they would all be skipped
+	as already scraped and be lost with the results (incremental runs skip none)
+	"""
+	filename = results_filename(name, args.format)
+	if not os.path.exists(filename):
+		return
+	seen_index = open_seen_index(args) if not args.incremental else None
+	if seen_index is not None:
+		idds = [loads(line)['id'] for line in read_results(filename, args.format)]
+		seen_index.forget(idds)
+		seen_index.close()
+		logging.info('Overriding %s, %d resumes in it are scraped again', filename, len(idds))
+	os.remove(filename)
+
+def merge(args):
+	"""Upserts resumes of incremental runs into a dataset by ID
+
+	Resumes of the updates replace those of the same ID in the dataset, later
+	updates win. The dataset is streamed through, only updates are held in memory
+	"""
+	updates = {}
+	for filename in args.updates:
+		for line in read_results(filename, results_format(filename)):
+			updates[loads(line)['id']] = line
+
+	output_format = results_format(args.dataset)
+	kept = 0
+	replaced = 0
+	# write then rename so the dataset is never left half merged
+	with atomic_write(args.dataset) as tmp_filename:
+		output = open_output(tmp_filename, output_format, override=True)
+		try:
+			if os.path.exists(args.dataset):
+				for line in read_results(args.dataset, output_format):
+					idd = loads(line)['id']
+					if idd in updates:
+						replaced += 1
+						continue
+					output.write(idd, line)
+					kept += 1
+			for idd, line in updates.items():
+				output.write(idd, line)
+		finally:
+			output.close()
+	logging.info('Merged into %s: %d resumes kept, %d changed, %d new',
+		args.dataset, kept, replaced, len(updates) - replaced)
+
+def reparse_pages(parser, entries):
+	"""Parses cached pages of (resume ID, page file) entries
+
+	Returns [(resume ID, serialized resume)] and # of pages that could not be parsed
+	"""
+	lines = []
+	failed = 0
+	for idd, filename in entries:
+		try:
+			lines.append((idd, parse_resume(idd, read_cached_page(filename), parser).toJSON()))
+		except Exception as e:
+			logging.error('Unable to parse cached page of resume ID %s: %r', idd, e)
+			failed += 1
+	return lines, failed
+
+def reparse(args):
+	"""Rebuilds results from the pages in a cache with the current parser, no browser needed"""
+	t = time.perf_counter()
+	if not os.path.exists(os.path.join(args.cache, CACHE_INDEX)):
+		logging.error('No page cache in %s', args.cache)
+		return
+	cache = PageCache(args.cache)
+	entries = cache.entries()
+	cache.close()
+
+	filename = results_filename(args.name, args.format)
+	chunks = [entries[idx:idx + REPARSE_CHUNK_SIZE] for idx in range(0, len(entries), REPARSE_CHUNK_SIZE)]
+	written = 0
+	failed = 0
+	# write then rename so results are never left half rebuilt
+	with atomic_write(filename) as tmp_filename:
+		output = open_output(tmp_filename, args.format, override=True)
+		try:
+			with concurrent.futures.ProcessPoolExecutor(max_workers=args.processes) as executor:
+				# results come in the order of the cache, so reparsing it again gives the same file
+				for lines, chunk_failed in executor.map(reparse_pages, [args.parser] * len(chunks), chunks):
+					for idd, line in lines:
+						output.write(idd, line)
+					written += len(lines)
+					failed += chunk_failed
+		finally:
+			output.close()
+	logging.info('Reparsed %d cached resumes into %s in %f seconds, %d could not be parsed',
+		written, filename, time.perf_counter() - t, failed)
+
+def retried_results_filename(filename):
+	"""Columnar results can not be appended to, resumes retried into them go to a file next to them"""
+	output_format = results_format(filename)
+	if output_format not in (PARQUET, ARROW):
+		return filename
+	extension = OUTPUT_EXTENSIONS[output_format]
+	return '%s-retried-%d%s' % (filename[:-len(extension)], time.time(), extension)
+
+def retry_resumes(args, rate_limiter=None):
+	"""Fetch resumes of the retry queue again, in rounds as they come due
+
+	Resumes are fetched the way --fetch says (the browser goes to them directly,
+	even with --simulate-user) and written to the results they belong to. Waits up
+	to --retry-wait seconds for retries to come due, the ones left are left to a
+	later run or the retry command
+	"""
+	queue = open_retry_queue(args)
+	# resumes failing again are added back with another attempt
+	worker = Worker(rate_limiter, queue)
+	drivers = DriverManager(args)
+	session = None
+	retried = 0
+	attempts = 0
+	try:
+		while True:
+			due = queue.due()
+			if not due:
+				next_try = queue.next_try()
+				if next_try is None or next_try - time.time() > args.retry_wait:
+					break
+				logging.info('Waiting %.0f seconds for resumes to retry to come due', next_try - time.time())
+				time.sleep(max(next_try - time.time(), 0))
+				continue
+
+			if drivers.driver is None:
+				drivers.go_to(worker, due[0][0])
+				if args.fetch in (HTTP_FETCH, ASYNC_FETCH):
+					session = create_http_session(drivers.driver, args.concurrency)
+			outputs = {}
+			for resume_link, output in due:
+				outputs.setdefault(output, []).append(resume_link)
+			for output, links in outputs.items():
+				filename = retried_results_filename(output)
+				logging.info('Retrying %d resumes of %s', len(links), filename)
+				sink = ResumeWriter(open_output(filename, results_format(filename)), args.parser, open_seen_index(args))
+				cache = open_page_cache(args)
+				if cache is not None:
+					sink = CachingSink(sink, cache)
+				sink = RetriedSink(sink, queue)
+				try:
+					if session is None:
+						non_simulation_algorithm(worker, drivers.driver, links, sink, args.extract)
+					elif args.fetch == ASYNC_FETCH:
+						async_algorithm(worker, session, links, sink, args.concurrency)
+					else:
+						http_algorithm(worker, session, links, sink)
+				finally:
+					sink.close()
+					retried += sink.retried
+			attempts += len(due)
+	except (TimeoutException, Exception):
+		traceback.print_exc()
+		logging.error('Caught exception, leaving resumes left to retry for later')
+	finally:
+		drivers.quit()
+		logging.info('Retried %d resumes fine out of %d attempts, %d left to retry later and %d given up on',
+			retried, attempts, queue.pending(), queue.given_up())
+		queue.close()
+
+def retry(args):
+	"""Fetch resumes of the retry queue again on their own, paced and counted like a scraping run"""
+	t = time.perf_counter()
+	limiter = AdaptiveRateLimiter(args.rate, args.burst, args.min_rate, args.max_rate)
+	set_stats(Stats())
+	export = StatsExport(args, get_stats(), limiter)
+	retry_resumes(args, limiter)
+	export.close()
+	logging.info('Finished retrying in %f seconds', time.perf_counter() - t)
+
+def can_write_results(args, filename):
+	"""Columnar formats can not be appended to, so existing results are not touched"""
+	if args.format in (PARQUET, ARROW) and not args.override and os.path.exists(filename):
+		logging.error('Results in %s can not be appended to, %s already exists (use --override or another name)', args.format, filename)
+		return False
+	return True
+
+def checkpoint_filename(name):
+	return OUTPUT_BASE_NAME + name + CHECKPOINT_EXTENSION
+
+def format_name(name):
+	return name.strip().replace(' ', '-')
+
+def search_url(q, l, lmd='all'):
+	# restrict search only to job titles skills and field of study
+	query = {
+		'q': q,
+		'l': l,
+		'searchFields': 'jt',
+		# last modified, e.g day to only get resumes updated since yesterday
+		'lmd': lmd,
+		# country code apparently
+		'co': COUNTRY_CODES[l]
+	}
+	query_string = urlencode(query)
+	return INDEED_RESUME_SEARCH_BASE_URL % query_string
+
+def main(args):
+	t = time.perf_counter()
+	search_URL = search_url(args.q, args.l, args.lmd)
+
+	main_result_file = results_filename(args.name, args.format)
+	if args.override:
+		remove_results(args, args.name)
+	if not can_write_results(args, main_result_file):
+		return
+
+	limiter = AdaptiveRateLimiter(args.rate, args.burst, args.min_rate, args.max_rate)
+	set_stats(Stats())
+
+	checkpoint = checkpoint_filename(args.name)
+	if args.resume and args.frontier is None and not os.path.exists(checkpoint):
+		logging.error('No checkpoint of %s to resume from', args.name)
+		return
+
+	export = StatsExport(args, get_stats(), limiter)
+	with multiprocessing.Manager() as manager:
+		if args.frontier is not None:
+			# the frontier keeps the progress of the crawl itself
+			search_pages = open_frontier(args)
+		elif args.resume:
+			search_pages = SearchPages.load(manager, checkpoint)
+		else:
+			search_pages = SearchPages.create(manager, checkpoint, args.si, args.ei)
+
+		if args.processes != 1 or args.pipeline or args.autoscale:
+			mine_multi(args, main_result_file, search_URL, search_pages, manager, limiter)
+		else:
+			profiled(args, mine, args, main_result_file, search_pages, search_URL, rate_limiter=limiter)
+
+		if args.retry_queue is not None:
+			retry_resumes(args, limiter)
+
+		if args.frontier is not None:
+			if not search_pages.is_finished():
+				logging.warn('Not all search pages of the crawl are done, others may still be working on them')
+		elif search_pages.is_finished():
+			os.remove(checkpoint)
+		else:
+			logging.warn('Not all search pages were scraped, run again with --resume to retry them')
+
+	export.close()
+	logging.info('Finished scraping in %f seconds', time.perf_counter() - t)
+
+class StopScraping(Exception):
+	"""Raised by a sink to have mine stop"""
+
+class ResumeStream:
+	"""Parses fetched resume pages and hands the Resumes to a queue, see iter_resumes
+
+	The end of the stream is put by whoever runs mine, once it is done
+	"""
+	def __init__(self, resumes, parser, stopped):
+		self.resumes = resumes
+		self.parser = parser
+		self.stopped = stopped
+
+	def put(self, idd, page_source):
+		if self.stopped.is_set():
+			raise StopScraping()
+		self.resumes.put(parse_resume(idd, page_source, self.parser))
+
+	def close(self):
+		pass
+
+def stream_resumes(args, search_pages, search_URL, resumes, stopped, limiter):
+	"""Runs mine for iter_resumes, the exception it ended with (if any) and None are put on resumes last"""
+	try:
+		mine(args, None, search_pages, search_URL, sink=ResumeStream(resumes, args.parser, stopped), stopped=stopped, reraise=True, rate_limiter=limiter)
+	except Exception as e:
+		resumes.put(e)
+	finally:
+		resumes.put(None)
+
+def scraping_options(user=None, password=None, **options):
+	"""Scraping options as the command line gives them, options override defaults by name e.g headless=True
+
+	With login=True user and password are taken from the environment unless given
+	"""
+	parser = argparse.ArgumentParser()
+	add_scraping_arguments(parser)
+	args = parser.parse_args([])
+	for name, value in options.items():
+		if not hasattr(args, name):
+			raise TypeError('Unknown scraping option %s' % name)
+		setattr(args, name, value)
+	if args.login:
+		args.user = user if user is not None else os.environ.get(ENV_USER)
+		args.password = password if password is not None else os.environ.get(ENV_PASS)
+		if args.user is None or args.password is None:
+			raise ValueError('Logging in needs a user and password, given or set in %s and %s' % (ENV_USER, ENV_PASS))
+	constrain_scraping_arguments(args)
+	return args
+
+def iter_resumes(query, location='canada', start=0, end=NO_LOGIN_SEARCH_UPPER_LIMIT, **options):
+	"""Generates Resumes of a search as they are parsed
+
+	Scrapes with one browser on a thread of this process, paced on its own so that
+	any number can go on at once. Options are those of
+	scraping_options e.g iter_resumes('nurse', headless=True, fetch='http').
+	Nothing is written to results and no checkpoint is kept, closing the generator
+	stops scraping. Errors scraping ends with (e.g logging in) are raised once the
+	resumes parsed before them are taken
+	"""
+	args = scraping_options(l=location, si=start, ei=end, **options)
+	if args.retry_queue is not None:
+		raise ValueError('Resumes of a retry queue are retried into results files, there are none to iterate over')
+	limiter = AdaptiveRateLimiter(args.rate, args.burst, args.min_rate, args.max_rate)
+	resumes = Queue(ITER_QUEUE_SIZE)
+	stopped = threading.Event()
+	with multiprocessing.Manager() as manager:
+		search_pages = SearchPages(manager, None, range(args.si, args.ei, NUM_INDEED_RESUME_RESULTS))
+		thread = threading.Thread(target=stream_resumes, args=(args, search_pages, search_url(query.strip(), args.l, args.lmd), resumes, stopped, limiter), daemon=True)
+		thread.start()
+		try:
+			while True:
+				resume = resumes.get()
+				if resume is None:
+					break
+				if isinstance(resume, Exception):
+					raise resume
+				yield resume
+		finally:
+			stopped.set()
+			# the thread may be waiting on a full queue
+			while thread.is_alive():
+				try:
+					resumes.get(timeout=1)
+				except Empty:
+					pass
+
+class LoginAction(argparse.Action):
+	def __init__(self, option_strings, dest, nargs=None, **kwargs):
+		# enforce nargs to be 0
+		nargs = 0
+		super(LoginAction, self).__init__(option_strings, dest, nargs=nargs, **kwargs)
+
+	def __call__(self, parser, namespace, values, option_string=None):
+		if os.environ.get(ENV_USER) is None:
+			raise argparse.ArgumentError(self, 'Environment variable %s is not set please set it first' % ENV_USER)
+		if os.environ.get(ENV_PASS) is None:
+			raise argparse.ArgumentError(self, 'Environment variable %s is not set please set it first' % ENV_PASS)
+		setattr(namespace, self.dest, True)
+		setattr(namespace, 'user', os.environ.get(ENV_USER))
+		setattr(namespace, 'password', os.environ.get(ENV_PASS))
+
+def processes_argument(value):
+	if value == AUTO_PROCESSES:
+		return value
+	try:
+		return int(value)
+	except ValueError:
+		raise argparse.ArgumentTypeError('expected a number or %s' % AUTO_PROCESSES)
+
+def add_scraping_arguments(parser):
+	parser.add_argument('-l', default='canada', metavar='location', choices=['canada', 'united states'], help='location scope for search')
+	parser.add_argument('-si', default=0, type=int, metavar='start', help='starting index (multiples of 50)')
+	parser.add_argument('-ei', default=NO_LOGIN_SEARCH_UPPER_LIMIT, type=int, metavar='end', help='ending index (multiples of 50)')
+	parser.add_argument('--processes', default=1, type=processes_argument, metavar='processes', help='# of processes to run (max %d), or %s to add and retire them as the run goes on by throughput, CPU and memory headroom and throttling' % (MAX_PROCESSORS, AUTO_PROCESSES))
+	parser.add_argument('--override', default=False, action='store_true', help='override existing result if any')
+	parser.add_argument('--driver', default=FIREFOX, choices=[FIREFOX, CHROME])
+	parser.add_argument('--login', default=False, action=LoginAction, help='Simulate logging in as a user (read README further for details)')
+	parser.add_argument('--simulate-user', default=False, dest='simulate', action='store_true', help='Whether to simulate user clicks or not (slower)')
+	parser.add_argument('--tabs', default=1, type=int, metavar='tabs', help='# of resumes clicked open in tabs at once with --simulate-user, taken as soon as they show up')
+	parser.add_argument('--headless', default=False, dest='headless', action='store_true', help='Run browsers in headless mode')
+	parser.add_argument('--lean', default=False, action='store_true', help='do not load images, stylesheets and fonts, and return from page loads once the DOM is ready')
+	parser.add_argument('--extract', default=False, action='store_true', help='only take resume bodies and search result links out of the browser instead of whole pages')
+	parser.add_argument('--fetch', default=BROWSER_FETCH, choices=[BROWSER_FETCH, HTTP_FETCH, ASYNC_FETCH], help='fetch resume pages with the browser or with an HTTP session sharing the browser\'s cookies, one at a time (http) or concurrently (async) (ignored with --simulate-user)')
+	parser.add_argument('--prefetch', default=1, type=int, metavar='pages', help='# of search pages per process loading ahead in tabs of their own while resumes are fetched (ignored with --simulate-user)')
+	parser.add_argument('--recycle-pages', default=0, type=int, dest='recycle_pages', metavar='pages', help='start a fresh browser once one has loaded this many pages (0 for never)')
+	parser.add_argument('--recycle-memory', default=0, type=int, dest='recycle_memory', metavar='MB', help='start a fresh browser once one takes up this much memory (0 for never, measured with psutil or /proc)')
+	parser.add_argument('--concurrency', default=5, type=int, metavar='requests', help='# of resume requests in flight per process with --fetch async')
+	parser.add_argument('--rate', default=INITIAL_RATE, type=float, metavar='rate', help='starting requests per second to Indeed shared by all processes, adapted as pages load or get throttled')
+	parser.add_argument('--min-rate', default=MIN_RATE, type=float, dest='min_rate', metavar='rate', help='lowest requests per second to slow down to when throttled')
+	parser.add_argument('--max-rate', default=MAX_RATE, type=float, dest='max_rate', metavar='rate', help='highest requests per second to speed up to')
+	parser.add_argument('--burst', default=BURST, type=int, metavar='burst', help='# of requests that can be sent at once after a lull')
+	parser.add_argument('--format', default=JSONL, choices=OUTPUT_FORMATS, help='format of results, JSON lines (compressed with gzip or zstd) or columnar Parquet/Arrow (zstd needs zstandard, Parquet/Arrow need pyarrow, neither can be appended to)')
+	parser.add_argument('--parser', default=HTML_PARSER, choices=PARSERS, help='HTML parser for resume pages (lxml only parses the resume body and is faster)')
+	parser.add_argument('--seen-index', default=None, dest='seen_index', metavar='file', help='SQLite file of scraped resume IDs, resumes in it are skipped (unless --incremental) and new ones are added (shared across runs)')
+	parser.add_argument('--lmd', default='all', metavar='window', help='only search resumes last modified within this window e.g day, 3days, week or month')
+	parser.add_argument('--incremental', default=False, action='store_true', help='fetch resumes even if seen before, only write the ones that are new or changed since (content hashes are kept in --seen-index)')
+	parser.add_argument('--cache', default=None, metavar='directory', help='keep the raw resume pages fetched, compressed, to rebuild results from with the reparse command (shared across runs)')
+	parser.add_argument('--cache-size', default=CACHE_SIZE, type=int, dest='cache_size', metavar='MB', help='max size of --cache, least recently used resumes are evicted past it (0 for no limit)')
+	parser.add_argument('--retry-queue', default=None, dest='retry_queue', metavar='file', help='SQLite file resumes that could not be fetched are kept in, to be fetched again with backoff at the end of the run or by the retry command (shared across runs)')
+	parser.add_argument('--retry-wait', default=RETRY_WAIT, type=int, dest='retry_wait', metavar='seconds', help='longest to wait for resumes of --retry-queue to come due once scraping is done')
+	parser.add_argument('--resume', default=False, action='store_true', help='continue an interrupted run of the same name from its checkpoint (appends to results)')
+	parser.add_argument('--stats', default=None, metavar='file', help='JSON file time spent per stage and counts of retries, timeouts and throttling of all processes are written to every %d seconds' % STATS_INTERVAL)
+	parser.add_argument('--metrics-port', default=None, type=int, dest='metrics_port', metavar='port', help='serve the same stats as Prometheus metrics on http://localhost:<port>/metrics')
+	parser.add_argument('--profile', default=None, metavar='directory', help='run every process under cProfile and dump its stats to <directory>/<function>-<pid>.prof')
+
+def constrain_scraping_arguments(args):
+	args.l = args.l.strip()
+	args.concurrency = max(args.concurrency, 1)
+	args.prefetch = max(args.prefetch, 0)
+	args.tabs = max(args.tabs, 1)
+	args.recycle_pages = max(args.recycle_pages, 0)
+	args.recycle_memory = max(args.recycle_memory, 0)
+	if args.recycle_memory and not can_measure_memory():
+		logging.warn('Unable to measure browser memory without psutil, ignoring --recycle-memory')
+		args.recycle_memory = 0
+	args.autoscale = args.processes == AUTO_PROCESSES
+	if args.autoscale:
+		# the most there can be, memory per worker is budgeted on the way
+		args.processes = worker_limit(args, HostUsage())
+	else:
+		args.processes = max(min(args.processes, MAX_PROCESSORS), 1)
+	args.burst = max(args.burst, 1)
+	args.min_rate = max(args.min_rate, 0.01)
+	args.max_rate = max(args.max_rate, args.min_rate)
+	args.rate = min(max(args.rate, args.min_rate), args.max_rate)
+	if args.resume and args.override:
+		logging.warn('Resuming appends to existing results, ignoring --override')
+		args.override = False
+	if args.incremental and args.seen_index is None:
+		logging.warn('Incremental runs keep content hashes in the seen index, using %s', DEFAULT_SEEN_INDEX)
+		args.seen_index = DEFAULT_SEEN_INDEX
+	if args.simulate and args.fetch != BROWSER_FETCH:
+		logging.warn('User simulation clicks through resumes in the browser, ignoring --fetch %s', args.fetch)
+		args.fetch = BROWSER_FETCH
+	if not args.login:
+		logging.warn('Login not specified, limiting starting search point to 0 and ending point at %d', NO_LOGIN_SEARCH_UPPER_LIMIT)
+		args.si = 0
+		args.ei = min(args.ei, NO_LOGIN_SEARCH_UPPER_LIMIT)
+
+def batch_command(argv):
+	parser = argparse.ArgumentParser(
+		prog='indeed-resume-scraper.py batch',
+		description='Scrape Indeed Resumes of many queries with the same browsers',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	parser.add_argument('file', help='file with a query (job title) per line, results of each are saved under "<query>-<location>"')
+	add_scraping_arguments(parser)
+	args = parser.parse_args(argv)
+	constrain_scraping_arguments(args)
+	batch(args)
+
+def frontier_command(argv):
+	parser = argparse.ArgumentParser(
+		prog='indeed-resume-scraper.py frontier',
+		description='Serve the search pages of a crawl to workers on any number of hosts',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	parser.add_argument('file', help='SQLite file of the crawl, created if missing and kept across restarts')
+	parser.add_argument('-si', default=0, type=int, metavar='start', help='starting index (multiples of 50)')
+	parser.add_argument('-ei', default=NO_LOGIN_SEARCH_UPPER_LIMIT, type=int, metavar='end', help='ending index (multiples of 50)')
+	parser.add_argument('--port', default=FRONTIER_PORT, type=int, metavar='port', help='port to listen on')
+	args = parser.parse_args(argv)
+
+	frontier = SqliteFrontier(args.file)
+	frontier.add_pages(range(args.si, args.ei, NUM_INDEED_RESUME_RESULTS))
+	frontier.close()
+	server = ThreadingHTTPServer(('', args.port), FrontierHandler)
+	server.daemon_threads = True
+	server.filename = args.file
+	logging.info('Serving crawl frontier %s on port %d', args.file, args.port)
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		server.server_close()
+
+def merge_command(argv):
+	parser = argparse.ArgumentParser(
+		prog='indeed-resume-scraper.py merge',
+		description='Upsert resumes of incremental runs into an existing dataset',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	parser.add_argument('dataset', help='results file to merge into (created if missing), its format goes by its extension')
+	parser.add_argument('updates', nargs='+', help='results files of incremental runs, resumes of later ones win')
+	args = parser.parse_args(argv)
+	merge(args)
+
+def reparse_command(argv):
+	parser = argparse.ArgumentParser(
+		prog='indeed-resume-scraper.py reparse',
+		description='Rebuild results from the pages of a --cache with the current parser',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	parser.add_argument('cache', help='cache directory of earlier runs')
+	parser.add_argument('--name', metavar='name', required=True, help='name to save results under (replaced if it exists)')
+	parser.add_argument('--format', default=JSONL, choices=OUTPUT_FORMATS, help='format of results')
+	parser.add_argument('--parser', default=HTML_PARSER, choices=PARSERS, help='HTML parser for resume pages')
+	parser.add_argument('--processes', default=os.cpu_count() or 1, type=int, metavar='processes', help='# of parser processes')
+	args = parser.parse_args(argv)
+	args.name = format_name(args.name)
+	args.processes = max(args.processes, 1)
+	reparse(args)
+
+def retry_command(argv):
+	parser = argparse.ArgumentParser(
+		prog='indeed-resume-scraper.py retry',
+		description='Fetch resumes of a --retry-queue again and write them to the results they belong to',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	parser.add_argument('file', help='retry queue of earlier runs')
+	add_scraping_arguments(parser)
+	args = parser.parse_args(argv)
+	constrain_scraping_arguments(args)
+	args.retry_queue = args.file
+	retry(args)
+
+def index_command(argv):
+	parser = argparse.ArgumentParser(
+		prog='indeed-resume-scraper.py index',
+		description='Index skills, job titles and degrees of results and query them',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	# imported here so NumPy is only loaded when an index is used
+	from . import index as inverted_index
+	parser.add_argument('directory', help='index directory, created if missing')
+	parser.add_argument('results', nargs='*', help='results files to add, only resumes added since they were last indexed are read')
+	parser.add_argument('--where', default=[], type=inverted_index.parse_where, action='append', metavar='field=term', help='only count resumes listing term in field (skill, title or degree), can be given more than once')
+	parser.add_argument('--top', default=None, choices=inverted_index.INDEX_FIELDS, help='print the terms of this field listed by the most resumes')
+	parser.add_argument('--histogram', default=None, choices=[inverted_index.START_DATE, inverted_index.END_DATE, inverted_index.ACTIVE], help='print # of jobs per year by when they started, ended or were held')
+	parser.add_argument('-n', default=10, type=int, metavar='n', help='# of terms printed by --top')
+	args = parser.parse_args(argv)
+	if inverted_index.numpy is None:
+		parser.error('the index needs numpy, install it first')
+
+	index = inverted_index.InvertedIndex(args.directory)
+	if args.results:
+		t = time.perf_counter()
+		index.update(args.results)
+		logging.info('Index of %d resumes updated in %f seconds', index.num_resumes(), time.perf_counter() - t)
+	docs = index.matching(args.where) if args.where else None
+	if docs is not None:
+		print('%d resumes match' % len(docs))
+	if args.top is not None:
+		for term, n in index.top(args.top, args.n, docs):
+			print('%8d  %s' % (n, term))
+	if args.histogram is not None:
+		for year, n in zip(*index.histogram(args.histogram, docs)):
+			print('%d  %8d' % (year, n))
+
+# commands other than scraping a single query, given as first argument
+COMMANDS = {
+	'batch': batch_command,
+	'frontier': frontier_command,
+	'merge': merge_command,
+	'reparse': reparse_command,
+	'retry': retry_command,
+	'index': index_command
+}
+
+def run(argv=None):
+	"""Command line of the scraper, argv without the program name (sys.argv by default)"""
+	if argv is None:
+		argv = sys.argv[1:]
+	# setup logging
+	logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(processName)s:%(levelname)s] %(message)s')
+
+	if len(argv) > 0 and argv[0] in COMMANDS:
+		COMMANDS[argv[0]](argv[1:])
+		return
+
+	parser = argparse.ArgumentParser(
+		prog='indeed-resume-scraper.py',
+		description='Scrape Indeed Resumes (see README for the batch, frontier, merge, reparse, retry and index commands)',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	required_arguments = parser.add_argument_group(title='required arguments')
+	required_arguments.add_argument('-q', metavar='query', required=True, help='search query to run on indeed e.g software engineer')
+	required_arguments.add_argument('--name', metavar='name', required=True, help='name of search (used to save files, lowercased and spaces turned to "-")')
+
+	add_scraping_arguments(parser)
+	parser.add_argument('--pipeline', default=False, action='store_true', help='Only fetch pages in browser processes and parse them in separate parser processes')
+	parser.add_argument('--parsers', default=2, type=int, metavar='parsers', help='# of parser processes in pipeline mode')
+	parser.add_argument('--frontier', default=None, metavar='file/url', help='take search pages from a crawl frontier shared with other workers, an SQLite file or the URL of the frontier command (instead of the -si/-ei range of this run alone)')
+	parser.add_argument('--queue-size', default=100, type=int, dest='queue_size', metavar='size', help='max # of fetched pages waiting to be parsed in pipeline mode')
+
+	args = parser.parse_args(argv)
+
+	# in case of carrige returns
+	args.q = args.q.strip()
+
+	# reformat
+	args.name = format_name(args.name)
+
+	# constrain
+	constrain_scraping_arguments(args)
+	args.parsers = max(args.parsers, 1)
+	args.queue_size = max(args.queue_size, 1)
+
+	main(args)
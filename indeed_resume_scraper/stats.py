@@ -0,0 +1,102 @@
+"""Time spent per stage and event counts shared by all processes of a run
+
+Kept apart from the scraper so that parsing can be timed without loading it
+"""
+import multiprocessing
+import contextlib
+import time
+
+# STATS (stages timed and events counted across processes, see Stats)
+PAGE_LOAD = 'page_load'
+HTTP_GET = 'http_get'
+RESUME_WAIT = 'resume_wait'
+PARSE = 'parse'
+PRODUCE_SUMMARY = 'produce_summary'
+PRODUCE_WORK_EXPERIENCE = 'produce_work_experience'
+PRODUCE_EDUCATION = 'produce_education'
+PRODUCE_SKILLS = 'produce_skills'
+PRODUCE_ADDITIONAL = 'produce_additional'
+SERIALIZE = 'serialize'
+ENQUEUE = 'enqueue'
+WRITE = 'write'
+STAGES = [
+	PAGE_LOAD, HTTP_GET, RESUME_WAIT, PARSE, PRODUCE_SUMMARY, PRODUCE_WORK_EXPERIENCE,
+	PRODUCE_EDUCATION, PRODUCE_SKILLS, PRODUCE_ADDITIONAL, SERIALIZE, ENQUEUE, WRITE
+]
+RETRIES = 'retries'
+TIMEOUTS = 'timeouts'
+DANGER_ALERTS = 'danger_alerts'
+THROTTLED = 'throttled'
+ABANDONED_RESUMES = 'abandoned_resumes'
+UNCHANGED_RESUMES = 'unchanged_resumes'
+RESUMES_WRITTEN = 'resumes_written'
+BROWSER_RECYCLES = 'browser_recycles'
+BROWSER_RESTARTS = 'browser_restarts'
+COUNTERS = [RETRIES, TIMEOUTS, DANGER_ALERTS, THROTTLED, ABANDONED_RESUMES, UNCHANGED_RESUMES, RESUMES_WRITTEN, BROWSER_RECYCLES, BROWSER_RESTARTS]
+STATS_INTERVAL = 10
+METRICS_PREFIX = 'indeed_resume_scraper_'
+
+class Stats:
+	"""Time spent per stage and event counters shared by processes
+
+	Has to be handed to other processes through inheritance like TokenBucket
+	"""
+	def __init__(self):
+		self.lock = multiprocessing.Lock()
+		# count, seconds and max seconds of every stage
+		self.timings = multiprocessing.Array('d', len(STAGES) * 3, lock=False)
+		self.counters = multiprocessing.Array('l', len(COUNTERS), lock=False)
+		self.started = time.time()
+
+	def record(self, stage, seconds):
+		idx = STAGES.index(stage) * 3
+		with self.lock:
+			self.timings[idx] += 1
+			self.timings[idx + 1] += seconds
+			self.timings[idx + 2] = max(self.timings[idx + 2], seconds)
+
+	def count(self, counter, n=1):
+		with self.lock:
+			self.counters[COUNTERS.index(counter)] += n
+
+	def snapshot(self):
+		with self.lock:
+			timings = list(self.timings)
+			counters = list(self.counters)
+		stages = {}
+		for idx, stage in enumerate(STAGES):
+			calls, seconds, max_seconds = timings[idx * 3:idx * 3 + 3]
+			stages[stage] = {
+				'count': int(calls),
+				'seconds': seconds,
+				'mean': seconds / calls if calls else 0.0,
+				'max': max_seconds
+			}
+		return {
+			'elapsed': time.time() - self.started,
+			'stages': stages,
+			'counters': dict(zip(COUNTERS, counters))
+		}
+
+# stats of all processes, None for no stats
+stats = None
+
+def set_stats(process_stats):
+	global stats
+	stats = process_stats
+
+def get_stats():
+	return stats
+
+@contextlib.contextmanager
+def timed(stage):
+	t = time.perf_counter()
+	try:
+		yield
+	finally:
+		if stats is not None:
+			stats.record(stage, time.perf_counter() - t)
+
+def count(counter, n=1):
+	if stats is not None:
+		stats.count(counter, n)
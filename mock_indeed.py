@@ -0,0 +1,280 @@
+"""Local stand-in for Indeed resume search
+
+Serves the recorded pages in fixtures/ under the same URL shapes the scraper uses
+(search pages paginated with `start`, resume pages, the login page) so that the
+scraper can be run and benchmarked without network. Point the scraper at it with
+
+	INDEED_RESUME_HOST=http://127.0.0.1:8000 INDEED_SECURE_HOST=http://127.0.0.1:8000
+
+Latency and throttling are configurable, a throttled request gets the
+`icl-Alert--danger` page Indeed shows. Request statistics are served on /__stats
+and can be reset with /__reset
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+from string import Template
+from collections import deque
+import threading
+import html
+import argparse
+import logging
+import random
+import time
+import json
+import glob
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+NUM_RESULTS = 50
+NO_LOGIN_SEARCH_UPPER_LIMIT = 1050
+SESSION_COOKIE = 'SOCK'
+RESUME_ID_PREFIX = 'mock'
+RESUME_ID_FORMAT = RESUME_ID_PREFIX + '%07d'
+
+# STAGES (request kinds statistics are kept for)
+SEARCH = 'search'
+RESUME = 'resume'
+LOGIN = 'login'
+STATIC = 'static'
+
+STATIC_CONTENT_TYPES = {
+	'.css': ('text/css', 64 * 1024),
+	'.js': ('application/javascript', 256 * 1024),
+	'.png': ('image/png', 16 * 1024),
+	'.gif': ('image/gif', 64),
+}
+
+def load_template(name):
+	with open(os.path.join(FIXTURES_DIR, name)) as f:
+		return Template(f.read())
+
+def percentile(values, fraction):
+	if not values:
+		return 0.0
+	ordered = sorted(values)
+	return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+class MockIndeed:
+	"""Site state shared by all request handler threads"""
+	def __init__(self, total=1000, latency=0.0, jitter=0.0, max_rate=0, throttle_every=0, login_limit=NO_LOGIN_SEARCH_UPPER_LIMIT):
+		self.total = total
+		self.latency = latency
+		self.jitter = jitter
+		self.max_rate = max_rate
+		self.throttle_every = throttle_every
+		self.login_limit = login_limit
+
+		self.search_page = load_template('search_page.html')
+		self.search_card = load_template('search_card.html')
+		self.next_button = load_template('next_button.html')
+		self.login_page = load_template('login.html')
+		with open(os.path.join(FIXTURES_DIR, 'throttled_alert.html')) as f:
+			self.throttled_alert = f.read()
+		self.resumes = []
+		for filename in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'resumes', '*.html'))):
+			with open(filename) as f:
+				self.resumes.append(f.read().encode('utf-8'))
+
+		self.lock = threading.Lock()
+		self.reset()
+
+	def reset(self):
+		with self.lock:
+			self.recent = deque()
+			self.search_requests = 0
+			self.timings = {SEARCH: [], RESUME: [], LOGIN: [], STATIC: []}
+			self.throttled = 0
+
+	def delay(self):
+		if self.latency or self.jitter:
+			time.sleep(self.latency + random.uniform(0, self.jitter))
+
+	def is_throttled(self, kind):
+		"""Sliding window of one second over search and resume requests"""
+		with self.lock:
+			now = time.monotonic()
+			throttled = False
+			if kind == SEARCH:
+				self.search_requests += 1
+				throttled = self.throttle_every > 0 and self.search_requests % self.throttle_every == 0
+			if self.max_rate > 0:
+				self.recent.append(now)
+				while self.recent and now - self.recent[0] > 1:
+					self.recent.popleft()
+				throttled = throttled or len(self.recent) > self.max_rate
+			if throttled:
+				self.throttled += 1
+			return throttled
+
+	def record(self, kind, seconds):
+		with self.lock:
+			self.timings[kind].append(seconds)
+
+	def stats(self):
+		with self.lock:
+			stats = {'throttled': self.throttled}
+			for kind, timings in self.timings.items():
+				stats[kind] = {
+					'count': len(timings),
+					'mean': sum(timings) / len(timings) if timings else 0.0,
+					'p50': percentile(timings, 0.5),
+					'p95': percentile(timings, 0.95),
+					'max': max(timings) if timings else 0.0
+				}
+			return stats
+
+	def render_search(self, query, logged_in, throttled):
+		start = int(query.get('start', ['0'])[0])
+		q = query.get('q', [''])[0]
+		cards = []
+		end = min(start + NUM_RESULTS, self.total)
+		if not logged_in:
+			end = min(end, self.login_limit)
+		if not throttled:
+			for idx in range(start, end):
+				cards.append(self.search_card.substitute(
+					resume_id=RESUME_ID_FORMAT % idx,
+					query=q.replace(' ', '+'),
+					search_id=start,
+					title=q.title()
+				))
+
+		pagination = ''
+		if not throttled and end < self.total and (logged_in or end < self.login_limit):
+			next_query = {key: values[0] for key, values in query.items()}
+			next_query['start'] = end
+			pagination = self.next_button.substitute(next_url='/search?' + urlencode(next_query))
+
+		return self.search_page.substitute(
+			query=q,
+			alert=self.throttled_alert if throttled else '',
+			cards=''.join(cards),
+			pagination=pagination
+		).encode('utf-8')
+
+	def render_resume(self, resume_id, throttled):
+		if not resume_id.startswith(RESUME_ID_PREFIX):
+			return None
+		try:
+			idx = int(resume_id[len(RESUME_ID_PREFIX):])
+		except ValueError:
+			return None
+		if idx < 0 or idx >= self.total:
+			return None
+		if throttled:
+			# danger alert but no resume body
+			return self.search_page.substitute(query='', alert=self.throttled_alert, cards='', pagination='').encode('utf-8')
+		return self.resumes[idx % len(self.resumes)]
+
+class MockIndeedHandler(BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+	# headers and body go out in separate writes, on a kept alive connection the body
+	# would otherwise wait for the client's delayed ACK of the headers (~40 ms a request)
+	disable_nagle_algorithm = True
+
+	def log_message(self, format, *args):
+		logging.debug(format, *args)
+
+	def send_body(self, body, content_type='text/html; charset=utf-8', status=200, headers=None):
+		self.send_response(status)
+		self.send_header('Content-Type', content_type)
+		self.send_header('Content-Length', str(len(body)))
+		for key, value in (headers or {}).items():
+			self.send_header(key, value)
+		self.end_headers()
+		self.wfile.write(body)
+
+	def is_logged_in(self):
+		return SESSION_COOKIE + '=' in self.headers.get('Cookie', '')
+
+	def do_GET(self):
+		site = self.server.site
+		url = urlparse(self.path)
+		query = parse_qs(url.query)
+		t = time.perf_counter()
+
+		if url.path == '/__stats':
+			self.send_body(json.dumps(site.stats()).encode('utf-8'), 'application/json')
+			return
+		if url.path == '/__reset':
+			site.reset()
+			self.send_body(b'{}', 'application/json')
+			return
+
+		site.delay()
+		if url.path == '/search':
+			kind = SEARCH
+			body = site.render_search(query, self.is_logged_in(), site.is_throttled(SEARCH))
+			self.send_body(body)
+		elif url.path.startswith('/resume/'):
+			kind = RESUME
+			body = site.render_resume(url.path[len('/resume/'):], site.is_throttled(RESUME))
+			if body is None:
+				self.send_body(b'Not Found', 'text/plain', status=404)
+			else:
+				self.send_body(body)
+		elif url.path == '/account/login':
+			kind = LOGIN
+			continue_url = query.get('continue', ['/search'])[0]
+			self.send_body(site.login_page.substitute(continue_url=html.escape(continue_url)).encode('utf-8'))
+		elif url.path.startswith('/static/'):
+			kind = STATIC
+			content_type, size = STATIC_CONTENT_TYPES.get(os.path.splitext(url.path)[1], ('application/octet-stream', 1024))
+			self.send_body(b'\0' * size, content_type, headers={'Cache-Control': 'no-store'})
+		else:
+			self.send_body(b'Not Found', 'text/plain', status=404)
+			return
+		site.record(kind, time.perf_counter() - t)
+
+	def do_POST(self):
+		site = self.server.site
+		t = time.perf_counter()
+		if urlparse(self.path).path != '/account/login':
+			self.send_body(b'Not Found', 'text/plain', status=404)
+			return
+
+		length = int(self.headers.get('Content-Length', 0))
+		form = parse_qs(self.rfile.read(length).decode('utf-8'))
+		site.delay()
+		self.send_body(b'', headers={
+			'Location': form.get('continue', ['/search'])[0],
+			'Set-Cookie': '%s=mock-session; Path=/' % SESSION_COOKIE
+		}, status=302)
+		site.record(LOGIN, time.perf_counter() - t)
+
+def serve(site, host='127.0.0.1', port=0):
+	"""Starts serving site on a daemon thread, returns the server (port 0 picks a free port)"""
+	server = ThreadingHTTPServer((host, port), MockIndeedHandler)
+	server.daemon_threads = True
+	server.site = site
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	return server
+
+def server_url(server):
+	host, port = server.server_address[:2]
+	return 'http://%s:%d' % (host, port)
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(
+		description='Serve a local stand-in of Indeed resume search',
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter
+	)
+	parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+	parser.add_argument('--port', default=8000, type=int, help='port to listen on')
+	parser.add_argument('--total', default=1000, type=int, help='# of resumes in search results')
+	parser.add_argument('--latency', default=0.0, type=float, metavar='seconds', help='added latency per request')
+	parser.add_argument('--jitter', default=0.0, type=float, metavar='seconds', help='max random latency added on top of --latency')
+	parser.add_argument('--max-rate', default=0, type=int, dest='max_rate', metavar='requests', help='throttle when more than this many requests come within a second (0 for no limit)')
+	parser.add_argument('--throttle-every', default=0, type=int, dest='throttle_every', metavar='n', help='throttle every n-th search page (0 for never)')
+	args = parser.parse_args()
+
+	logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(threadName)s:%(levelname)s] %(message)s')
+	site = MockIndeed(args.total, args.latency, args.jitter, args.max_rate, args.throttle_every)
+	server = serve(site, args.host, args.port)
+	logging.info('Serving mock Indeed on %s', server_url(server))
+	try:
+		while True:
+			time.sleep(1)
+	except KeyboardInterrupt:
+		server.shutdown()
@@ -3,13 +3,15 @@
 # Assumes each line is a job title
 # Defaults search to be in Canada
 # Defaults search for 5000 resumes
-# Defaults override
+# Defaults override (resumes of the overridden results are scraped again, not skipped as seen)
+# Starts a new browser (and logs in) for every query, see the batch command of indeed-resume-scraper.py to avoid it
+# Resumes already scraped by an earlier query are skipped (see seen-resumes.db)
 
 FILE=$1
 
 while read -u 3 job || [ -n "$job" ]; do
     echo "Searching resumes for ${job}"
-    python3 indeed-resume-scraper.py -q "$job" --name "$job-canada" -si 0 -ei 10000 --driver chrome --processes 2 --login --simulate --headless --override 2> scrape-"$job-canada".log
+    python3 indeed-resume-scraper.py -q "$job" --name "$job-canada" -si 0 -ei 10000 --driver chrome --processes 2 --login --simulate --headless --override --seen-index seen-resumes.db 2> scrape-"$job-canada".log
     read -u 1 -t 5 -p "Stop searching? (y/n) " isStop
     if [[ "$isStop" == "y" ]]; then
         break
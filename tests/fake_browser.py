@@ -0,0 +1,53 @@
+"""Stand-in for a Selenium browser, loading pages over HTTP e.g from mock_indeed.py
+
+Covers what the scraper asks of a browser without --simulate-user, --extract and
+prefetching: going to pages, finding search result links and the next page button
+and handing its cookies to HTTP sessions
+"""
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+import requests
+
+class FakeElement:
+	def __init__(self, tag, url):
+		self.tag = tag
+		self.url = url
+
+	def get_attribute(self, name):
+		value = self.tag.get(name)
+		return urljoin(self.url, value) if name == 'href' and value is not None else value
+
+class FakeDriver:
+	current_window_handle = 'main'
+	window_handles = ['main']
+
+	def __init__(self):
+		self.current_url = None
+		self.page_source = ''
+		self.soup = BeautifulSoup('', 'html.parser')
+		self.urls = []
+
+	def get(self, url):
+		self.urls.append(url)
+		self.page_source = requests.get(url).text
+		self.soup = BeautifulSoup(self.page_source, 'html.parser')
+		self.current_url = url
+
+	def find_elements_by_css_selector(self, selector):
+		return [FakeElement(tag, self.current_url) for tag in self.soup.select(selector)]
+
+	def find_element_by_class_name(self, name):
+		tag = self.soup.find(class_=name)
+		if tag is None:
+			raise NoSuchElementException(name)
+		return FakeElement(tag, self.current_url)
+
+	def execute_script(self, script, *args):
+		return 'en-US' if 'languages' in script else 'Mozilla/5.0'
+
+	def get_cookies(self):
+		return []
+
+	def quit(self):
+		pass
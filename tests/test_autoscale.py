@@ -0,0 +1,183 @@
+"""Workers added and retired by Autoscaler with --processes auto, on fake stats, host usage and clock"""
+import argparse
+import unittest
+from unittest import mock
+
+from indeed_resume_scraper import autoscale
+from indeed_resume_scraper.stats import RESUMES_WRITTEN, UNCHANGED_RESUMES, THROTTLED
+
+MB = 1024 * 1024
+
+class FakeClock:
+	"""Stands in for the time module of autoscale"""
+	def __init__(self):
+		self.now = 1000.0
+
+	def monotonic(self):
+		return self.now
+
+class FakeStats:
+	def __init__(self):
+		self.counters = {RESUMES_WRITTEN: 0, UNCHANGED_RESUMES: 0, THROTTLED: 0}
+
+	def snapshot(self):
+		return {'counters': dict(self.counters)}
+
+class FakeUsage:
+	def __init__(self):
+		self.busy = 0.2
+		self.memory = 8192 * MB
+
+	def cpu(self):
+		return self.busy
+
+	def available_memory(self):
+		return self.memory
+
+class AutoscalerTest(unittest.TestCase):
+	def setUp(self):
+		self.clock = FakeClock()
+		self.stats = FakeStats()
+		self.usage = FakeUsage()
+		self.retirements = autoscale.Retirements()
+		self.patches = [
+			mock.patch.object(autoscale, 'time', self.clock),
+			# memory per worker stays at WORKER_MEMORY_ESTIMATE
+			mock.patch.object(autoscale, 'process_tree_rss', lambda pid: None)
+		]
+		for patch in self.patches:
+			patch.start()
+		self.autoscaler = autoscale.Autoscaler(argparse.Namespace(processes=4), self.stats, self.retirements, self.usage)
+
+	def tearDown(self):
+		for patch in self.patches:
+			patch.stop()
+
+	def step(self, resumes_per_second=2.0, throttles=0, live=None):
+		"""Goes through an interval in which workers did resumes_per_second, returns # of workers added"""
+		self.clock.now += autoscale.AUTOSCALE_INTERVAL
+		self.stats.counters[RESUMES_WRITTEN] += int(resumes_per_second * autoscale.AUTOSCALE_INTERVAL)
+		self.stats.counters[THROTTLED] += throttles
+		return self.autoscaler.step(self.autoscaler.workers if live is None else live)
+
+	def retired(self):
+		retired = 0
+		while self.retirements.take():
+			retired += 1
+		return retired
+
+	def test_added_after_warming_up(self):
+		self.assertEqual(self.autoscaler.workers, autoscale.AUTOSCALE_START)
+		# browsers were starting and logging in
+		self.assertEqual(self.step(), 0)
+		self.assertEqual(self.step(), 1)
+		self.assertEqual(self.autoscaler.workers, 3)
+
+	def test_added_worker_kept_when_it_pays(self):
+		self.step()
+		self.assertEqual(self.step(2.0), 1)
+		self.step()
+		# 2 workers did 2 resumes per second, a third has to bring in at least half of one's 1
+		self.assertEqual(self.step(2.5), 1)
+		self.assertEqual(self.autoscaler.workers, 4)
+		self.assertEqual(self.retired(), 0)
+
+	def test_added_worker_retired_when_it_does_not_pay(self):
+		self.step()
+		self.assertEqual(self.step(2.0), 1)
+		self.step()
+		self.assertEqual(self.step(2.4), 0)
+		self.assertEqual(self.autoscaler.workers, 2)
+		self.assertEqual(self.retired(), 1)
+		# not added again for a while
+		for _ in range(autoscale.AUTOSCALE_HOLD - 1):
+			self.assertEqual(self.step(), 0)
+		self.assertEqual(self.step(), 1)
+
+	def test_retired_on_sustained_throttling_only(self):
+		self.step()
+		self.assertEqual(self.step(throttles=autoscale.AUTOSCALE_MAX_THROTTLES - 1), 1)
+		self.step(throttles=autoscale.AUTOSCALE_MAX_THROTTLES)
+		self.step(2.5)
+		# an interval without throttling in between
+		self.step(throttles=autoscale.AUTOSCALE_MAX_THROTTLES)
+		self.assertEqual(self.retired(), 0)
+		self.assertEqual(self.autoscaler.workers, 4)
+
+		for _ in range(autoscale.AUTOSCALE_THROTTLED_INTERVALS - 1):
+			self.assertEqual(self.step(2.5, throttles=autoscale.AUTOSCALE_MAX_THROTTLES), 0)
+		self.assertEqual(self.autoscaler.workers, 3)
+		self.assertEqual(self.retired(), 1)
+
+	def test_never_fewer_than_one(self):
+		# and none are added
+		self.usage.busy = 1.0
+		self.step()
+		self.step(live=1)
+		for _ in range(autoscale.AUTOSCALE_THROTTLED_INTERVALS * 2):
+			self.step(throttles=autoscale.AUTOSCALE_MAX_THROTTLES, live=1)
+		self.assertEqual(self.autoscaler.workers, 1)
+		self.assertEqual(self.retired(), 0)
+
+	def test_retired_on_memory_running_short(self):
+		self.step()
+		self.usage.memory = (autoscale.AUTOSCALE_MIN_FREE_MEMORY - 1) * MB
+		self.assertEqual(self.step(), 0)
+		self.assertEqual(self.autoscaler.workers, 1)
+		self.assertEqual(self.retired(), 1)
+
+	def test_not_added_without_headroom(self):
+		self.step()
+		self.usage.busy = autoscale.AUTOSCALE_MAX_CPU + 0.1
+		self.assertEqual(self.step(), 0)
+		self.usage.busy = 0.2
+		# no room for another browser
+		self.usage.memory = (autoscale.AUTOSCALE_MIN_FREE_MEMORY + autoscale.WORKER_MEMORY_ESTIMATE - 1) * MB
+		self.assertEqual(self.step(), 0)
+		self.usage.memory = 8192 * MB
+		self.assertEqual(self.step(), 1)
+
+	def test_not_added_past_limit(self):
+		self.step()
+		self.assertEqual(self.step(2.0), 1)
+		self.step()
+		self.assertEqual(self.step(3.0), 1)
+		self.step()
+		self.assertEqual(self.step(4.0), 0)
+		self.assertEqual(self.autoscaler.workers, 4)
+		self.assertEqual(self.autoscaler.most, 4)
+
+	def test_follows_workers_that_stopped(self):
+		self.step()
+		self.usage.memory = (autoscale.AUTOSCALE_MIN_FREE_MEMORY - 1) * MB
+		self.step()
+		self.usage.memory = 8192 * MB
+		# the retired worker stopped, asks left are dropped
+		self.retirements.request()
+		self.step(live=1)
+		self.assertEqual(self.retired(), 0)
+		self.assertEqual(self.autoscaler.workers, 1)
+
+class WorkerLimitTest(unittest.TestCase):
+	def setUp(self):
+		self.usage = FakeUsage()
+		self.patch = mock.patch.object(autoscale.os, 'cpu_count', lambda: 8)
+		self.patch.start()
+
+	def tearDown(self):
+		self.patch.stop()
+
+	def test_memory_budgeted_per_worker(self):
+		args = argparse.Namespace(recycle_memory=0, pipeline=False)
+		with self.assertLogs(level='INFO') as logs:
+			self.assertEqual(autoscale.worker_limit(args, self.usage), 7)
+		# (8192 * 0.8 - 512) MB shared by 7
+		self.assertEqual(args.recycle_memory, 863)
+		self.assertIn('Recycling browsers once they take up 863 MB', '\n'.join(logs.output))
+
+	def test_recycle_memory_given(self):
+		args = argparse.Namespace(recycle_memory=2048, pipeline=True, parsers=2)
+		with self.assertLogs(level='INFO') as logs:
+			self.assertEqual(autoscale.worker_limit(args, self.usage), 2)
+		self.assertEqual(args.recycle_memory, 2048)
+		self.assertNotIn('Recycling', '\n'.join(logs.output))
@@ -0,0 +1,146 @@
+"""Page cache of raw resume pages and results rebuilt from it by reparse"""
+import builtins
+import tempfile
+import random
+import unittest
+import glob
+import os
+from unittest import mock
+
+import mock_indeed
+from indeed_resume_scraper import cache, parsing, scraper
+
+def page(seed):
+	# random so that pages do not compress to next to nothing
+	return '<html><body>%x</body></html>' % random.Random(seed).getrandbits(4096 * 8)
+
+def full_disk_open(filename, mode='r'):
+	"""open whose files fail half way through writing"""
+	f = builtins.open(filename, mode)
+	write = f.write
+	def write_half(data):
+		write(data[:len(data) // 2])
+		raise OSError('No space left on device')
+	f.write = write_half
+	return f
+
+def page_files(directory):
+	extensions = (cache.CACHE_GZIP_EXTENSION, cache.CACHE_ZSTD_EXTENSION)
+	return sorted(filename for filename in glob.glob(os.path.join(directory, '*', '*')) if filename.endswith(extensions))
+
+class PageCacheTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.cache = cache.PageCache(self.tmp.name)
+
+	def tearDown(self):
+		self.cache.close()
+		self.tmp.cleanup()
+
+	def test_pages_stored_once(self):
+		self.cache.put('r0', page(0))
+		size = self.cache.size()
+		self.cache.put('r1', page(0))
+		self.assertEqual(self.cache.get('r1'), page(0))
+		self.assertEqual(self.cache.size(), size)
+		self.assertEqual(len(page_files(self.tmp.name)), 1)
+
+	def test_changed_page_replaces_old_one(self):
+		self.cache.put('r0', page(0))
+		self.cache.put('r0', page(1))
+		self.assertEqual(self.cache.get('r0'), page(1))
+		self.assertEqual(len(page_files(self.tmp.name)), 1)
+		self.assertEqual(self.cache.size(), os.path.getsize(page_files(self.tmp.name)[0]))
+
+	def test_least_recently_used_evicted(self):
+		self.cache.put('r0', page(0))
+		self.cache.max_bytes = int(self.cache.size() * 3.5)
+		self.cache.put('r1', page(1))
+		self.cache.put('r2', page(2))
+		# used since, r1 goes first
+		self.assertEqual(self.cache.get('r0'), page(0))
+		self.cache.put('r3', page(3))
+
+		self.assertIsNone(self.cache.get('r1'))
+		for idx in (0, 2, 3):
+			self.assertEqual(self.cache.get('r%d' % idx), page(idx))
+		self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+		self.assertEqual(self.cache.size(), sum(os.path.getsize(filename) for filename in page_files(self.tmp.name)))
+
+	def test_page_written_whole_or_not_at_all(self):
+		with mock.patch.object(cache, 'open', full_disk_open, create=True):
+			with self.assertRaisesRegex(OSError, 'No space left on device'):
+				self.cache.put('r0', page(0))
+		# neither a half written page nor an index entry pointing to one
+		self.assertEqual(page_files(self.tmp.name), [])
+		self.assertEqual(glob.glob(os.path.join(self.tmp.name, '*', '*.tmp')), [])
+		self.assertIsNone(self.cache.get('r0'))
+		self.assertEqual(self.cache.size(), 0)
+		self.cache.put('r0', page(0))
+		self.assertEqual(self.cache.get('r0'), page(0))
+
+class AtomicWriteTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.filename = os.path.join(self.tmp.name, 'checkpoint.json')
+		with open(self.filename, 'w') as f:
+			f.write('before')
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def test_replaced_once_written(self):
+		with cache.atomic_write(self.filename) as tmp_filename:
+			with open(tmp_filename, 'w') as f:
+				f.write('after')
+			with open(self.filename) as f:
+				self.assertEqual(f.read(), 'before')
+		with open(self.filename) as f:
+			self.assertEqual(f.read(), 'after')
+		self.assertEqual(os.listdir(self.tmp.name), ['checkpoint.json'])
+
+	def test_left_alone_after_error(self):
+		with self.assertRaisesRegex(OSError, 'No space left on device'):
+			with cache.atomic_write(self.filename) as tmp_filename:
+				with full_disk_open(tmp_filename, 'w') as f:
+					f.write('after')
+		with open(self.filename) as f:
+			self.assertEqual(f.read(), 'before')
+		self.assertEqual(os.listdir(self.tmp.name), ['checkpoint.json'])
+
+class ReparseTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.cwd = os.getcwd()
+		# results files are named relative to the working directory
+		os.chdir(self.tmp.name)
+		self.directory = os.path.join(self.tmp.name, 'cache')
+		self.pages = {}
+		for idx, filename in enumerate(sorted(glob.glob(os.path.join(mock_indeed.FIXTURES_DIR, 'resumes', '*.html')))):
+			with open(filename) as f:
+				self.pages['r%d' % idx] = f.read()
+		page_cache = cache.PageCache(self.directory)
+		for idd, page_source in self.pages.items():
+			page_cache.put(idd, page_source)
+		# e.g a throttled page that was cached
+		page_cache.put('broken', '<html><body>Too many requests</body></html>')
+		page_cache.close()
+
+	def tearDown(self):
+		os.chdir(self.cwd)
+		self.tmp.cleanup()
+
+	def reparse(self):
+		scraper.reparse_command([self.directory, '--name', 'rebuilt', '--processes', '2'])
+		with open(scraper.results_filename('rebuilt'), 'rb') as f:
+			return f.read()
+
+	def test_results_rebuilt_from_cache(self):
+		results = self.reparse()
+		expected = ''.join(parsing.parse_resume(idd, self.pages[idd]).toJSON() + '\n' for idd in sorted(self.pages))
+		self.assertEqual(results.decode('utf-8'), expected)
+		# written then renamed, nothing is left behind
+		self.assertEqual(sorted(os.listdir(self.tmp.name)), ['cache', scraper.results_filename('rebuilt')])
+
+	def test_same_results_every_time(self):
+		self.assertEqual(self.reparse(), self.reparse())
@@ -0,0 +1,147 @@
+"""Search pages leased to workers sharing one frontier, through SQLite or the frontier command"""
+from http.server import ThreadingHTTPServer
+import threading
+import tempfile
+import unittest
+import os
+from unittest import mock
+
+import requests
+
+from indeed_resume_scraper import frontier
+
+class FakeClock:
+	"""Stands in for the time module of frontier, leases expire as it is moved on"""
+	def __init__(self):
+		self.now = 1000000.0
+
+	def time(self):
+		return self.now
+
+	def sleep(self, seconds):
+		self.now += seconds
+
+class FrontierTestCase(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.filename = os.path.join(self.tmp.name, 'crawl.db')
+		self.clock = FakeClock()
+		self.patch = mock.patch.object(frontier, 'time', self.clock)
+		self.patch.start()
+		self.first = frontier.SqliteFrontier(self.filename, 'first')
+		self.first.add_pages(range(0, 250, 50))
+
+	def tearDown(self):
+		self.first.close()
+		self.patch.stop()
+		self.tmp.cleanup()
+
+class SqliteFrontierTest(FrontierTestCase):
+	def setUp(self):
+		super(SqliteFrontierTest, self).setUp()
+		self.second = frontier.SqliteFrontier(self.filename, 'second')
+
+	def tearDown(self):
+		self.second.close()
+		super(SqliteFrontierTest, self).tearDown()
+
+	def test_pages_leased_once(self):
+		self.assertEqual(self.first.take(), ((0, []), False))
+		self.assertEqual(self.second.take(), ((50, []), False))
+		for offset in (100, 150, 200):
+			self.assertEqual(self.first.take()[0][0], offset)
+		# the others may still fail and put theirs back
+		self.assertEqual(self.second.take(), (None, True))
+		self.assertIsNone(self.second.get(wait=False))
+
+	def test_expired_lease_given_to_another_worker(self):
+		self.assertEqual(self.first.take(), ((0, []), False))
+		self.first.resume_done(0, 'r1')
+		self.assertEqual(self.second.take(), ((50, []), False))
+		self.clock.sleep(frontier.LEASE_TIME - 1)
+		self.first.heartbeat()
+		self.clock.sleep(frontier.LEASE_TIME - 1)
+		# first kept its lease alive, second did not
+		self.assertEqual(self.first.take(), ((50, []), False))
+		self.clock.sleep(2)
+		# first missed a heartbeat, its page goes on from the resumes it did
+		self.assertEqual(self.second.take(), ((0, ['r1']), False))
+		self.assertEqual(self.first.status()['pages'], {'leased': 2, 'pending': 3})
+
+	def test_abandoned_after_max_failures(self):
+		workers = [self.first, self.second]
+		for attempt in range(frontier.MAX_PAGE_FAILURES):
+			worker = workers[attempt % 2]
+			self.assertEqual(worker.take()[0][0], 0)
+			worker.failed(0)
+		self.assertEqual(self.first.status()['pages'], {'abandoned': 1, 'pending': 4})
+		while True:
+			page, _ = self.second.take()
+			if page is None:
+				break
+			self.second.completed(page[0])
+		# not given out again, but the crawl is not finished without it
+		self.assertEqual(self.first.status()['pages'], {'abandoned': 1, 'done': 4})
+		self.assertFalse(self.first.is_finished())
+
+	def test_end_of_results_seen_by_all(self):
+		self.assertEqual(self.first.take()[0][0], 0)
+		self.assertEqual(self.second.take()[0][0], 50)
+		# the first page is the last one
+		self.first.results_end(50)
+		self.first.completed(0)
+		self.assertTrue(self.second.is_past_end(100))
+		# a page taken before the end was found is not retried
+		self.second.failed(50)
+		self.assertEqual(self.second.take(), (None, False))
+		self.assertTrue(self.second.is_finished())
+		self.assertEqual(self.first.status(), {'pages': {'done': 2, 'pending': 3}, 'end': 50})
+
+	def test_end_not_moved_back(self):
+		self.first.results_end(120)
+		self.second.results_end(170)
+		self.assertEqual(self.first.end(), 120)
+
+class RemoteFrontierTest(FrontierTestCase):
+	def setUp(self):
+		super(RemoteFrontierTest, self).setUp()
+		self.server = ThreadingHTTPServer(('127.0.0.1', 0), frontier.FrontierHandler)
+		self.server.daemon_threads = True
+		self.server.filename = self.filename
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+		self.remote = frontier.RemoteFrontier(self.url + '/', 'remote')
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		super(RemoteFrontierTest, self).tearDown()
+
+	def test_shared_with_local_workers(self):
+		self.assertEqual(self.remote.take(), ((0, []), False))
+		self.remote.resume_done(0, 'r1')
+		self.assertEqual(self.first.take(), ((50, []), False))
+		self.first.results_end(90)
+		self.assertTrue(self.remote.is_past_end(100))
+		self.first.completed(50)
+		self.assertEqual(self.remote.take(), (None, True))
+
+		# the remote worker died, its page goes on locally once its lease expires
+		self.clock.sleep(frontier.LEASE_TIME + 1)
+		self.assertEqual(self.first.take(), ((0, ['r1']), False))
+		self.first.completed(0)
+		self.assertTrue(self.remote.is_finished())
+		status = requests.get(self.url + '/status').json()
+		self.assertEqual(status, {'pages': {'done': 2, 'pending': 3}, 'end': 90})
+
+	def test_leases_renewed_by_heartbeats(self):
+		self.assertEqual(self.remote.take()[0][0], 0)
+		self.clock.sleep(frontier.LEASE_TIME - 1)
+		self.remote.heartbeat()
+		self.clock.sleep(frontier.LEASE_TIME - 1)
+		self.assertEqual(self.first.take()[0][0], 50)
+		self.remote.failed(0)
+		self.assertEqual(self.first.take(), ((0, []), False))
+
+	def test_unknown_method(self):
+		self.assertEqual(requests.post(self.url + '/close', json={'worker': 'remote', 'args': []}).status_code, 404)
@@ -0,0 +1,134 @@
+"""Incremental runs: unchanged resumes left out by IncrementalSink, then merged into a dataset"""
+import argparse
+import tempfile
+import unittest
+import os
+from unittest import mock
+
+from indeed_resume_scraper import outputs, parsing, scraper, stats
+
+def page(text, markup=''):
+	return ('<html><body><div class="%s"%s><h1>Resume</h1><p>%s</p></div><div>%s</div></body></html>'
+		% (scraper.RESUME_BODY_MARKER, markup, text, markup))
+
+def resume(idd, summary):
+	return parsing.Resume(idd,
+		summary=[summary],
+		jobs=[parsing.Job('Infirmière', 'Hôpital Saint-Jérôme', 'janvier 2015 to Present', ['Soins palliatifs ✓'])],
+		schools=[parsing.School('Baccalauréat', 'Université Laval', None)],
+		skills=[parsing.Skill('Français', '5+ ans')],
+		additional=['東京'])
+
+class RecordingSink:
+	def __init__(self):
+		self.pages = []
+
+	def put(self, idd, page_source):
+		self.pages.append((idd, page_source))
+
+	def close(self):
+		pass
+
+class IncrementalSinkTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		stats.set_stats(stats.Stats())
+		self.recorded = RecordingSink()
+		self.seen_index = scraper.SeenIndex(os.path.join(self.tmp.name, 'seen.db'))
+		self.sink = scraper.IncrementalSink(self.recorded, self.seen_index)
+
+	def tearDown(self):
+		self.sink.close()
+		stats.set_stats(None)
+		self.tmp.cleanup()
+
+	def unchanged(self):
+		return stats.get_stats().snapshot()['counters'][stats.UNCHANGED_RESUMES]
+
+	def test_new_changed_and_unchanged(self):
+		self.sink.put('r0', page('Infirmière'))
+		self.sink.put('r1', page('Comptable'))
+		self.assertEqual([idd for idd, _ in self.recorded.pages], ['r0', 'r1'])
+		self.assertEqual(self.unchanged(), 0)
+
+		# markup differs between the browser and HTTP, the text does not
+		self.sink.put('r0', page('<b>Infirmière</b>', ' data-tn-component="resume"'))
+		self.sink.put('r1', page('Comptable &amp; auditrice'))
+		self.sink.put('r2', page('Infirmière'))
+		self.assertEqual([idd for idd, _ in self.recorded.pages], ['r0', 'r1', 'r1', 'r2'])
+		self.assertEqual(self.recorded.pages[2][1], page('Comptable &amp; auditrice'))
+		self.assertEqual(self.unchanged(), 1)
+		self.assertEqual(self.seen_index.content_hash('r1'), scraper.resume_content_hash(page('Comptable & auditrice')))
+
+		# unchanged again once the change is recorded
+		self.sink.put('r1', page('Comptable &amp; auditrice'))
+		self.assertEqual(len(self.recorded.pages), 4)
+		self.assertEqual(self.unchanged(), 2)
+
+	def test_same_text_same_hash(self):
+		self.assertEqual(scraper.resume_content_hash(page('Infirmière')),
+			scraper.resume_content_hash(page('<b>Infirmière</b>\n', ' class="extracted"')))
+		self.assertNotEqual(scraper.resume_content_hash(page('Infirmière')),
+			scraper.resume_content_hash(page('Infirmier')))
+
+class MergeTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def filename(self, name):
+		return os.path.join(self.tmp.name, name)
+
+	def write(self, filename, resumes):
+		output = outputs.open_output(filename, outputs.results_format(filename), override=True)
+		for r in resumes:
+			output.write(r.id, r.toJSON())
+		output.close()
+
+	def merge(self, dataset, *updates):
+		scraper.merge(argparse.Namespace(dataset=dataset, updates=list(updates)))
+		return list(outputs.read_results(dataset, outputs.results_format(dataset)))
+
+	def assertMerged(self, dataset, extension):
+		self.write(dataset, [resume('r0', 'Première'), resume('r1', 'Deuxième'), resume('r2', 'Troisième')])
+		first = self.filename('first' + extension)
+		second = self.filename('second' + extension)
+		self.write(first, [resume('r1', 'Deuxième, changée'), resume('r3', 'Nouvelle')])
+		self.write(second, [resume('r3', 'Nouvelle, changée')])
+
+		lines = self.merge(dataset, first, second)
+		# kept in dataset order, then the updates, later updates winning
+		expected = [resume('r0', 'Première'), resume('r2', 'Troisième'), resume('r1', 'Deuxième, changée'), resume('r3', 'Nouvelle, changée')]
+		self.assertEqual(lines, [r.toJSON() for r in expected])
+		self.assertEqual(sorted(os.listdir(self.tmp.name)), sorted(os.path.basename(f) for f in (dataset, first, second)))
+
+	def test_into_jsonl(self):
+		self.assertMerged(self.filename('dataset.json'), '.json')
+
+	@unittest.skipIf(outputs.PARQUET not in outputs.OUTPUT_FORMATS, 'pyarrow is not installed')
+	def test_into_parquet(self):
+		self.assertMerged(self.filename('dataset.parquet'), '.parquet')
+
+	def test_dataset_created(self):
+		update = self.filename('update.json')
+		self.write(update, [resume('r0', 'Première')])
+		self.assertEqual(self.merge(self.filename('dataset.json'), update), [resume('r0', 'Première').toJSON()])
+
+	@unittest.skipIf(outputs.PARQUET not in outputs.OUTPUT_FORMATS or parsing.orjson is None, 'pyarrow or orjson is not installed')
+	def test_same_bytes_with_either_encoder(self):
+		# lines of parquet updates are serialized again by read_results
+		update = self.filename('update.parquet')
+		self.write(update, [resume('r0', 'Première'), resume('r1', 'Deuxième')])
+		merged = []
+		for encoder in (parsing.orjson, None):
+			dataset = self.filename('dataset.json')
+			self.write(dataset, [resume('r2', 'Troisième')])
+			with mock.patch.object(parsing, 'orjson', encoder):
+				self.merge(dataset, update)
+			with open(dataset, 'rb') as f:
+				merged.append(f.read())
+		self.assertEqual(merged[0], merged[1])
+		expected = ''.join(resume(idd, summary).toJSON() + '\n' for idd, summary in [('r2', 'Troisième'), ('r0', 'Première'), ('r1', 'Deuxième')])
+		self.assertEqual(merged[0], expected.encode('utf-8'))
@@ -0,0 +1,49 @@
+"""Index of results kept up to date as they are appended to and rewritten"""
+import argparse
+import tempfile
+import unittest
+import json
+import os
+
+from indeed_resume_scraper import index, scraper
+
+def resume(idd, skill):
+	return {'id': idd, 'skills': [{'skill': skill}], 'jobs': [], 'schools': []}
+
+def write_results(filename, resumes, mode='w'):
+	with open(filename, mode) as f:
+		for r in resumes:
+			f.write(json.dumps(r) + '\n')
+
+class IndexUpdateTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.directory = os.path.join(self.tmp.name, 'index')
+		self.dataset = os.path.join(self.tmp.name, 'resume_output_dataset.json')
+		write_results(self.dataset, [resume('r%d' % i, 'cobol') for i in range(5)])
+		index.InvertedIndex(self.directory).update([self.dataset])
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def test_merged_dataset_is_read_again(self):
+		update = os.path.join(self.tmp.name, 'resume_output_update.json')
+		write_results(update, [resume('r0', 'rust')] + [resume('r%d' % i, 'python') for i in range(5, 8)])
+		scraper.merge(argparse.Namespace(dataset=self.dataset, updates=[update]))
+
+		inverted = index.InvertedIndex(self.directory)
+		inverted.update([self.dataset])
+		self.assertEqual(inverted.num_resumes(), 8)
+		self.assertEqual(dict(inverted.top(index.SKILL_TERM)), {'cobol': 4, 'python': 3, 'rust': 1})
+
+	def test_appended_resumes_are_added(self):
+		write_results(self.dataset, [resume('r0', 'rust'), resume('r5', 'python')], mode='a')
+
+		inverted = index.InvertedIndex(self.directory)
+		inverted.update([self.dataset])
+		self.assertEqual(inverted.num_resumes(), 6)
+		self.assertEqual(dict(inverted.top(index.SKILL_TERM)), {'cobol': 4, 'python': 1, 'rust': 1})
+		self.assertEqual(inverted.manifest['sources'][os.path.abspath(self.dataset)]['resumes'], 7)
+
+if __name__ == '__main__':
+	unittest.main()
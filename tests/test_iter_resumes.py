@@ -0,0 +1,56 @@
+"""iter_resumes streaming resumes of a search on mock_indeed.py"""
+import unittest
+from unittest import mock
+from selenium.common.exceptions import WebDriverException
+
+import mock_indeed
+from fake_browser import FakeDriver
+from indeed_resume_scraper import scraper
+
+# paced fast enough not to slow tests down
+OPTIONS = {'fetch': scraper.HTTP_FETCH, 'prefetch': 0, 'rate': 1000.0, 'max_rate': 1000.0, 'burst': 1000}
+
+def broken_driver(args):
+	raise WebDriverException('browser did not start')
+
+class IterResumesTest(unittest.TestCase):
+	def setUp(self):
+		self.server = mock_indeed.serve(mock_indeed.MockIndeed(total=120))
+		self.patches = [
+			mock.patch.object(scraper, 'INDEED_RESUME_SEARCH_BASE_URL', mock_indeed.server_url(self.server) + '/search?%s'),
+			mock.patch.object(scraper, 'create_driver', lambda args: FakeDriver())
+		]
+		for patch in self.patches:
+			patch.start()
+
+	def tearDown(self):
+		for patch in self.patches:
+			patch.stop()
+		self.server.shutdown()
+
+	def test_resumes_of_all_search_pages(self):
+		idds = [resume.id for resume in scraper.iter_resumes('nurse', **OPTIONS)]
+		self.assertEqual(sorted(idds), [mock_indeed.RESUME_ID_FORMAT % idx for idx in range(120)])
+
+	def test_errors_are_raised(self):
+		with mock.patch.object(scraper, 'create_driver', broken_driver):
+			resumes = scraper.iter_resumes('nurse', **OPTIONS)
+			with self.assertRaisesRegex(WebDriverException, 'browser did not start'):
+				next(resumes)
+
+	def test_closing_stops_scraping(self):
+		resumes = scraper.iter_resumes('nurse', **OPTIONS)
+		next(resumes)
+		resumes.close()
+		# the search page being worked on is finished at most
+		self.assertLessEqual(self.server.site.stats()[mock_indeed.RESUME]['count'], 50)
+
+	def test_generators_are_paced_apart(self):
+		first = scraper.iter_resumes('nurse', **OPTIONS)
+		second = scraper.iter_resumes('nurse', **OPTIONS)
+		next(first)
+		next(second)
+		# closing one leaves the other going, neither touches the limiter of the process
+		first.close()
+		self.assertEqual(len(list(second)), 119)
+		self.assertIsNone(scraper.rate_limiter)
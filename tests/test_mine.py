@@ -0,0 +1,38 @@
+"""mine cleaning up after errors in setting up its sink"""
+import tempfile
+import unittest
+import os
+from unittest import mock
+
+from indeed_resume_scraper import scraper
+
+def full_disk(filename, output_format, override):
+	raise OSError('No space left on device')
+
+class MineSetupErrorTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.args = scraper.scraping_options(seen_index=os.path.join(self.tmp.name, 'seen.db'))
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def test_error_opening_results_is_raised(self):
+		# nothing was opened yet, closing must not hide the error
+		with mock.patch.object(scraper, 'open_output', full_disk):
+			with self.assertRaisesRegex(OSError, 'No space left on device'):
+				scraper.mine(self.args, os.path.join(self.tmp.name, 'results.json'), None, None, reraise=True)
+
+	def test_seen_index_is_closed_after_error(self):
+		opened = []
+		def open_seen_index(args):
+			opened.append(mock.Mock())
+			return opened[-1]
+		# the error comes once the seen index is open
+		with mock.patch.object(scraper, 'open_seen_index', open_seen_index), \
+				mock.patch.object(scraper, 'open_page_cache', mock.Mock(side_effect=OSError('cache unreadable'))):
+			with self.assertRaisesRegex(OSError, 'cache unreadable'):
+				scraper.mine(self.args, os.path.join(self.tmp.name, 'results.json'), None, None, reraise=True)
+		# one for marking resumes written as seen, then the one checked before fetching
+		self.assertEqual(len(opened), 2)
+		opened[1].close.assert_called_once_with()
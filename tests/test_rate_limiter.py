@@ -0,0 +1,109 @@
+"""Pacing of requests by TokenBucket and AdaptiveRateLimiter, on a fake clock"""
+import unittest
+from unittest import mock
+
+from indeed_resume_scraper import scraper
+
+class FakeClock:
+	"""Stands in for the time module of scraper, sleeping moves the clock on"""
+	def __init__(self):
+		self.now = 1000.0
+
+	def monotonic(self):
+		return self.now
+
+	def sleep(self, seconds):
+		self.now += seconds
+
+class RateLimiterTestCase(unittest.TestCase):
+	def setUp(self):
+		self.clock = FakeClock()
+		self.patch = mock.patch.object(scraper, 'time', self.clock)
+		self.patch.start()
+
+	def tearDown(self):
+		self.patch.stop()
+
+	def assertRate(self, limiter, rate):
+		self.assertAlmostEqual(limiter.rate.value, rate)
+
+class TokenBucketTest(RateLimiterTestCase):
+	def test_burst_then_rate(self):
+		bucket = scraper.TokenBucket(2.0, 3)
+		for _ in range(3):
+			bucket.acquire()
+		self.assertEqual(self.clock.now, 1000.0)
+		for _ in range(4):
+			bucket.acquire()
+		self.assertAlmostEqual(self.clock.now, 1002.0)
+
+	def test_tokens_saved_up_to_burst(self):
+		bucket = scraper.TokenBucket(2.0, 3)
+		self.clock.sleep(60)
+		for _ in range(3):
+			self.assertEqual(bucket.reserve(), 0)
+		self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+class AdaptiveRateLimiterTest(RateLimiterTestCase):
+	def test_additive_increase(self):
+		limiter = scraper.AdaptiveRateLimiter(1.0, 5, max_rate=2.0)
+		for _ in range(10):
+			limiter.page_loaded()
+		self.assertRate(limiter, 1.0 + 10 * scraper.RATE_INCREASE)
+
+	def test_clamped_to_max_rate(self):
+		limiter = scraper.AdaptiveRateLimiter(1.0, 5, max_rate=1.2)
+		for _ in range(100):
+			limiter.page_loaded()
+		self.assertRate(limiter, 1.2)
+
+	def test_multiplicative_decrease(self):
+		limiter = scraper.AdaptiveRateLimiter(4.0, 5)
+		limiter.throttled('timeout')
+		self.assertRate(limiter, 4.0 * scraper.RATE_DECREASE)
+		# saved up tokens are spent, the next request waits a round at the new rate
+		self.assertAlmostEqual(limiter.reserve(), 1 / (4.0 * scraper.RATE_DECREASE))
+
+	def test_clamped_to_min_rate(self):
+		limiter = scraper.AdaptiveRateLimiter(0.3, 1, min_rate=0.2)
+		limiter.throttled('timeout')
+		self.assertRate(limiter, 0.2)
+		self.clock.sleep(scraper.RATE_DECREASE_COOLDOWN)
+		limiter.throttled('timeout')
+		self.assertRate(limiter, 0.2)
+
+	def test_cooldown_scales_with_rate(self):
+		# a round of 5 requests at 4 per second is answered within 1.25 seconds
+		limiter = scraper.AdaptiveRateLimiter(4.0, 5)
+		limiter.throttled('timeout')
+		self.clock.sleep(1.2)
+		limiter.throttled('no resumes found')
+		self.assertRate(limiter, 2.0)
+		self.clock.sleep(0.1)
+		limiter.throttled('no resumes found')
+		self.assertRate(limiter, 1.0)
+		# now 5 requests at 2 per second
+		self.clock.sleep(2.4)
+		limiter.throttled('timeout')
+		self.assertRate(limiter, 1.0)
+		self.clock.sleep(0.2)
+		limiter.throttled('timeout')
+		self.assertRate(limiter, 0.5)
+
+	def test_cooldown_capped(self):
+		# 5 requests at 0.5 per second would take 10 seconds
+		limiter = scraper.AdaptiveRateLimiter(0.5, 5)
+		limiter.throttled('timeout')
+		self.clock.sleep(scraper.RATE_DECREASE_COOLDOWN - 0.1)
+		limiter.throttled('timeout')
+		self.assertRate(limiter, 0.25)
+		self.clock.sleep(0.2)
+		limiter.throttled('timeout')
+		self.assertRate(limiter, 0.125)
+
+	def test_increase_after_decrease(self):
+		limiter = scraper.AdaptiveRateLimiter(2.0, 5)
+		limiter.throttled('danger alert')
+		for _ in range(4):
+			limiter.page_loaded()
+		self.assertRate(limiter, 1.0 + 4 * scraper.RATE_INCREASE)
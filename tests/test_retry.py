@@ -0,0 +1,130 @@
+"""Retry queue backoff and the retry command fetching resumes of it from mock_indeed.py"""
+import multiprocessing
+import tempfile
+import unittest
+import time
+import json
+import os
+from unittest import mock
+
+import mock_indeed
+from fake_browser import FakeDriver
+from indeed_resume_scraper import scraper
+
+class FakeClock:
+	"""Stands in for the time module of scraper, retries come due as it is moved on"""
+	def __init__(self):
+		self.now = 1000000.0
+
+	def time(self):
+		return self.now
+
+	def sleep(self, seconds):
+		self.now += seconds
+
+def resume_link(server, idx):
+	return '%s/resume/%s?sp=0' % (mock_indeed.server_url(server), mock_indeed.RESUME_ID_FORMAT % idx)
+
+class RetryQueueTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.clock = FakeClock()
+		self.patch = mock.patch.object(scraper, 'time', self.clock)
+		self.patch.start()
+		self.queue = scraper.RetryQueue(os.path.join(self.tmp.name, 'retries.db'), 'resume_output_test.json')
+		self.link = 'https://resumes.indeed.com/resume/abc123?sp=0'
+
+	def tearDown(self):
+		self.queue.close()
+		self.patch.stop()
+		self.tmp.cleanup()
+
+	def test_backoff_doubles(self):
+		for attempt in range(1, scraper.RETRY_MAX_ATTEMPTS):
+			self.queue.add(self.link, 'timeout')
+			backoff = scraper.RETRY_BACKOFF * 2 ** (attempt - 1)
+			self.assertEqual(self.queue.next_try(), self.clock.now + backoff)
+			self.clock.sleep(backoff - 1)
+			self.assertEqual(self.queue.due(), [])
+			self.clock.sleep(1)
+			self.assertEqual(self.queue.due(), [(self.link, 'resume_output_test.json')])
+
+	def test_given_up_after_max_attempts(self):
+		for attempt in range(scraper.RETRY_MAX_ATTEMPTS):
+			self.queue.add(self.link, 'request failed' if attempt % 2 else 'timeout')
+		self.clock.sleep(scraper.RETRY_BACKOFF * 2 ** scraper.RETRY_MAX_ATTEMPTS)
+		self.assertEqual(self.queue.due(), [])
+		self.assertIsNone(self.queue.next_try())
+		self.assertEqual((self.queue.pending(), self.queue.given_up()), (0, 1))
+		reasons = self.queue.connection.execute('SELECT reasons FROM retries').fetchone()[0]
+		self.assertEqual(json.loads(reasons), ['timeout', 'request failed'] * 2 + ['timeout'])
+
+	def test_done_taken_off(self):
+		self.queue.add(self.link, 'timeout')
+		self.queue.done('abc123')
+		self.queue.done('never-queued')
+		self.assertEqual((self.queue.pending(), self.queue.given_up()), (0, 0))
+
+class ScrapedAgainTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.server = mock_indeed.serve(mock_indeed.MockIndeed(total=50))
+		self.results = os.path.join(self.tmp.name, 'resume_output_again.json')
+		self.queue_filename = os.path.join(self.tmp.name, 'retries.db')
+		self.manager = multiprocessing.Manager()
+
+	def tearDown(self):
+		self.manager.shutdown()
+		self.server.shutdown()
+		self.tmp.cleanup()
+
+	def test_resumes_scraped_again_are_not_retried(self):
+		queue = scraper.RetryQueue(self.queue_filename, self.results)
+		# given up on by an earlier run of the same search
+		for idx in (3, 7):
+			queue.add(resume_link(self.server, idx), 'timeout')
+		queue.close()
+
+		args = scraper.scraping_options(fetch=scraper.HTTP_FETCH, prefetch=0, rate=1000.0, max_rate=1000.0, burst=1000, retry_queue=self.queue_filename)
+		search_pages = scraper.SearchPages(self.manager, None, [0])
+		with mock.patch.object(scraper, 'create_driver', lambda args: FakeDriver()):
+			scraper.mine(args, self.results, search_pages, mock_indeed.server_url(self.server) + '/search?q=nurse', reraise=True)
+
+		queue = scraper.RetryQueue(self.queue_filename)
+		self.assertEqual((queue.pending(), queue.given_up()), (0, 0))
+		queue.close()
+		with open(self.results) as f:
+			idds = [json.loads(line)['id'] for line in f]
+		self.assertEqual(sorted(idds), [mock_indeed.RESUME_ID_FORMAT % idx for idx in range(50)])
+
+class RetryCommandTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.server = mock_indeed.serve(mock_indeed.MockIndeed(total=10))
+		self.results = os.path.join(self.tmp.name, 'resume_output_retried.json')
+		self.queue_filename = os.path.join(self.tmp.name, 'retries.db')
+		queue = scraper.RetryQueue(self.queue_filename, self.results)
+		for idx in range(4):
+			queue.add(resume_link(self.server, idx), 'timeout')
+		# due right away instead of after the backoff
+		queue.connection.execute('UPDATE retries SET next_try = 0')
+		queue.close()
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.tmp.cleanup()
+
+	def test_retries_are_paced(self):
+		args = scraper.scraping_options(fetch=scraper.HTTP_FETCH, rate=4.0, burst=1)
+		args.retry_queue = self.queue_filename
+		t = time.monotonic()
+		with mock.patch.object(scraper, 'create_driver', lambda args: FakeDriver()):
+			scraper.retry(args)
+		seconds = time.monotonic() - t
+
+		with open(self.results) as f:
+			self.assertEqual(len([json.loads(line) for line in f]), 4)
+		# the browser starts on the first resume, then all are fetched over HTTP
+		self.assertEqual(self.server.site.stats()[mock_indeed.RESUME]['count'], 5)
+		# the browser's first page and 4 resumes at 4 requests per second, the first one out of the burst
+		self.assertGreaterEqual(seconds, 0.9)
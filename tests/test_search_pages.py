@@ -0,0 +1,109 @@
+"""Search pages shared by workers, checkpointed for --resume"""
+import multiprocessing
+import tempfile
+import unittest
+import json
+import os
+from unittest import mock
+
+import mock_indeed
+from fake_browser import FakeDriver
+from indeed_resume_scraper import scraper
+
+class SearchPagesTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.checkpoint = os.path.join(self.tmp.name, 'checkpoint_test.json')
+		self.manager = multiprocessing.Manager()
+		# 0, 50, 100, 150 and 200
+		self.search_pages = scraper.SearchPages.create(self.manager, self.checkpoint, 0, 250)
+
+	def tearDown(self):
+		self.manager.shutdown()
+		self.tmp.cleanup()
+
+	def saved(self):
+		with open(self.checkpoint) as f:
+			return json.load(f)
+
+	def test_resumed_from_checkpoint(self):
+		self.assertEqual(self.search_pages.get(), (0, []))
+		self.search_pages.resume_done(0, 'r1')
+		self.assertEqual(self.search_pages.get(), (50, []))
+		self.search_pages.completed(50)
+
+		# as if the run was killed with page 0 half done
+		search_pages = scraper.SearchPages.load(self.manager, self.checkpoint)
+		self.assertEqual(search_pages.get(wait=False), (0, ['r1']))
+		self.assertEqual(search_pages.get(wait=False), (100, []))
+		# written then renamed, nothing is left behind
+		self.assertEqual(os.listdir(self.tmp.name), [os.path.basename(self.checkpoint)])
+
+	def test_failed_page_is_retried_last(self):
+		self.assertEqual(self.search_pages.get(), (0, []))
+		self.search_pages.failed(0)
+		self.assertEqual(self.search_pages.pending[:], [50, 100, 150, 200, 0])
+
+	def test_abandoned_after_max_retries(self):
+		search_pages = scraper.SearchPages(self.manager, self.checkpoint, [0])
+		for attempt in range(scraper.MAX_RETRIES - 1):
+			self.assertEqual(search_pages.get(wait=False), (0, []))
+			search_pages.failed(0)
+		self.assertEqual(search_pages.get(wait=False), (0, []))
+		search_pages.failed(0)
+		self.assertIsNone(search_pages.get(wait=False))
+		self.assertEqual(self.saved(), {'pending': [], 'done': {}, 'abandoned': [0], 'end': None})
+		self.assertFalse(search_pages.is_finished())
+
+		# given another chance once resumed
+		search_pages = scraper.SearchPages.load(self.manager, self.checkpoint)
+		self.assertEqual(search_pages.get(wait=False), (0, []))
+
+	def test_pages_past_the_end_are_dropped(self):
+		self.assertEqual(self.search_pages.get()[0], 0)
+		self.assertEqual(self.search_pages.get()[0], 50)
+		self.search_pages.results_end(70)
+		self.search_pages.completed(0)
+		self.search_pages.completed(50)
+		self.assertEqual(self.saved()['pending'], [])
+		self.assertEqual(self.saved()['end'], 70)
+		self.assertIsNone(self.search_pages.get(wait=False))
+		self.assertTrue(self.search_pages.is_finished())
+
+	def test_taken_page_past_the_end_is_not_retried(self):
+		self.assertEqual(self.search_pages.get()[0], 0)
+		self.assertEqual(self.search_pages.get()[0], 50)
+		# another worker finds the end on page 0 while this one is on page 50
+		self.search_pages.results_end(30)
+		self.search_pages.failed(50)
+		self.search_pages.completed(0)
+		self.assertEqual(self.saved(), {'pending': [], 'done': {}, 'abandoned': [], 'end': 30})
+		self.assertIsNone(self.search_pages.get(wait=False))
+		self.assertTrue(self.search_pages.is_finished())
+
+class MinedSearchPagesTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.server = mock_indeed.serve(mock_indeed.MockIndeed(total=120))
+		self.checkpoint = os.path.join(self.tmp.name, 'checkpoint_test.json')
+		self.results = os.path.join(self.tmp.name, 'resume_output_test.json')
+		self.manager = multiprocessing.Manager()
+
+	def tearDown(self):
+		self.manager.shutdown()
+		self.server.shutdown()
+		self.tmp.cleanup()
+
+	def test_end_of_results_found_by_mine(self):
+		search_pages = scraper.SearchPages.create(self.manager, self.checkpoint, 0, 250)
+		args = scraper.scraping_options(fetch=scraper.HTTP_FETCH, prefetch=0, rate=1000.0, max_rate=1000.0, burst=1000)
+		with mock.patch.object(scraper, 'create_driver', lambda args: FakeDriver()):
+			scraper.mine(args, self.results, search_pages, mock_indeed.server_url(self.server) + '/search?q=nurse', reraise=True)
+
+		with open(self.results) as f:
+			self.assertEqual(len(f.readlines()), 120)
+		with open(self.checkpoint) as f:
+			# the last page has 20 resumes, pages 150 and 200 are not gone to
+			self.assertEqual(json.load(f), {'pending': [], 'done': {}, 'abandoned': [], 'end': 120})
+		self.assertEqual(self.server.site.stats()[mock_indeed.SEARCH]['count'], 3)
+		self.assertTrue(search_pages.is_finished())
@@ -0,0 +1,44 @@
+"""Seen index kept in step with results overridden by --override"""
+import argparse
+import tempfile
+import unittest
+import json
+import os
+
+from indeed_resume_scraper import scraper
+
+class OverrideTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.cwd = os.getcwd()
+		# results files are named relative to the working directory
+		os.chdir(self.tmp.name)
+		self.seen_filename = os.path.join(self.tmp.name, 'seen-resumes.db')
+		with open(scraper.results_filename('nurse-canada'), 'w') as f:
+			for idd in ['r0', 'r1']:
+				f.write(json.dumps({'id': idd}) + '\n')
+		seen_index = scraper.SeenIndex(self.seen_filename)
+		# r2 was scraped by another query
+		seen_index.add_many(['r0', 'r1', 'r2'])
+		seen_index.close()
+
+	def tearDown(self):
+		os.chdir(self.cwd)
+		self.tmp.cleanup()
+
+	def seen(self):
+		seen_index = scraper.SeenIndex(self.seen_filename)
+		try:
+			return seen_index.seen(['r0', 'r1', 'r2'])
+		finally:
+			seen_index.close()
+
+	def test_overridden_resumes_are_scraped_again(self):
+		scraper.remove_results(argparse.Namespace(format=scraper.JSONL, seen_index=self.seen_filename, incremental=False), 'nurse-canada')
+		self.assertFalse(os.path.exists(scraper.results_filename('nurse-canada')))
+		self.assertEqual(self.seen(), {'r2'})
+
+	def test_incremental_runs_keep_content_hashes(self):
+		scraper.remove_results(argparse.Namespace(format=scraper.JSONL, seen_index=self.seen_filename, incremental=True), 'nurse-canada')
+		self.assertFalse(os.path.exists(scraper.results_filename('nurse-canada')))
+		self.assertEqual(self.seen(), {'r0', 'r1', 'r2'})
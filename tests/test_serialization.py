@@ -0,0 +1,30 @@
+"""Resumes serialized alike with orjson and json"""
+import unittest
+import json
+from unittest import mock
+
+from indeed_resume_scraper import parsing
+
+def resume():
+	return parsing.Resume('r0',
+		summary=['Infirmière autorisée, 東京 — "soins" \\ palliatifs\n'],
+		jobs=[parsing.Job('Chef d\'équipe', 'Hôpital Saint-Jérôme', 'janvier 2015 to Present', 'Équipe de 12 ✓')],
+		schools=[parsing.School('Baccalauréat', 'Université Laval', None)],
+		skills=[parsing.Skill('Français', '5+ ans'), parsing.Skill('😀', None)],
+		additional=['Bénévole à la Croix-Rouge'])
+
+@unittest.skipIf(parsing.orjson is None, 'orjson is not installed')
+class EncodersTest(unittest.TestCase):
+	def test_same_bytes_with_non_ascii(self):
+		with_orjson = resume().toJSON()
+		with mock.patch.object(parsing, 'orjson', None):
+			with_json = resume().toJSON()
+		self.assertEqual(with_orjson.encode('utf-8'), with_json.encode('utf-8'))
+		self.assertIn('Infirmière', with_json)
+		self.assertEqual(json.loads(with_json), resume().asdict())
+
+	def test_same_lines_read_back(self):
+		line = resume().toJSON()
+		with mock.patch.object(parsing, 'orjson', None):
+			self.assertEqual(parsing.loads(line), parsing.loads(resume().toJSON()))
+		self.assertEqual(parsing.loads(line), resume().asdict())